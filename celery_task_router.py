@@ -1,12 +1,24 @@
+import logging
+import time
+from typing import Optional
+
 import shared.celery_config as shared_celery_config
+from redis.exceptions import RedisError
 from shared.billing import BillingPlan
 from shared.celery_router import route_tasks_based_on_user_plan
+from shared.config import get_config
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 
-from database.engine import get_db_session
+from database.engine import get_db_session, replica_reads
 from database.models.core import Commit, CompareCommit, Owner, Repository
 from database.models.labelanalysis import LabelAnalysisRequest
 from database.models.profiling import ProfilingCommit, ProfilingUpload
 from database.models.staticanalysis import StaticAnalysisSuite
+from helpers.metrics import metrics
+from services.redis import get_redis_connection
+
+log = logging.getLogger(__name__)
 
 
 def _get_user_plan_from_ownerid(db_session, ownerid, *args, **kwargs) -> str:
@@ -105,7 +117,143 @@ def _get_user_plan_from_suite_id(dbsession, suite_id, *args, **kwargs) -> str:
     return BillingPlan.users_basic.db_name
 
 
-def _get_user_plan_from_task(dbsession, task_name: str, task_kwargs: dict) -> str:
+class OwnerPlanCache(object):
+    """
+    Remembers the plan found for a routing argument (eg `repoid/123`), so routing
+    a task doesn't need a query every time. It is off unless
+    `setup.task_router.plan_cache.enabled` is set (or `enabled` is given).
+
+    Entries live `ttl` seconds in the process. With `setup.task_router.plan_cache.redis`
+    they are also shared through a redis hash, which expires `redis_ttl` seconds
+    after its first entry was added. When a plan changes, `invalidate` drops every
+    entry of this process and the redis hash, so other processes see the change
+    within `ttl` seconds at most.
+    """
+
+    redis_key = "task_router/owner_plans"
+
+    def __init__(self, max_entries=10000, enabled: Optional[bool] = None):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries = {}
+
+    def _get_setting(self, name, default):
+        return get_config("setup", "task_router", "plan_cache", name, default=default)
+
+    def is_enabled(self) -> bool:
+        if self.enabled is not None:
+            return self.enabled
+        return self._get_setting("enabled", False)
+
+    def _uses_redis(self) -> bool:
+        return self._get_setting("redis", False)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            plan, expires_at = entry
+            if expires_at > time.monotonic():
+                metrics.incr("worker.task_router.plan_cache.hit")
+                return plan
+            del self._entries[key]
+        if self._uses_redis():
+            try:
+                plan = get_redis_connection().hget(self.redis_key, key)
+            except RedisError:
+                log.warning("Unable to fetch cached owner plan", exc_info=True)
+                plan = None
+            if plan is not None:
+                plan = plan.decode() if isinstance(plan, bytes) else plan
+                metrics.incr("worker.task_router.plan_cache.redis_hit")
+                self._set_local(key, plan)
+                return plan
+        metrics.incr("worker.task_router.plan_cache.miss")
+        return None
+
+    def _set_local(self, key: str, plan: str) -> None:
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+        self._entries[key] = (plan, time.monotonic() + self._get_setting("ttl", 30))
+
+    def set(self, key: str, plan: str) -> None:
+        self._set_local(key, plan)
+        if self._uses_redis():
+            try:
+                redis_connection = get_redis_connection()
+                pipeline = redis_connection.pipeline()
+                pipeline.hset(self.redis_key, key, plan)
+                pipeline.ttl(self.redis_key)
+                _, ttl = pipeline.execute()
+                # only a new hash gets an expiry, refreshing it on every `set` would
+                # keep the hash (and its oldest entries) around forever
+                if ttl < 0:
+                    redis_connection.expire(
+                        self.redis_key, self._get_setting("redis_ttl", 600)
+                    )
+            except RedisError:
+                log.warning("Unable to cache owner plan", exc_info=True)
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+        if self._uses_redis():
+            try:
+                get_redis_connection().delete(self.redis_key)
+            except RedisError:
+                log.warning("Unable to clear cached owner plans", exc_info=True)
+
+
+owner_plan_cache = OwnerPlanCache()
+
+
+def invalidate_owner_plans() -> None:
+    """
+    Has to be called whenever the plan of an owner changes, so tasks aren't routed
+    with the old plan. Use `invalidate_owner_plans_on_commit` when the change isn't
+    committed yet.
+    """
+    owner_plan_cache.invalidate()
+
+
+def invalidate_owner_plans_on_commit(db_session: Session) -> None:
+    """
+    Invalidates the owner plans once the transaction of `db_session` that changes
+    the plan of an owner is committed. Tasks routed before that still read the old
+    plan, and would cache it again if the plans were invalidated right away.
+    """
+    db_session.info["invalidate_owner_plans"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_owner_plans_after_commit(session):
+    if session.info.pop("invalidate_owner_plans", False):
+        invalidate_owner_plans()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_owner_plans_invalidation(session):
+    # the plans didn't change
+    session.info.pop("invalidate_owner_plans", None)
+
+
+# The kwarg of the task each lookup finds the owner from
+_ROUTING_ARGUMENTS = {
+    _get_user_plan_from_ownerid: "ownerid",
+    _get_user_plan_from_org_ownerid: "org_ownerid",
+    _get_user_plan_from_repoid: "repoid",
+    _get_user_plan_from_profiling_commit: "profiling_id",
+    _get_user_plan_from_profiling_upload: "profiling_upload_id",
+    _get_user_plan_from_comparison_id: "comparison_id",
+    _get_user_plan_from_label_request_id: "request_id",
+    _get_user_plan_from_suite_id: "suite_id",
+}
+
+
+def _get_user_plan_from_task(
+    dbsession,
+    task_name: str,
+    task_kwargs: dict,
+    plan_cache: OwnerPlanCache = owner_plan_cache,
+) -> str:
     owner_plan_lookup_funcs = {
         # from ownerid
         shared_celery_config.delete_owner_task_name: _get_user_plan_from_ownerid,
@@ -138,10 +286,20 @@ def _get_user_plan_from_task(dbsession, task_name: str, task_kwargs: dict) -> st
         # from suite_id
         shared_celery_config.static_analysis_task_name: _get_user_plan_from_suite_id,
     }
-    func_to_use = owner_plan_lookup_funcs.get(
-        task_name, lambda *args, **kwargs: BillingPlan.users_basic.db_name
-    )
-    return func_to_use(dbsession, **task_kwargs)
+    func_to_use = owner_plan_lookup_funcs.get(task_name)
+    if func_to_use is None:
+        return BillingPlan.users_basic.db_name
+    with metrics.timer("worker.task_router.plan_lookup"):
+        argument = _ROUTING_ARGUMENTS[func_to_use]
+        value = task_kwargs.get(argument)
+        if value is None or not plan_cache.is_enabled():
+            return func_to_use(dbsession, **task_kwargs)
+        cache_key = f"{argument}/{value}"
+        plan = plan_cache.get(cache_key)
+        if plan is None:
+            plan = func_to_use(dbsession, **task_kwargs)
+            plan_cache.set(cache_key, plan)
+        return plan
 
 
 def route_task(name, args, kwargs, options, task=None, **kw):
@@ -149,5 +307,6 @@ def route_task(name, args, kwargs, options, task=None, **kw):
     Docs: https://docs.celeryq.dev/en/stable/userguide/routing.html#routers
     """
     db_session = get_db_session()
-    user_plan = _get_user_plan_from_task(db_session, name, kwargs)
+    with replica_reads(db_session):
+        user_plan = _get_user_plan_from_task(db_session, name, kwargs)
     return route_tasks_based_on_user_plan(name, user_plan)
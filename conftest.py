@@ -294,3 +294,13 @@ def mock_checkpoint_submit(mocker, request):
         "submit_subflow",
         mock_submit,
     )
+
+
+@pytest.fixture(autouse=True)
+def clear_owner_plan_cache():
+    # plans cached by one test would otherwise route the tasks of the next ones
+    from celery_task_router import owner_plan_cache
+
+    owner_plan_cache.invalidate()
+    yield
+    owner_plan_cache.invalidate()
@@ -1,17 +1,35 @@
 import dataclasses
 import json
+import logging
+import time
+from contextlib import contextmanager
 from decimal import Decimal
+from typing import Iterable, Optional
 
 from shared.config import get_config
 from shared.utils.ReportEncoder import ReportEncoder
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.expression import Select
 
 from database.models.timeseries import TimeseriesBaseModel
+from helpers.metrics import metrics
 from helpers.timeseries import timeseries_enabled
 
 from .base import Base
 
+log = logging.getLogger(__name__)
+
+DEFAULT_POOL_PROFILE = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,
+    "pool_pre_ping": True,
+}
+
 
 def create_all(engine):
     Base.metadata.create_all(engine)
@@ -30,47 +48,266 @@ def json_dumps(d):
     return json.dumps(d, cls=DatabaseEncoder)
 
 
+def get_pool_profile(name: str) -> dict:
+    """
+    Pool settings of the profile `name` (`setup.database.pool_profiles.<name>`),
+    on top of the defaults
+    """
+    profile = get_config("setup", "database", "pool_profiles", name, default=None)
+    if profile is None and name != "default":
+        log.warning("Unknown database pool profile", extra=dict(profile=name))
+    return {**DEFAULT_POOL_PROFILE, **(profile or {})}
+
+
+def get_pool_profile_name_for_queues(queues: Iterable[str]) -> str:
+    """
+    The pool profile configured for the first of `queues` that has one
+    (`setup.database.queue_pool_profiles.<queue>`)
+    """
+    queue_profiles = get_config("setup", "database", "queue_pool_profiles", default={})
+    for queue in queues:
+        if queue in queue_profiles:
+            return queue_profiles[queue]
+    return "default"
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that reports how long getting a connection from it took
+    """
+
+    metrics_prefix = "worker.database.pool"
+
+    def _do_get(self):
+        with metrics.timer(f"{self.metrics_prefix}.checkout_wait"):
+            return super()._do_get()
+
+
+def _report_pool_usage(pool, metrics_prefix):
+    metrics.gauge(f"{metrics_prefix}.checked_out", pool.checkedout())
+    metrics.gauge(f"{metrics_prefix}.connections", pool.checkedout() + pool.checkedin())
+
+
+def _instrument_pool(engine, name: str) -> None:
+    metrics_prefix = f"worker.database.pool.{name}"
+    engine.pool.metrics_prefix = metrics_prefix
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        _report_pool_usage(engine.pool, metrics_prefix)
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        _report_pool_usage(engine.pool, metrics_prefix)
+
+
+def set_statement_timeout(db_session: Session, timeout: Optional[int]) -> None:
+    """
+    Makes every transaction of `db_session` use a `statement_timeout` of `timeout`
+    seconds, until it's reset with `timeout=None`
+    """
+    if timeout is None:
+        db_session.info.pop("statement_timeout", None)
+    else:
+        db_session.info["statement_timeout"] = timeout
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    timeout = session.info.get("statement_timeout")
+    if timeout is not None:
+        # LOCAL so the setting is dropped once the transaction ends and the
+        # connection goes back to the pool
+        connection.execute(f"SET LOCAL statement_timeout = {int(timeout * 1000)}")
+
+
+def get_replica_max_lag() -> float:
+    return get_config("setup", "database", "replica_max_lag_seconds", default=10)
+
+
+@contextmanager
+def replica_reads(db_session: Session):
+    """
+    Marks the SELECTs done with `db_session` inside the block as safe to be served
+    by the read replica (when there is one). Only use it around reads that can
+    tolerate data a few seconds old.
+    """
+    previous = db_session.info.get("replica_reads", False)
+    db_session.info["replica_reads"] = True
+    try:
+        yield db_session
+    finally:
+        db_session.info["replica_reads"] = previous
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_session_writes(session, flush_context):
+    # what was written in this transaction isn't visible on the replica
+    session.info["wrote_in_transaction"] = True
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _clear_session_writes(session):
+    session.info.pop("wrote_in_transaction", None)
+
+
+class ReplicaLagMonitor(object):
+    """
+    Tells whether the replica is close enough to the primary to be read from,
+    checking its replication lag at most once every `check_interval` seconds
+    """
+
+    def __init__(self, engine, max_lag: float, check_interval: float = 30):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._checked_at = None
+        self._usable = False
+
+    def _measure_lag(self) -> Optional[float]:
+        with self.engine.connect() as connection:
+            return connection.execute(
+                "SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+            ).scalar()
+
+    def is_usable(self) -> bool:
+        now = time.monotonic()
+        if (
+            self._checked_at is not None
+            and now - self._checked_at < self.check_interval
+        ):
+            return self._usable
+        self._checked_at = now
+        try:
+            lag = self._measure_lag()
+        except SQLAlchemyError:
+            log.warning("Unable to check read replica lag", exc_info=True)
+            metrics.incr("worker.database.replica.unavailable")
+            self._usable = False
+            return self._usable
+        # no replay timestamp means it is not replicating (yet), so it's not behind
+        if lag is not None:
+            metrics.gauge("worker.database.replica.lag", float(lag))
+        self._usable = lag is None or float(lag) <= self.max_lag
+        if not self._usable:
+            log.warning(
+                "Read replica is lagging, using the primary",
+                extra=dict(lag=float(lag), max_lag=self.max_lag),
+            )
+        return self._usable
+
+
 class SessionFactory:
-    def __init__(self, database_url, timeseries_database_url=None):
+    def __init__(
+        self,
+        database_url,
+        timeseries_database_url=None,
+        pool_profile="default",
+        replica_database_url=None,
+    ):
         self.database_url = database_url
         self.timeseries_database_url = timeseries_database_url
+        self.replica_database_url = replica_database_url
+        self.pool_profile = pool_profile
         self.main_engine = None
         self.timeseries_engine = None
+        self.replica_engine = None
+        self.replica_monitor = None
+        self.session_maker = None
 
-    def create_session(self):
-        self.main_engine = create_engine(
-            self.database_url,
+    def _create_engine(self, database_url, name):
+        profile = get_pool_profile(self.pool_profile)
+        engine = create_engine(
+            database_url,
             json_serializer=json_dumps,
+            poolclass=InstrumentedQueuePool,
+            pool_size=profile["pool_size"],
+            max_overflow=profile["max_overflow"],
+            pool_timeout=profile["pool_timeout"],
+            pool_recycle=profile["pool_recycle"],
+            pool_pre_ping=profile["pool_pre_ping"],
         )
+        _instrument_pool(engine, name)
+        return engine
 
+    def _create_engines(self):
+        self.main_engine = self._create_engine(self.database_url, "main")
+        self.timeseries_engine = None
         if timeseries_enabled():
-            self.timeseries_engine = create_engine(
-                self.timeseries_database_url,
-                json_serializer=json_dumps,
+            self.timeseries_engine = self._create_engine(
+                self.timeseries_database_url, "timeseries"
+            )
+        self.replica_engine = None
+        self.replica_monitor = None
+        if self.replica_database_url:
+            self.replica_engine = self._create_engine(
+                self.replica_database_url, "replica"
+            )
+            self.replica_monitor = ReplicaLagMonitor(
+                self.replica_engine, get_replica_max_lag()
             )
 
-            main_engine = self.main_engine
-            timeseries_engine = self.timeseries_engine
+    def _can_read_from_replica(self, session: Session, clause) -> bool:
+        return (
+            self.replica_engine is not None
+            and session.info.get("replica_reads", False)
+            and isinstance(clause, Select)
+            and not session.info.get("wrote_in_transaction", False)
+            and not session.new
+            and not session.deleted
+            and self.replica_monitor.is_usable()
+        )
+
+    def create_session(self):
+        self._create_engines()
+
+        if timeseries_enabled() or self.replica_engine is not None:
+            factory = self
 
             class RoutingSession(Session):
                 def get_bind(self, mapper=None, clause=None):
                     if mapper is not None and issubclass(
                         mapper.class_, TimeseriesBaseModel
                     ):
-                        return timeseries_engine
+                        return factory.timeseries_engine
                     if (
                         clause is not None
                         and hasattr(clause, "table")
                         and clause.table.name.startswith("timeseries_")
                     ):
-                        return timeseries_engine
-                    return main_engine
+                        return factory.timeseries_engine
+                    if factory._can_read_from_replica(self, clause):
+                        metrics.incr("worker.database.replica.reads")
+                        return factory.replica_engine
+                    return factory.main_engine
 
-            session_factory = sessionmaker(class_=RoutingSession)
+            self.session_maker = sessionmaker(class_=RoutingSession)
         else:
-            session_factory = sessionmaker(bind=self.main_engine)
+            self.session_maker = sessionmaker(bind=self.main_engine)
+
+        return scoped_session(self.session_maker)
 
-        return scoped_session(session_factory)
+    def use_pool_profile(self, pool_profile: str) -> None:
+        """
+        Recreates the engines with the pool settings of `pool_profile`. Sessions
+        created before this keep using the previous engines.
+        """
+        if pool_profile == self.pool_profile and self.main_engine is not None:
+            return
+        log.info("Using database pool profile", extra=dict(profile=pool_profile))
+        previous_engines = [
+            self.main_engine,
+            self.timeseries_engine,
+            self.replica_engine,
+        ]
+        self.pool_profile = pool_profile
+        self._create_engines()
+        if self.session_maker is not None and "bind" in self.session_maker.kw:
+            self.session_maker.configure(bind=self.main_engine)
+        for engine in previous_engines:
+            if engine is not None:
+                engine.dispose()
 
 
 session_factory = SessionFactory(
@@ -84,6 +321,7 @@ session_factory = SessionFactory(
         "timeseries_database_url",
         default="postgres://postgres:@timescale:5432/postgres",
     ),
+    replica_database_url=get_config("services", "database_replica_url", default=None),
 )
 
 session = session_factory.create_session()
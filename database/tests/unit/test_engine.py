@@ -1,7 +1,14 @@
+from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy_utils import get_mapper
 
-from database.engine import SessionFactory
+from database.engine import (
+    InstrumentedQueuePool,
+    SessionFactory,
+    get_pool_profile_name_for_queues,
+    replica_reads,
+    set_statement_timeout,
+)
 from database.models import Commit
 from database.models.timeseries import Measurement
 
@@ -56,3 +63,112 @@ class TestDatabaseEngine:
         clause = insert(Measurement.__table__)
         engine = session.get_bind(clause=clause)
         assert engine == session_factory.timeseries_engine
+
+    def test_pool_profile(self, sqlalchemy_connect_url, mock_configuration, mocker):
+        mocker.patch("database.engine.timeseries_enabled", return_value=False)
+        mock_configuration._params["setup"]["database"] = {
+            "pool_profiles": {"heavy": {"pool_size": 20, "pool_pre_ping": False}}
+        }
+
+        session_factory = SessionFactory(
+            database_url=sqlalchemy_connect_url, pool_profile="heavy"
+        )
+        session_factory.create_session()
+        assert isinstance(session_factory.main_engine.pool, InstrumentedQueuePool)
+        assert session_factory.main_engine.pool.size() == 20
+        assert session_factory.main_engine.pool._recycle == 1800
+        assert not session_factory.main_engine.pool._pre_ping
+
+    def test_use_pool_profile(self, sqlalchemy_connect_url, mock_configuration, mocker):
+        mocker.patch("database.engine.timeseries_enabled", return_value=True)
+        mock_configuration._params["setup"]["database"] = {
+            "pool_profiles": {"light": {"pool_size": 1}}
+        }
+
+        session_factory = SessionFactory(
+            database_url=sqlalchemy_connect_url,
+            timeseries_database_url=sqlalchemy_connect_url,
+        )
+        session = session_factory.create_session()
+        previous_engine = session_factory.main_engine
+        assert previous_engine.pool.size() == 5
+
+        session_factory.use_pool_profile("light")
+        assert session_factory.main_engine is not previous_engine
+        assert session_factory.main_engine.pool.size() == 1
+        assert session_factory.timeseries_engine.pool.size() == 1
+        engine = session.get_bind(mapper=get_mapper(Commit))
+        assert engine == session_factory.main_engine
+        engine = session.get_bind(mapper=get_mapper(Measurement))
+        assert engine == session_factory.timeseries_engine
+
+    def test_get_pool_profile_name_for_queues(self, mock_configuration):
+        mock_configuration._params["setup"]["database"] = {
+            "queue_pool_profiles": {"reports": "heavy"}
+        }
+        assert get_pool_profile_name_for_queues(["celery", "reports"]) == "heavy"
+        assert get_pool_profile_name_for_queues(["celery"]) == "default"
+
+    def test_statement_timeout(self, sqlalchemy_connect_url, db, mocker):
+        mocker.patch("database.engine.timeseries_enabled", return_value=False)
+
+        session_factory = SessionFactory(database_url=sqlalchemy_connect_url)
+        db_session = session_factory.create_session()()
+        set_statement_timeout(db_session, 2)
+        assert db_session.execute("SHOW statement_timeout").scalar() == "2s"
+        db_session.commit()
+        set_statement_timeout(db_session, None)
+        assert db_session.execute("SHOW statement_timeout").scalar() == "0"
+        db_session.close()
+
+    def test_session_get_bind_replica(self, sqlalchemy_connect_url, db, mocker):
+        mocker.patch("database.engine.timeseries_enabled", return_value=False)
+
+        session_factory = SessionFactory(
+            database_url=sqlalchemy_connect_url,
+            replica_database_url=sqlalchemy_connect_url,
+        )
+        session = session_factory.create_session()
+        assert session_factory.replica_engine is not None
+        clause = select([Commit.__table__.c.id])
+
+        assert session.get_bind(clause=clause) == session_factory.main_engine
+        with replica_reads(session):
+            assert session.get_bind(clause=clause) == session_factory.replica_engine
+            # writes always go to the primary
+            clause_insert = insert(Commit.__table__)
+            engine = session.get_bind(clause=clause_insert)
+            assert engine == session_factory.main_engine
+        assert session.get_bind(clause=clause) == session_factory.main_engine
+
+        # once the transaction wrote something, it only reads from the primary
+        session.info["wrote_in_transaction"] = True
+        with replica_reads(session):
+            assert session.get_bind(clause=clause) == session_factory.main_engine
+        session.rollback()
+        with replica_reads(session):
+            assert session.get_bind(clause=clause) == session_factory.replica_engine
+        session.remove()
+
+    def test_session_get_bind_replica_lagging(self, sqlalchemy_connect_url, mocker):
+        mocker.patch("database.engine.timeseries_enabled", return_value=False)
+
+        session_factory = SessionFactory(
+            database_url=sqlalchemy_connect_url,
+            replica_database_url=sqlalchemy_connect_url,
+        )
+        session = session_factory.create_session()
+        measure_lag = mocker.patch.object(
+            session_factory.replica_monitor, "_measure_lag", return_value=60.0
+        )
+        clause = select([Commit.__table__.c.id])
+        with replica_reads(session):
+            assert session.get_bind(clause=clause) == session_factory.main_engine
+            assert session.get_bind(clause=clause) == session_factory.main_engine
+        # the lag is only checked once per interval
+        assert measure_lag.call_count == 1
+
+        session_factory.replica_monitor._checked_at = None
+        measure_lag.return_value = 1.5
+        with replica_reads(session):
+            assert session.get_bind(clause=clause) == session_factory.replica_engine
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import Callable, Coroutine, Hashable
+
+import httpx
+
+log = logging.getLogger(__name__)
+
+_event_loop = None
+_http_clients = {}
+
+
+class SharedAsyncClient(object):
+    """
+    Hands a long-lived httpx client out to `async with` blocks without closing it
+    at the end of the block, so its open connections are kept for the next tasks
+    """
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+
+    async def __aenter__(self) -> httpx.AsyncClient:
+        return self.client
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    The event loop every task of this process runs in
+
+    Reusing the same loop lets anything bound to it (like the connection pools of
+    the shared http clients) outlive a single task.
+    """
+    global _event_loop
+    if _event_loop is None or _event_loop.is_closed():
+        _event_loop = asyncio.new_event_loop()
+        # the clients of a previous loop can't be used in this one
+        _http_clients.clear()
+    return _event_loop
+
+
+def run_in_event_loop(coroutine: Coroutine):
+    loop = get_event_loop()
+    task = loop.create_task(coroutine)
+    try:
+        return loop.run_until_complete(task)
+    finally:
+        if not task.done():
+            # interrupted from outside the coroutine (eg a soft time limit), it's
+            # cancelled and run until it handled the cancellation, so it's not left
+            # pending in the loop the next tasks run in
+            task.cancel()
+            loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+
+
+def get_shared_http_client(key: Hashable, make_client: Callable[[], httpx.AsyncClient]):
+    """
+    The client for `key` (made with `make_client` the first time), shared by the
+    tasks of this process. Outside of the loop of `get_event_loop` a new client is
+    returned every time.
+    """
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is None or running_loop is not _event_loop:
+        return make_client()
+    client = _http_clients.get(key)
+    if client is None:
+        client = SharedAsyncClient(make_client())
+        _http_clients[key] = client
+    return client
+
+
+def shutdown_event_loop() -> None:
+    """
+    Closes the shared http clients and the event loop of this process
+    """
+    global _event_loop
+    if _event_loop is None or _event_loop.is_closed():
+        return
+    clients = list(_http_clients.values())
+    _http_clients.clear()
+    try:
+        for client in clients:
+            _event_loop.run_until_complete(client.aclose())
+        _event_loop.run_until_complete(_event_loop.shutdown_asyncgens())
+    except Exception:
+        log.warning("Unable to cleanly shut down the event loop", exc_info=True)
+    finally:
+        _event_loop.close()
+        _event_loop = None
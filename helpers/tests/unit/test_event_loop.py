@@ -0,0 +1,76 @@
+import asyncio
+
+import httpx
+import pytest
+
+from helpers.event_loop import (
+    SharedAsyncClient,
+    get_event_loop,
+    get_shared_http_client,
+    run_in_event_loop,
+    shutdown_event_loop,
+)
+
+
+@pytest.fixture
+def event_loop_shutdown():
+    yield
+    shutdown_event_loop()
+
+
+class TestEventLoop(object):
+    def test_run_in_event_loop_reuses_loop(self, event_loop_shutdown):
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        first_loop = run_in_event_loop(current_loop())
+        assert run_in_event_loop(current_loop()) is first_loop
+        assert get_event_loop() is first_loop
+
+        shutdown_event_loop()
+        assert first_loop.is_closed()
+        assert run_in_event_loop(current_loop()) is not first_loop
+
+    def test_run_in_event_loop_interrupted(self, event_loop_shutdown):
+        cleaned_up = []
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            finally:
+                cleaned_up.append(True)
+
+        def interrupt():
+            raise KeyboardInterrupt()
+
+        get_event_loop().call_later(0.01, interrupt)
+        with pytest.raises(KeyboardInterrupt):
+            run_in_event_loop(slow())
+        # the cancelled coroutine ran its cleanup before returning
+        assert cleaned_up == [True]
+        assert not asyncio.all_tasks(get_event_loop())
+
+    def test_shared_http_client(self, event_loop_shutdown):
+        async def get_clients():
+            first = get_shared_http_client("github", httpx.AsyncClient)
+            async with first as client:
+                assert isinstance(client, httpx.AsyncClient)
+            second = get_shared_http_client("github", httpx.AsyncClient)
+            other = get_shared_http_client("gitlab", httpx.AsyncClient)
+            return first, second, other
+
+        first, second, other = run_in_event_loop(get_clients())
+        assert isinstance(first, SharedAsyncClient)
+        assert first is second
+        assert other is not first
+        # leaving the `async with` block doesn't close it
+        assert not first.client.is_closed
+
+        shutdown_event_loop()
+        assert first.client.is_closed
+
+    @pytest.mark.asyncio
+    async def test_shared_http_client_other_loop(self):
+        client = get_shared_http_client("github", httpx.AsyncClient)
+        assert isinstance(client, httpx.AsyncClient)
+        await client.aclose()
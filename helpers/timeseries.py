@@ -7,3 +7,17 @@ def timeseries_enabled() -> bool:
 
 def backfill_max_batch_size() -> int:
     return get_config("setup", "timeseries", "backfill_max_batch_size", default=500)
+
+
+def backfill_max_in_flight_batches() -> int:
+    return get_config(
+        "setup", "timeseries", "backfill_max_in_flight_batches", default=10
+    )
+
+
+def backfill_step_delay() -> int:
+    return get_config("setup", "timeseries", "backfill_step_delay", default=60)
+
+
+def backfill_in_flight_ttl() -> int:
+    return get_config("setup", "timeseries", "backfill_in_flight_ttl", default=3600)
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import json
 import logging
 import os
 import sys
@@ -13,9 +14,12 @@ from shared.metrics import start_prometheus
 from shared.storage.exceptions import BucketAlreadyExistsError
 
 import app
+from database.engine import get_pool_profile_name_for_queues, session_factory
 from helpers.environment import get_external_dependencies_folder
+from helpers.event_loop import shutdown_event_loop
 from helpers.version import get_current_version
 from services.storage import get_storage_client
+from services.task_profiling import aggregate_task_profiles
 
 log = logging.getLogger(__name__)
 
@@ -50,6 +54,7 @@ def web():
 @worker_process_shutdown.connect
 def mark_process_dead(pid, exitcode, **kwargs):
     multiprocess.mark_process_dead(pid)
+    shutdown_event_loop()
 
 
 def setup_worker():
@@ -94,6 +99,9 @@ def setup_worker():
 def worker(name, concurrency, debug, queue):
     setup_worker()
     actual_queues = _get_queues_param_from_queue_input(queue)
+    session_factory.use_pool_profile(
+        get_pool_profile_name_for_queues(actual_queues.split(","))
+    )
     return app.celery_app.worker_main(
         argv=[
             "worker",
@@ -112,6 +120,115 @@ def worker(name, concurrency, debug, queue):
     )
 
 
+@cli.command()
+@click.argument("task_name")
+@click.option(
+    "--day", "days", multiple=True, help="Only the profiles of this day (YYYY-MM-DD)"
+)
+@click.option("--output", type=click.File("w"), default="-", help="Output file")
+def profiles(task_name, days, output):
+    """Merge the saved profiles of a task into one collapsed-stack file."""
+    aggregated = aggregate_task_profiles(task_name, days)
+    for stack, count in aggregated.most_common():
+        output.write(f"{stack} {count}\n")
+
+
+@cli.command()
+@click.option(
+    "--format",
+    "report_formats",
+    multiple=True,
+    help="Only benchmark these formats",
+)
+@click.option("--files", type=int, default=100, help="Files per generated report")
+@click.option("--lines", type=int, default=500, help="Lines per generated file")
+@click.option("--repeat", type=int, default=3, help="Runs per format (fastest kept)")
+@click.option("--save", type=click.File("w"), help="Save the results as a baseline")
+@click.option(
+    "--baseline", type=click.File("r"), help="Compare the results to this baseline"
+)
+@click.option(
+    "--tolerance", type=float, default=0.1, help="Allowed slowdown (0.1 = 10%)"
+)
+@click.option(
+    "--line-overhead",
+    is_flag=True,
+    default=False,
+    help="Also measure the time the report builder spends per line",
+)
+def benchmark(
+    report_formats,
+    files,
+    lines,
+    repeat,
+    save,
+    baseline,
+    tolerance,
+    line_overhead,
+):
+    """Measure the throughput of the report parsers."""
+    # the benchmark imports every parser, only load it when it runs
+    from services.report.benchmark import (
+        REPORT_GENERATORS,
+        compare_to_baseline,
+        measure_line_overhead,
+        results_to_baseline,
+        run_parser_benchmarks,
+    )
+
+    unknown_formats = set(report_formats) - set(REPORT_GENERATORS)
+    if unknown_formats:
+        raise click.BadParameter(
+            f"unknown formats {sorted(unknown_formats)}, choose from"
+            f" {sorted(REPORT_GENERATORS)}",
+            param_hint="'--format'",
+        )
+    report_formats = report_formats or sorted(REPORT_GENERATORS)
+    results = run_parser_benchmarks(report_formats, files, lines, repeat)
+    _echo_parser_results(results)
+    if line_overhead:
+        click.echo(
+            f"create_coverage_line {measure_line_overhead():.0f} ns/line"
+            f" ({measure_line_overhead(cached=False):.0f} ns/line reading the yaml"
+            " every line)"
+        )
+    if save:
+        json.dump(results_to_baseline(results), save, indent=2)
+    if baseline:
+        regressions = compare_to_baseline(results, json.load(baseline), tolerance)
+        if regressions:
+            raise click.ClickException("Regressions found:\n" + "\n".join(regressions))
+
+
+@cli.command()
+@click.option("--repos", type=int, default=100, help="Repos the tasks are routed for")
+@click.option("--lookups", type=int, default=1000, help="Tasks routed per run")
+def routing(repos, lookups):
+    """Measure how long the task router takes to find a plan."""
+    from services.task_router_benchmark import (
+        get_benchmark_repoids,
+        measure_plan_lookup,
+    )
+
+    repoids = get_benchmark_repoids(repos)
+    if not repoids:
+        raise click.ClickException("No repos to route tasks for in the database")
+    click.echo(
+        f"plan lookup {measure_plan_lookup(repoids, lookups):.0f} us"
+        f" ({measure_plan_lookup(repoids, lookups, cached=False):.0f} us"
+        " without the plan cache)"
+    )
+
+
+def _echo_parser_results(results):
+    for result in results:
+        click.echo(
+            f"{result.report_format:<12} {result.mb_per_second:>9.2f} MB/s"
+            f" {result.lines_per_second:>12.0f} lines/s"
+            f" {result.peak_rss / 1_000_000:>9.1f} MB peak RSS"
+        )
+
+
 def _get_queues_param_from_queue_input(queues: typing.List[str]) -> str:
     # We always run the health_check queue to make sure the healthcheck is performed
     # And also to avoid that queue fillign up with no workers to consume from it
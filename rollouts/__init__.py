@@ -30,3 +30,24 @@ USE_LABEL_INDEX_IN_REPORT_PROCESSING_BY_REPO_SLUG = Feature(
     0.0,
     overrides={"github/giovanni-guidini/sentry": "enabled"},
 )
+
+# Reuses rendered PR comment sections (and skips editing the comment when nothing
+# changed) across notifies of the same pull
+PULL_COMMENT_CACHE_BY_REPO_SLUG = Feature(
+    "pull_comment_cache",
+    0.0,
+)
+
+# Keeps the reports parsed from the uploaded files of a commit, so identical files
+# uploaded again for it are copied instead of parsed
+PARSED_FILE_CACHE_BY_REPO_SLUG = Feature(
+    "parsed_file_cache",
+    0.0,
+)
+
+# Reads only the chunks of the files a report is loaded for (eg the files of a
+# component) with ranged reads, using the index of the chunks saved with them
+PARTIAL_REPORT_LOADING_BY_REPO_SLUG = Feature(
+    "partial_report_loading",
+    0.0,
+)
@@ -4,7 +4,7 @@ from base64 import b16encode
 from datetime import datetime
 from enum import Enum
 from hashlib import md5
-from typing import Dict
+from typing import Dict, Optional
 from uuid import uuid4
 
 from shared.config import get_config
@@ -13,13 +13,16 @@ from shared.storage.exceptions import FileNotInStorageError
 from shared.utils.ReportEncoder import ReportEncoder
 
 from helpers.metrics import metrics
-from services.storage import get_storage_client
+from services.storage import get_storage_client, read_file_range
 
 log = logging.getLogger(__name__)
 
 
 class MinioEndpoints(Enum):
     chunks = "{version}/repos/{repo_hash}/commits/{commitid}/{chunks_file_name}.txt"
+    chunks_index = (
+        "{version}/repos/{repo_hash}/commits/{commitid}/{chunks_file_name}_index.json"
+    )
     label_index = (
         "{version}/repos/{repo_hash}/commits/{commitid}/{label_index_file_name}.json"
     )
@@ -248,7 +251,9 @@ class ArchiveService(object):
     Convenience method to write a chunks.txt file to storage.
     """
 
-    def write_chunks(self, commit_sha, data, report_code=None) -> str:
+    def write_chunks(
+        self, commit_sha, data, report_code=None, *, is_already_gzipped=False
+    ) -> str:
         chunks_file_name = report_code if report_code is not None else "chunks"
         path = MinioEndpoints.chunks.get_path(
             version="v4",
@@ -257,7 +262,22 @@ class ArchiveService(object):
             chunks_file_name=chunks_file_name,
         )
 
-        self.write_file(path, data)
+        self.write_file(path, data, is_already_gzipped=is_already_gzipped)
+        return path
+
+    """
+    Convenience method to write the byte offsets of the chunks of a chunks.txt file
+    """
+
+    def write_chunks_index(self, commit_sha, chunks_index, report_code=None) -> str:
+        chunks_file_name = report_code if report_code is not None else "chunks"
+        path = MinioEndpoints.chunks_index.get_path(
+            version="v4",
+            repo_hash=self.storage_hash,
+            commitid=commit_sha,
+            chunks_file_name=chunks_file_name,
+        )
+        self.write_file(path, json.dumps(chunks_index))
         return path
 
     """
@@ -272,6 +292,21 @@ class ArchiveService(object):
         )
         return contents
 
+    """
+    Reads the bytes from `start` to `end` of a file, as they are stored (gzipped
+    for the files written gzipped). Raises NotImplementedError when the storage
+    doesn't support ranged reads.
+    """
+
+    def read_file_range(self, path, start, end) -> bytes:
+        with metrics.timer("services.archive.read_file_range") as t:
+            contents = read_file_range(self.storage, self.root, path, start, end)
+        log.debug(
+            "Downloaded file range",
+            extra=dict(timing_ms=t.ms, content_len=len(contents)),
+        )
+        return contents
+
     """
     Generic method to delete a file from the archive.
     """
@@ -304,6 +339,31 @@ class ArchiveService(object):
 
         return self.read_file(path).decode(errors="replace")
 
+    def read_chunks_range(self, commit_sha, start, end, report_code=None) -> bytes:
+        chunks_file_name = report_code if report_code is not None else "chunks"
+        path = MinioEndpoints.chunks.get_path(
+            version="v4",
+            repo_hash=self.storage_hash,
+            commitid=commit_sha,
+            chunks_file_name=chunks_file_name,
+        )
+
+        return self.read_file_range(path, start, end)
+
+    def read_chunks_index(self, commit_sha, report_code=None) -> Optional[Dict]:
+        chunks_file_name = report_code if report_code is not None else "chunks"
+        path = MinioEndpoints.chunks_index.get_path(
+            version="v4",
+            repo_hash=self.storage_hash,
+            commitid=commit_sha,
+            chunks_file_name=chunks_file_name,
+        )
+
+        try:
+            return json.loads(self.read_file(path).decode(errors="replace"))
+        except FileNotInStorageError:
+            return None
+
     def read_label_index(self, commit_sha, report_code=None) -> Dict[str, str]:
         label_index_file_name = (
             report_code + "_" if report_code is not None else ""
@@ -1,6 +1,8 @@
 import asyncio
+import copy
 import logging
-from typing import List, Optional
+from collections import Counter
+from typing import Any, Callable, Hashable, List, Optional
 
 from shared.reports.changes import get_changes_using_rust, run_comparison_using_rust
 from shared.reports.types import Change
@@ -23,6 +25,38 @@ from services.repository import get_repo_provider_service
 log = logging.getLogger(__name__)
 
 
+def artifact_key(flags, path_patterns) -> tuple:
+    return (tuple(sorted(flags or [])), tuple(sorted(path_patterns or [])))
+
+
+class ComparisonArtifacts(object):
+    """Memoizes the values derived from a comparison during a notify run
+
+    Many notifiers end up asking the same questions about the same comparison (or about
+    the same flags/paths filtered version of it). This keeps one answer for each
+    (artifact name, key) pair, and counts how often those answers got reused.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self.computed = Counter()
+        self.reused = Counter()
+
+    def get_or_compute(
+        self, artifact_name: str, key: Hashable, compute: Callable[[], Any]
+    ) -> Any:
+        cache_key = (artifact_name, key)
+        if cache_key in self._values:
+            self.reused[artifact_name] += 1
+            metrics.incr(f"worker.services.comparison.artifacts.{artifact_name}.reused")
+            return self._values[cache_key]
+        self.computed[artifact_name] += 1
+        metrics.incr(f"worker.services.comparison.artifacts.{artifact_name}.computed")
+        value = compute()
+        self._values[cache_key] = value
+        return value
+
+
 class ComparisonProxy(object):
 
     """The idea of this class is to produce a wrapper around Comparison with functionalities that
@@ -56,6 +90,7 @@ class ComparisonProxy(object):
         self._behind_by_lock = asyncio.Lock()
         self._archive_service = None
         self._overlays = {}
+        self.artifacts = ComparisonArtifacts()
 
     def get_archive_service(self):
         if self._archive_service is None:
@@ -68,7 +103,11 @@ class ComparisonProxy(object):
     def get_filtered_comparison(self, flags, path_patterns):
         if not flags and not path_patterns:
             return self
-        return FilteredComparison(self, flags=flags, path_patterns=path_patterns)
+        return self.artifacts.get_or_compute(
+            "filtered_comparison",
+            artifact_key(flags, path_patterns),
+            lambda: FilteredComparison(self, flags=flags, path_patterns=path_patterns),
+        )
 
     @property
     def repository_service(self):
@@ -153,6 +192,44 @@ class ComparisonProxy(object):
                         )
             return self._changes
 
+    async def get_patch_totals(self):
+        """Totals of the head report restricted to the lines in the diff
+
+        Unlike calling `head.report.apply_diff(diff)` directly, this does not save
+        the totals into the (shared) diff.
+        """
+        diff = await self.get_diff()
+        return self.artifacts.get_or_compute(
+            "patch_totals",
+            artifact_key(None, None),
+            lambda: self.comparison.head.report.apply_diff(diff, _save=False),
+        )
+
+    async def get_diff_coverage(self):
+        """Per-file (and overall) coverage of the lines in the diff"""
+        diff = await self.get_diff()
+        return self.artifacts.get_or_compute(
+            "diff_coverage",
+            artifact_key(None, None),
+            lambda: self.comparison.head.report.calculate_diff(diff),
+        )
+
+    def apply_diff(self, diff):
+        """Patch totals of `diff`, saving the per-file totals into it too
+
+        Same as `head.report.apply_diff(diff)`, which the comment sections rely on
+        to have the totals of every file in the diff, but done once per diff. The
+        diff is kept with the totals so its id can't be reused by another one.
+
+        This is the only thing saving totals into the diff of the comparison, the
+        filtered comparisons save theirs into a copy (see `FilteredComparison`).
+        """
+        return self.artifacts.get_or_compute(
+            "patch_totals_in_diff",
+            (artifact_key(None, None), id(diff)),
+            lambda: (diff, self.comparison.head.report.apply_diff(diff)),
+        )[1]
+
     async def get_behind_by(self):
         async with self._behind_by_lock:
             if self._behind_by is None:
@@ -243,12 +320,28 @@ class FilteredComparison(object):
             report=real_comparison.head.report.filter(flags=flags, paths=path_patterns),
         )
         self._changes_lock = asyncio.Lock()
+        self._diff = None
+        self._diff_copied = False
+        self._diff_lock = asyncio.Lock()
+
+    @property
+    def artifacts(self) -> ComparisonArtifacts:
+        return self.real_comparison.artifacts
 
     async def get_impacted_files(self):
         return await self.real_comparison.get_impacted_files()
 
     async def get_diff(self):
-        return await self.real_comparison.get_diff()
+        """A copy of the diff of the real comparison
+
+        `apply_diff` saves the filtered per-file totals into it, those can't end up
+        in the diff of the real comparison (or of the other filtered comparisons)
+        """
+        async with self._diff_lock:
+            if not self._diff_copied:
+                self._diff = copy.deepcopy(await self.real_comparison.get_diff())
+                self._diff_copied = True
+            return self._diff
 
     async def get_existing_statuses(self):
         return await self.real_comparison.get_existing_statuses()
@@ -264,10 +357,37 @@ class FilteredComparison(object):
         # Just make sure to not cause a deadlock between this and get_diff
         async with self._changes_lock:
             if self._changes is None:
-                diff = await self.get_diff()
+                diff = await self.real_comparison.get_diff()
                 self._changes = get_changes(self.base.report, self.head.report, diff)
             return self._changes
 
+    async def get_patch_totals(self):
+        diff = await self.real_comparison.get_diff()
+        return self.artifacts.get_or_compute(
+            "patch_totals",
+            artifact_key(self.flags, self.path_patterns),
+            lambda: self.head.report.apply_diff(diff, _save=False),
+        )
+
+    async def get_diff_coverage(self):
+        diff = await self.real_comparison.get_diff()
+        return self.artifacts.get_or_compute(
+            "diff_coverage",
+            artifact_key(self.flags, self.path_patterns),
+            lambda: self.head.report.calculate_diff(diff),
+        )
+
+    def apply_diff(self, diff):
+        """Patch totals of `diff`, saving the filtered per-file totals into it
+
+        `diff` should be the one of `get_diff`, a copy of the real one
+        """
+        return self.artifacts.get_or_compute(
+            "patch_totals_in_diff",
+            (artifact_key(self.flags, self.path_patterns), id(diff)),
+            lambda: (diff, self.head.report.apply_diff(diff)),
+        )[1]
+
     @property
     def pull(self):
         return self.real_comparison.pull
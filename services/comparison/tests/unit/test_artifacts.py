@@ -0,0 +1,96 @@
+import pytest
+
+from services.comparison import ComparisonArtifacts, ComparisonProxy
+
+
+class TestComparisonArtifacts(object):
+    def test_get_or_compute(self, mocker):
+        artifacts = ComparisonArtifacts()
+        compute = mocker.MagicMock(return_value="value")
+        assert artifacts.get_or_compute("name", ("a",), compute) == "value"
+        assert artifacts.get_or_compute("name", ("a",), compute) == "value"
+        assert compute.call_count == 1
+        assert artifacts.get_or_compute("name", ("b",), compute) == "value"
+        assert compute.call_count == 2
+        assert artifacts.computed == {"name": 2}
+        assert artifacts.reused == {"name": 1}
+
+    def test_get_filtered_comparison_is_shared(self, mocker):
+        comparison = ComparisonProxy(mocker.MagicMock())
+        first = comparison.get_filtered_comparison(
+            flags=["unit", "integration"], path_patterns={"^src/.*"}
+        )
+        second = comparison.get_filtered_comparison(
+            flags=["integration", "unit"], path_patterns={"^src/.*"}
+        )
+        other = comparison.get_filtered_comparison(flags=["unit"], path_patterns=None)
+        assert first is second
+        assert other is not first
+        assert comparison.get_filtered_comparison(None, None) is comparison
+        assert comparison.artifacts.reused == {"filtered_comparison": 1}
+
+    @pytest.mark.asyncio
+    async def test_get_patch_totals_computed_once(self, mocker):
+        comparison = ComparisonProxy(mocker.MagicMock())
+        mocker.patch.object(comparison, "get_diff", return_value={"files": {}})
+        head_report = comparison.comparison.head.report
+        head_report.apply_diff.return_value = "totals"
+        assert await comparison.get_patch_totals() == "totals"
+        assert await comparison.get_patch_totals() == "totals"
+        head_report.apply_diff.assert_called_once_with({"files": {}}, _save=False)
+
+    @pytest.mark.asyncio
+    async def test_filtered_get_diff_coverage_computed_once(self, mocker):
+        comparison = ComparisonProxy(mocker.MagicMock())
+        mocker.patch.object(comparison, "get_diff", return_value={"files": {}})
+        filtered = comparison.get_filtered_comparison(
+            flags=["unit"], path_patterns=None
+        )
+        filtered.head.report.calculate_diff.return_value = {"general": None}
+        assert await filtered.get_diff_coverage() == {"general": None}
+        again = comparison.get_filtered_comparison(flags=["unit"], path_patterns=[])
+        assert await again.get_diff_coverage() == {"general": None}
+        filtered.head.report.calculate_diff.assert_called_once_with({"files": {}})
+
+    def test_apply_diff_saves_into_the_diff_once(self, mocker):
+        comparison = ComparisonProxy(mocker.MagicMock())
+        head_report = comparison.comparison.head.report
+        head_report.apply_diff.return_value = "totals"
+        diff, other_diff = {"files": {}}, {"files": {}}
+        assert comparison.apply_diff(diff) == "totals"
+        assert comparison.apply_diff(diff) == "totals"
+        head_report.apply_diff.assert_called_once_with(diff)
+        assert comparison.apply_diff(other_diff) == "totals"
+        assert head_report.apply_diff.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_filtered_apply_diff_saves_into_a_copy(self, mocker):
+        def saving_totals(totals):
+            def apply_diff(diff, _save=True):
+                if _save:
+                    diff["files"]["a.py"]["totals"] = totals
+                return totals
+
+            return apply_diff
+
+        diff = {"files": {"a.py": {"type": "modified"}}}
+        comparison = ComparisonProxy(mocker.MagicMock())
+        mocker.patch.object(comparison, "get_diff", return_value=diff)
+        comparison.comparison.head.report.apply_diff.side_effect = saving_totals(
+            "totals"
+        )
+        filtered = comparison.get_filtered_comparison(
+            flags=["unit"], path_patterns=None
+        )
+        filtered.head.report.apply_diff.side_effect = saving_totals("filtered totals")
+
+        filtered_diff = await filtered.get_diff()
+        assert filtered_diff == diff
+        assert filtered_diff is not diff
+        assert await filtered.get_diff() is filtered_diff
+        assert filtered.apply_diff(filtered_diff) == "filtered totals"
+        assert comparison.apply_diff(diff) == "totals"
+        # each diff only ever gets its own totals, whatever the order
+        assert filtered.apply_diff(filtered_diff) == "filtered totals"
+        assert diff["files"]["a.py"]["totals"] == "totals"
+        assert filtered_diff["files"]["a.py"]["totals"] == "filtered totals"
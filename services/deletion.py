@@ -0,0 +1,358 @@
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from redis import Redis
+from redis.exceptions import RedisError
+from shared.config import get_config
+from sqlalchemy import or_, select
+
+from database.models import (
+    Branch,
+    Commit,
+    CommitError,
+    CommitNotification,
+    CommitReport,
+    CompareCommit,
+    CompareFlag,
+    LabelAnalysisRequest,
+    Pull,
+    ReportDetails,
+    ReportLevelTotals,
+    ReportResults,
+    RepositoryFlag,
+    StaticAnalysisSingleFileSnapshot,
+    StaticAnalysisSuite,
+    StaticAnalysisSuiteFilepath,
+    Upload,
+    UploadError,
+    UploadLevelTotals,
+    uploadflagmembership,
+)
+from database.models.labelanalysis import LabelAnalysisProcessingError
+from database.models.reports import CompareComponent
+from helpers.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+CHECKPOINT_TTL = 86400
+
+
+def get_deletion_batch_size() -> int:
+    return get_config("setup", "deletion", "batch_size", default=1000)
+
+
+def _get_table(model_or_table):
+    return getattr(model_or_table, "__table__", model_or_table)
+
+
+@dataclass
+class DeletionNode(object):
+    """
+    Rows of `table` that point (through any of `columns`) to rows being deleted.
+
+    When other tables point to this one, `key` is the column they point to and
+    `children` describe them. Children are always deleted before their parent.
+    """
+
+    table: object
+    columns: Sequence
+    key: Optional[object] = None
+    children: Sequence["DeletionNode"] = ()
+
+    @property
+    def name(self) -> str:
+        return _get_table(self.table).name
+
+
+COMMIT_DEPENDENTS = [
+    DeletionNode(
+        CompareCommit,
+        [CompareCommit.base_commit_id, CompareCommit.compare_commit_id],
+        key=CompareCommit.id_,
+        children=[
+            DeletionNode(CompareFlag, [CompareFlag.commit_comparison_id]),
+            DeletionNode(CompareComponent, [CompareComponent.commit_comparison_id]),
+        ],
+    ),
+    DeletionNode(
+        CommitReport,
+        [CommitReport.commit_id],
+        key=CommitReport.id_,
+        children=[
+            DeletionNode(ReportDetails, [ReportDetails.report_id]),
+            DeletionNode(ReportLevelTotals, [ReportLevelTotals.report_id]),
+            DeletionNode(ReportResults, [ReportResults.report_id]),
+            DeletionNode(
+                Upload,
+                [Upload.report_id],
+                key=Upload.id_,
+                children=[
+                    DeletionNode(UploadError, [UploadError.upload_id]),
+                    DeletionNode(UploadLevelTotals, [UploadLevelTotals.upload_id]),
+                    DeletionNode(
+                        uploadflagmembership, [uploadflagmembership.c.upload_id]
+                    ),
+                ],
+            ),
+        ],
+    ),
+    DeletionNode(CommitError, [CommitError.commit_id]),
+    DeletionNode(CommitNotification, [CommitNotification.commit_id]),
+    DeletionNode(
+        StaticAnalysisSuite,
+        [StaticAnalysisSuite.commit_id],
+        key=StaticAnalysisSuite.id_,
+        children=[
+            DeletionNode(
+                StaticAnalysisSuiteFilepath,
+                [StaticAnalysisSuiteFilepath.analysis_suite_id],
+            )
+        ],
+    ),
+    DeletionNode(
+        LabelAnalysisRequest,
+        [LabelAnalysisRequest.base_commit_id, LabelAnalysisRequest.head_commit_id],
+        key=LabelAnalysisRequest.id_,
+        children=[
+            DeletionNode(
+                LabelAnalysisProcessingError,
+                [LabelAnalysisProcessingError.label_analysis_request_id],
+            )
+        ],
+    ),
+]
+
+SNAPSHOT_DEPENDENTS = [
+    DeletionNode(
+        StaticAnalysisSuiteFilepath, [StaticAnalysisSuiteFilepath.file_snapshot_id]
+    )
+]
+
+
+class DeletionCheckpoint(object):
+    """
+    Remembers how far each step of a deletion got (and how many rows it deleted so
+    far), so a retried task resumes from there instead of scanning everything
+    again. Redis problems are never fatal, they just mean starting the step over.
+    """
+
+    def __init__(self, redis_connection: Redis, name: str, ttl=CHECKPOINT_TTL):
+        self.redis_connection = redis_connection
+        self.key = f"deletion_checkpoint/{name}"
+        self.ttl = ttl
+
+    def _count_field(self, step: str) -> str:
+        return f"{step}/deleted"
+
+    def _hget(self, field: str) -> Optional[str]:
+        try:
+            value = self.redis_connection.hget(self.key, field)
+        except RedisError:
+            log.warning("Unable to fetch deletion checkpoint", exc_info=True)
+            return None
+        if value is None:
+            return None
+        return value.decode() if isinstance(value, bytes) else str(value)
+
+    def get(self, step: str) -> Optional[str]:
+        return self._hget(step)
+
+    def get_deleted(self, step: str) -> int:
+        """
+        How many rows the previous attempts of `step` deleted
+        """
+        value = self._hget(self._count_field(step))
+        try:
+            return int(value) if value is not None else 0
+        except ValueError:
+            return 0
+
+    def set(self, step: str, value, deleted: int = 0) -> None:
+        try:
+            self.redis_connection.hset(
+                self.key,
+                mapping={step: str(value), self._count_field(step): str(deleted)},
+            )
+            self.redis_connection.expire(self.key, self.ttl)
+        except RedisError:
+            log.warning("Unable to save deletion checkpoint", exc_info=True)
+
+    def clear(self) -> None:
+        try:
+            self.redis_connection.delete(self.key)
+        except RedisError:
+            log.warning("Unable to clear deletion checkpoint", exc_info=True)
+
+
+class ChunkedDeletion(object):
+    """
+    Deletes rows a batch at a time, each batch in its own short transaction
+
+    A step pages through the ids of its rows (keyset pagination on `key`). For
+    every page it deletes the rows depending on them (see `DeletionNode`) and then
+    the rows themselves, commits, and saves the last id (and the rows deleted so
+    far) as the checkpoint of the step. Finished steps are skipped when the
+    deletion is resumed, and the counts of the previous attempts are added back.
+    """
+
+    DONE = "done"
+
+    def __init__(
+        self,
+        db_session,
+        checkpoint: DeletionCheckpoint,
+        batch_size: Optional[int] = None,
+    ):
+        self.db_session = db_session
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size or get_deletion_batch_size()
+        self.deleted = Counter()
+
+    def _record(self, table_name: str, count: int) -> None:
+        self.deleted[table_name] += count
+        if count:
+            metrics.incr(f"worker.services.deletion.{table_name}.rows", count)
+
+    def _chunks(self, ids: List) -> List[List]:
+        return [
+            ids[start : start + self.batch_size]
+            for start in range(0, len(ids), self.batch_size)
+        ]
+
+    def _delete_node(self, node: DeletionNode, parent_ids: List) -> None:
+        table = _get_table(node.table)
+        criterion = or_(*[column.in_(parent_ids) for column in node.columns])
+        if node.children:
+            ids = [
+                row[0]
+                for row in self.db_session.execute(select([node.key]).where(criterion))
+            ]
+            for ids_chunk in self._chunks(ids):
+                for child in node.children:
+                    self._delete_node(child, ids_chunk)
+        result = self.db_session.execute(table.delete().where(criterion))
+        self._record(node.name, result.rowcount)
+
+    def delete_in_batches(
+        self,
+        step: str,
+        model,
+        key,
+        criterion,
+        dependents: Sequence[DeletionNode] = (),
+    ) -> int:
+        """
+        Deletes the rows of `model` matching `criterion` (and their `dependents`)
+        in batches of `batch_size`, returns how many rows of `model` were deleted
+        (including by previous attempts)
+        """
+        saved_cursor = self.checkpoint.get(step)
+        if saved_cursor == self.DONE:
+            log.info("Skipping finished deletion step", extra=dict(step=step))
+            return self.checkpoint.get_deleted(step)
+        if saved_cursor is not None:
+            cursor = int(saved_cursor)
+            total_deleted = self.checkpoint.get_deleted(step)
+        else:
+            cursor = None
+            total_deleted = 0
+        table = _get_table(model)
+        while True:
+            start = time.monotonic()
+            query = select([key]).where(criterion)
+            if cursor is not None:
+                query = query.where(key > cursor)
+            ids = [
+                row[0]
+                for row in self.db_session.execute(
+                    query.order_by(key).limit(self.batch_size)
+                )
+            ]
+            if not ids:
+                break
+            for node in dependents:
+                self._delete_node(node, ids)
+            result = self.db_session.execute(table.delete().where(key.in_(ids)))
+            self.db_session.commit()
+            self._record(table.name, result.rowcount)
+            total_deleted += result.rowcount
+            cursor = ids[-1]
+            self.checkpoint.set(step, cursor, deleted=total_deleted)
+            elapsed = time.monotonic() - start
+            metrics.timing(
+                f"worker.services.deletion.{table.name}.batch", elapsed * 1000
+            )
+            if elapsed > 0:
+                metrics.gauge(
+                    f"worker.services.deletion.{table.name}.rows_per_second",
+                    len(ids) / elapsed,
+                )
+        self.checkpoint.set(step, self.DONE, deleted=total_deleted)
+        log.info(
+            "Finished deletion step",
+            extra=dict(step=step, deleted=total_deleted, batch_size=self.batch_size),
+        )
+        return total_deleted
+
+    def delete_all(self, step: str, model, criterion) -> int:
+        """
+        Deletes the rows of `model` matching `criterion` with a single statement, for
+        tables that are expected to stay small
+        """
+        if self.checkpoint.get(step) == self.DONE:
+            return self.checkpoint.get_deleted(step)
+        table = _get_table(model)
+        result = self.db_session.execute(table.delete().where(criterion))
+        self.db_session.commit()
+        self._record(table.name, result.rowcount)
+        self.checkpoint.set(step, self.DONE, deleted=result.rowcount)
+        return result.rowcount
+
+    def finish(self) -> None:
+        log.info("Finished deletion", extra=dict(deleted=dict(self.deleted)))
+        self.checkpoint.clear()
+
+
+def delete_repository_contents(deletion: ChunkedDeletion, repoid: int) -> dict:
+    """
+    Deletes every commit (and everything depending on them), flag, static analysis
+    snapshot, branch and pull of a repository. The repository itself is kept.
+    """
+    deleted_commits = deletion.delete_in_batches(
+        f"{repoid}/commits",
+        Commit,
+        Commit.id_,
+        Commit.repoid == repoid,
+        dependents=COMMIT_DEPENDENTS,
+    )
+    deletion.delete_in_batches(
+        f"{repoid}/static_analysis_snapshots",
+        StaticAnalysisSingleFileSnapshot,
+        StaticAnalysisSingleFileSnapshot.id_,
+        StaticAnalysisSingleFileSnapshot.repository_id == repoid,
+        dependents=SNAPSHOT_DEPENDENTS,
+    )
+    deletion.delete_in_batches(
+        f"{repoid}/flags",
+        RepositoryFlag,
+        RepositoryFlag.id_,
+        RepositoryFlag.repository_id == repoid,
+        dependents=[
+            DeletionNode(CompareFlag, [CompareFlag.repositoryflag_id]),
+            DeletionNode(uploadflagmembership, [uploadflagmembership.c.flag_id]),
+        ],
+    )
+    deleted_pulls = deletion.delete_in_batches(
+        f"{repoid}/pulls", Pull, Pull.id_, Pull.repoid == repoid
+    )
+    deleted_branches = deletion.delete_all(
+        f"{repoid}/branches", Branch, Branch.repoid == repoid
+    )
+    return {
+        "deleted_commits_count": deleted_commits,
+        "delete_branches_count": deleted_branches,
+        "deleted_pulls_count": deleted_pulls,
+    }
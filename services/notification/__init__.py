@@ -7,7 +7,8 @@ This packages uses the following services:
 import asyncio
 import dataclasses
 import logging
-from typing import Iterator, List
+import time
+from typing import Dict, Iterator, List, Optional
 
 from celery.exceptions import CeleryError, SoftTimeLimitExceeded
 from shared.config import get_config
@@ -39,6 +40,32 @@ from services.yaml.reader import get_components_from_yaml
 
 log = logging.getLogger(__name__)
 
+# Default number of notifiers of each concurrency group allowed to run at once
+# (see `AbstractBaseNotifier.concurrency_group`). Overridable through
+# `setup.notifications.concurrency.<group>` in the install yaml
+DEFAULT_NOTIFIER_CONCURRENCY = {"provider": 5, "slack": 5, "webhook": 10}
+# Default deadline (in seconds) given to each individual notifier of a group.
+# Overridable through `setup.notifications.timeouts.<group>`
+DEFAULT_NOTIFIER_DEADLINE = {"provider": 120, "slack": 60, "webhook": 60}
+
+
+def get_notifier_concurrency_group(notifier) -> str:
+    group = getattr(notifier, "concurrency_group", None)
+    if group in DEFAULT_NOTIFIER_CONCURRENCY:
+        return group
+    return "provider"
+
+
+def get_notifier_deadline(notifier) -> Optional[float]:
+    group = get_notifier_concurrency_group(notifier)
+    return get_config(
+        "setup",
+        "notifications",
+        "timeouts",
+        group,
+        default=DEFAULT_NOTIFIER_DEADLINE[group],
+    )
+
 
 class NotificationService(object):
     def __init__(
@@ -189,19 +216,48 @@ class NotificationService(object):
         for notifier in self.get_notifiers_instances():
             if notifier.is_enabled():
                 notification_instances.append(notifier)
-        results = []
-        chunk_size = 3
-        for i in range(0, len(notification_instances), chunk_size):
-            notification_instances_chunk = notification_instances[i : i + chunk_size]
-            task_chunk = [
-                self.notify_individual_notifier(notifier, comparison)
-                for notifier in notification_instances_chunk
-            ]
-            results.extend(await asyncio.gather(*task_chunk))
-        return results
+        # All notifiers are started at once. The per-group semaphores are what
+        # stop us from hammering a single provider, so a slow webhook does not
+        # hold up the statuses and comment that go to the git provider
+        semaphores = self._get_concurrency_semaphores()
+        return list(
+            await asyncio.gather(
+                *[
+                    self._notify_individual_notifier_within_limits(
+                        notifier, comparison, semaphores
+                    )
+                    for notifier in notification_instances
+                ]
+            )
+        )
+
+    def _get_concurrency_semaphores(self) -> Dict[str, asyncio.Semaphore]:
+        return {
+            group: asyncio.Semaphore(
+                get_config(
+                    "setup", "notifications", "concurrency", group, default=default
+                )
+            )
+            for group, default in DEFAULT_NOTIFIER_CONCURRENCY.items()
+        }
+
+    async def _notify_individual_notifier_within_limits(
+        self, notifier, comparison, semaphores: Dict[str, asyncio.Semaphore]
+    ) -> NotificationResult:
+        group = get_notifier_concurrency_group(notifier)
+        queued_at = time.monotonic()
+        async with semaphores[group]:
+            queued_ms = (time.monotonic() - queued_at) * 1000
+            metrics.timing(
+                f"worker.services.notifications.notifiers.{notifier.name}.queued",
+                queued_ms,
+            )
+            return await self.notify_individual_notifier(
+                notifier, comparison, queued_ms=queued_ms
+            )
 
     async def notify_individual_notifier(
-        self, notifier, comparison
+        self, notifier, comparison, queued_ms: Optional[float] = None
     ) -> NotificationResult:
         commit = comparison.head.commit
         base_commit = comparison.base.commit
@@ -215,13 +271,16 @@ class NotificationService(object):
                 repoid=commit.repoid,
                 notifier=notifier.name,
                 notifier_title=notifier.title,
+                concurrency_group=get_notifier_concurrency_group(notifier),
             ),
         )
         try:
             with metrics.timer(
                 f"worker.services.notifications.notifiers.{notifier.name}"
             ) as notify_timer:
-                res = await notifier.notify(comparison)
+                res = await asyncio.wait_for(
+                    notifier.notify(comparison), get_notifier_deadline(notifier)
+                )
             individual_result = {
                 "notifier": notifier.name,
                 "title": notifier.title,
@@ -232,6 +291,7 @@ class NotificationService(object):
                 "Individual notification done",
                 extra=dict(
                     timing_ms=notify_timer.ms,
+                    queued_ms=queued_ms,
                     individual_result=individual_result,
                     commit=commit.commitid,
                     base_commit=base_commit.commitid
@@ -31,6 +31,10 @@ class AbstractBaseNotifier(object):
 
     """
 
+    # Which provider this notifier talks to. NotificationService uses it to pick
+    # the semaphore (and deadline) that bounds how many of these run at once
+    concurrency_group = "provider"
+
     def __init__(
         self,
         repository: Repository,
@@ -67,8 +67,9 @@ class PatchChecksNotifier(StatusPatchMixin, ChecksNotifier):
                     },
                 }
             diff = await self.get_diff(comparison)
-            #  TODO: Look into why the apply diff in get_patch_status is not saving state at this point
-            comparison.head.report.apply_diff(diff)
+            # get_patch_status uses the shared patch totals, which are not saved into
+            # the diff. The annotations need the per-file totals there
+            comparison.apply_diff(diff)
             annotations = self.create_annotations(comparison, diff)
 
             return {
@@ -20,6 +20,7 @@ CODECOV_SLACK_APP_URL = os.environ.get("CODECOV_SLACK_APP_URL")
 
 class CodecovSlackAppNotifier(AbstractBaseNotifier):
     name = "codecov-slack-app"
+    concurrency_group = "slack"
 
     @property
     def notification_type(self) -> Notification:
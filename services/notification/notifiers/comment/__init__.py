@@ -1,5 +1,5 @@
 import logging
-from typing import Any, List, Mapping
+from typing import Any, List, Mapping, Optional
 
 from shared.torngit.exceptions import (
     TorngitClientError,
@@ -10,6 +10,7 @@ from shared.torngit.exceptions import (
 from database.enums import Notification
 from database.models import Pull
 from helpers.metrics import metrics
+from rollouts import PULL_COMMENT_CACHE_BY_REPO_SLUG, repo_slug
 from services.comparison.types import Comparison
 from services.license import requires_license
 from services.notification.notifiers.base import (
@@ -17,6 +18,8 @@ from services.notification.notifiers.base import (
     NotificationResult,
 )
 from services.notification.notifiers.mixins.message import MessageMixin
+from services.notification.notifiers.mixins.message.cache import PullCommentCache
+from services.redis import get_redis_connection
 from services.repository import get_repo_provider_service
 from services.urls import append_tracking_params_to_urls, get_members_url, get_plan_url
 
@@ -49,6 +52,13 @@ class CommentNotifier(MessageMixin, AbstractBaseNotifier):
     def name(self) -> str:
         return "comment"
 
+    def get_comment_cache(self, pullid) -> Optional[PullCommentCache]:
+        if not PULL_COMMENT_CACHE_BY_REPO_SLUG.check_value(
+            repo_slug(self.repository), default=False
+        ):
+            return None
+        return PullCommentCache(get_redis_connection(), self.repository.repoid, pullid)
+
     @property
     def notification_type(self) -> Notification:
         return Notification.comment
@@ -57,11 +67,10 @@ class CommentNotifier(MessageMixin, AbstractBaseNotifier):
         return await comparison.get_diff()
 
     async def has_enough_changes(self, comparison):
-        diff = await comparison.get_diff()
         changes = await comparison.get_changes()
         if changes:
             return True
-        res = comparison.head.report.calculate_diff(diff)
+        res = await comparison.get_diff_coverage()
         if res is not None and res["general"].lines > 0:
             return True
         return False
@@ -201,6 +210,28 @@ class CommentNotifier(MessageMixin, AbstractBaseNotifier):
         )
 
         behavior = self.notifier_yaml_settings.get("behavior", "default")
+        comment_cache = self.get_comment_cache(data["pullid"])
+        if (
+            comment_cache is not None
+            and behavior in ("default", "once")
+            and data["commentid"]
+            and comment_cache.is_same_as_posted(data["commentid"], message)
+        ):
+            log.info(
+                "Not editing comment because its content did not change",
+                extra=dict(
+                    repoid=self.repository.repoid,
+                    pullid=data["pullid"],
+                    commentid=data["commentid"],
+                ),
+            )
+            return NotificationResult(
+                notification_attempted=False,
+                notification_successful=None,
+                explanation="comment_unchanged",
+                data_sent=data,
+                data_received={"id": data["commentid"]},
+            )
         if behavior == "default":
             res = await self.send_comment_default_behavior(
                 data["pullid"], data["commentid"], message
@@ -217,6 +248,13 @@ class CommentNotifier(MessageMixin, AbstractBaseNotifier):
             res = await self.send_comment_spammy_behavior(
                 data["pullid"], data["commentid"], message
             )
+        if (
+            comment_cache is not None
+            and res["notification_successful"]
+            and res["data_received"]
+            and res["data_received"].get("id")
+        ):
+            comment_cache.set_posted(res["data_received"]["id"], message)
         return NotificationResult(
             notification_attempted=res["notification_attempted"],
             notification_successful=res["notification_successful"],
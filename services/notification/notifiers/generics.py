@@ -34,6 +34,8 @@ class StandardNotifier(AbstractBaseNotifier):
     - Check that the threshold of the webhook is satisfied on this comparison
     """
 
+    concurrency_group = "webhook"
+
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self._repository_service = None
@@ -1,5 +1,5 @@
 import logging
-from typing import Callable
+from typing import Callable, Optional
 
 from shared.reports.resources import Report, ReportTotals
 from shared.validation.helpers import LayoutStructure
@@ -7,6 +7,10 @@ from shared.validation.helpers import LayoutStructure
 from helpers.environment import is_enterprise
 from helpers.metrics import metrics
 from services.comparison import ComparisonProxy
+from services.notification.notifiers.mixins.message.cache import (
+    PullCommentCache,
+    get_section_fingerprint,
+)
 from services.notification.notifiers.mixins.message.helpers import (
     should_message_be_compact,
 )
@@ -21,6 +25,13 @@ log = logging.getLogger(__name__)
 
 
 class MessageMixin(object):
+    def get_comment_cache(self, pullid) -> Optional[PullCommentCache]:
+        """Cache used to reuse rendered sections across notifies of the same pull
+
+        Only the PR comment keeps one. Other users of this mixin render from scratch.
+        """
+        return None
+
     async def create_message(
         self, comparison: ComparisonProxy, pull_dict, yaml_settings
     ):
@@ -43,6 +54,9 @@ class MessageMixin(object):
         base_report = comparison.base.report
         head_report = comparison.head.report
         pull = comparison.pull
+        section_cache = (
+            self.get_comment_cache(pull.pullid) if pull is not None else None
+        )
 
         settings = yaml_settings
 
@@ -86,7 +100,14 @@ class MessageMixin(object):
             )
 
             await self.write_section_to_msg(
-                comparison, changes, diff, links, write, section_writer, behind_by
+                comparison,
+                changes,
+                diff,
+                links,
+                write,
+                section_writer,
+                behind_by,
+                section_cache=section_cache,
             )
 
         is_compact_message = should_message_be_compact(comparison, settings)
@@ -132,6 +153,7 @@ class MessageMixin(object):
                     links,
                     write,
                     section_writer,
+                    section_cache=section_cache,
                 )
 
             if is_compact_message:
@@ -157,6 +179,7 @@ class MessageMixin(object):
                         links,
                         write,
                         section_writer,
+                        section_cache=section_cache,
                     )
 
         return [m for m in message if m is not None]
@@ -176,15 +199,35 @@ class MessageMixin(object):
             write("")
 
     async def write_section_to_msg(
-        self, comparison, changes, diff, links, write, section_writer, behind_by=None
+        self,
+        comparison,
+        changes,
+        diff,
+        links,
+        write,
+        section_writer,
+        behind_by=None,
+        section_cache: Optional[PullCommentCache] = None,
     ):
-        with metrics.timer(
-            f"worker.services.notifications.notifiers.comment.section.{section_writer.name}"
-        ):
-            for line in await section_writer.write_section(
-                comparison, diff, changes, links, behind_by=behind_by
+        fingerprint = None
+        if section_cache is not None:
+            fingerprint = await get_section_fingerprint(
+                section_writer, comparison, diff, changes, links, behind_by=behind_by
+            )
+        lines = None
+        if fingerprint is not None:
+            lines = section_cache.get_section(section_writer.layout, fingerprint)
+        if lines is None:
+            with metrics.timer(
+                f"worker.services.notifications.notifiers.comment.section.{section_writer.name}"
             ):
-                write(line)
+                lines = await section_writer.write_section(
+                    comparison, diff, changes, links, behind_by=behind_by
+                )
+            if fingerprint is not None:
+                section_cache.set_section(section_writer.layout, fingerprint, lines)
+        for line in lines:
+            write(line)
 
         write("")
 
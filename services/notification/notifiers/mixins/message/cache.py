@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+from typing import List, Optional
+
+from redis import Redis
+from redis.exceptions import RedisError
+from shared.yaml import UserYaml
+
+from helpers.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+
+async def get_section_fingerprint(
+    section_writer, comparison, diff, changes, links, behind_by=None
+) -> Optional[str]:
+    """Hashes everything a section is rendered from
+
+    Besides the yaml/comment settings and the links, each section only hashes the
+    data it renders (see `BaseSectionWriter.get_render_inputs`), so a new upload
+    that doesn't change those leaves the section as it was. Returns None for
+    sections that depend on something else (so they can't be reused).
+    """
+    if not section_writer.is_cacheable():
+        return None
+    current_yaml = section_writer.current_yaml
+    if isinstance(current_yaml, UserYaml):
+        current_yaml = current_yaml.to_dict()
+    inputs = {
+        "section": section_writer.name,
+        "layout": section_writer.layout,
+        "show_complexity": section_writer.show_complexity,
+        "settings": section_writer.settings,
+        "yaml": current_yaml,
+        "links": links,
+        "rendered_from": await section_writer.get_render_inputs(
+            comparison, diff, changes, links, behind_by=behind_by
+        ),
+    }
+    encoded = json.dumps(inputs, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class PullCommentCache(object):
+    """Remembers what was last rendered (and posted) as the PR comment of a pull
+
+    - The lines of each comment section, together with the fingerprint of the inputs
+        they were rendered from
+    - A hash of the last comment body sent to the provider, and the id of that comment
+
+    The sections expire after `ttl` seconds. The hash of the body only lives for
+    `posted_ttl` seconds after the comment is actually sent, so a comment deleted on
+    the provider is posted again by the first notify after that. Redis problems (or
+    unreadable entries) are never fatal, they just mean we render (and send) the
+    comment again.
+    """
+
+    def __init__(
+        self,
+        redis_connection: Redis,
+        repoid: int,
+        pullid: int,
+        ttl=86400,
+        posted_ttl=300,
+    ):
+        self.redis_connection = redis_connection
+        self.sections_key = f"pull_comment_cache/{repoid}/{pullid}/sections"
+        self.body_key = f"pull_comment_cache/{repoid}/{pullid}/body"
+        self.ttl = ttl
+        self.posted_ttl = posted_ttl
+
+    @staticmethod
+    def _load(raw_value) -> Optional[dict]:
+        try:
+            value = json.loads(raw_value)
+        except ValueError:
+            log.warning("Unable to read comment cache entry", exc_info=True)
+            return None
+        return value if isinstance(value, dict) else None
+
+    @staticmethod
+    def hash_body(message: str) -> str:
+        return hashlib.sha256(message.encode()).hexdigest()
+
+    def get_section(self, layout: str, fingerprint: str) -> Optional[List[str]]:
+        try:
+            raw_value = self.redis_connection.hget(self.sections_key, layout)
+        except RedisError:
+            log.warning("Unable to fetch cached comment section", exc_info=True)
+            return None
+        if raw_value is None:
+            metrics.incr("worker.services.notifications.comment.section_cache.miss")
+            return None
+        value = self._load(raw_value)
+        if (
+            value is None
+            or value.get("fingerprint") != fingerprint
+            or not isinstance(value.get("lines"), list)
+        ):
+            metrics.incr("worker.services.notifications.comment.section_cache.miss")
+            return None
+        metrics.incr("worker.services.notifications.comment.section_cache.hit")
+        return value["lines"]
+
+    def set_section(self, layout: str, fingerprint: str, lines: List[str]) -> None:
+        try:
+            self.redis_connection.hset(
+                self.sections_key,
+                layout,
+                json.dumps({"fingerprint": fingerprint, "lines": lines}),
+            )
+            self.redis_connection.expire(self.sections_key, self.ttl)
+        except RedisError:
+            log.warning("Unable to cache comment section", exc_info=True)
+
+    def is_same_as_posted(self, commentid, message: str) -> bool:
+        try:
+            raw_value = self.redis_connection.get(self.body_key)
+        except RedisError:
+            log.warning("Unable to fetch last posted comment hash", exc_info=True)
+            return False
+        if raw_value is None:
+            return False
+        value = self._load(raw_value)
+        if value is None or str(value.get("commentid")) != str(commentid):
+            return False
+        return value.get("body_hash") == self.hash_body(message)
+
+    def set_posted(self, commentid, message: str) -> None:
+        try:
+            self.redis_connection.set(
+                self.body_key,
+                json.dumps(
+                    {"commentid": commentid, "body_hash": self.hash_body(message)}
+                ),
+                ex=self.posted_ttl,
+            )
+        except RedisError:
+            log.warning("Unable to save last posted comment hash", exc_info=True)
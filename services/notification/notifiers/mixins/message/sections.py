@@ -3,13 +3,13 @@ import random
 from base64 import b64encode
 from decimal import Decimal
 from itertools import starmap
-from typing import List
+from typing import List, Optional
 
 from shared.helpers.yaml import walk
 from shared.reports.resources import Report
 
 from helpers.reports import get_totals_from_file_in_reports
-from services.comparison import ComparisonProxy
+from services.comparison import ComparisonProxy, artifact_key
 from services.comparison.overlays import OverlayType
 from services.notification.notifiers.mixins.message.helpers import (
     diff_to_string,
@@ -27,6 +27,75 @@ from services.yaml.reader import get_components_from_yaml, round_number
 log = logging.getLogger(__name__)
 
 
+def _get_report_totals(report):
+    # reports without files are rendered like missing ones
+    return report.totals if report else None
+
+
+def _get_report_state(report) -> Optional[dict]:
+    if report is None:
+        return None
+    return {
+        "totals": report.totals,
+        "sessions": sorted(
+            (str(sessionid), sorted(session.flags or []))
+            for sessionid, session in report.sessions.items()
+        ),
+    }
+
+
+def _get_pull_refs(pull_dict) -> Optional[dict]:
+    if pull_dict is None:
+        return None
+    return {
+        side: {
+            "branch": pull_dict[side].get("branch"),
+            "commitid": pull_dict[side].get("commitid"),
+        }
+        for side in ("base", "head")
+        if pull_dict.get(side)
+    }
+
+
+def _get_header_render_inputs(comparison, diff, behind_by) -> dict:
+    return {
+        "base": comparison.base.commit.commitid
+        if comparison.base.commit is not None
+        else None,
+        "head": comparison.head.commit.commitid,
+        "base_totals": _get_report_totals(comparison.base.report),
+        "head_totals": _get_report_totals(comparison.head.report),
+        "patch_totals": comparison.apply_diff(diff),
+        "pullid": comparison.pull.pullid if comparison.pull is not None else None,
+        "pull": _get_pull_refs(comparison.enriched_pull.provider_pull),
+        "service": comparison.head.commit.repository.service,
+        "behind_by": behind_by,
+    }
+
+
+def _get_files_render_inputs(comparison, diff, changes) -> dict:
+    files_in_diff = diff["files"] if diff else {}
+    paths = sorted(set(files_in_diff) | set(c.path for c in changes or []))
+    return {
+        # the per-file totals are saved into the diff by the header sections
+        "diff": [
+            (path, files_in_diff[path]["type"], files_in_diff[path].get("totals"))
+            for path in sorted(files_in_diff)
+        ],
+        "changes": sorted(c.path for c in changes or []),
+        "base_files": [
+            get_totals_from_file_in_reports(comparison.base.report, path)
+            if comparison.base.report is not None
+            else None
+            for path in paths
+        ],
+        "head_files": [
+            get_totals_from_file_in_reports(comparison.head.report, path)
+            for path in paths
+        ],
+    }
+
+
 def get_section_class_from_layout_name(layout_name):
     if layout_name.startswith("flag"):
         return FlagSectionWriter
@@ -66,16 +135,47 @@ class BaseSectionWriter(object):
     def name(self):
         return self.__class__.__name__
 
+    def is_cacheable(self) -> bool:
+        # Critical paths come from profiling data, which is not part of the comparison
+        return not self.settings.get("show_critical_paths", False)
+
+    async def get_render_inputs(
+        self, comparison, diff, changes, links, behind_by=None
+    ) -> dict:
+        """
+        What the lines of the section are rendered from, besides the settings and
+        the links. The section is reused for as long as these stay the same, so
+        unless a section says otherwise it's the whole state of the comparison.
+        """
+        return {
+            "head": comparison.head.commit.commitid,
+            "base": comparison.base.commit.commitid
+            if comparison.base.commit is not None
+            else None,
+            "head_report": _get_report_state(comparison.head.report),
+            "base_report": _get_report_state(comparison.base.report),
+            "provider_pull": comparison.enriched_pull.provider_pull,
+            "behind_by": behind_by,
+        }
+
     async def write_section(self, *args, **kwargs):
         return [i async for i in self.do_write_section(*args, **kwargs)]
 
 
 class NullSectionWriter(BaseSectionWriter):
+    def is_cacheable(self) -> bool:
+        return False
+
     async def write_section(*args, **kwargs):
         return []
 
 
 class NewFooterSectionWriter(BaseSectionWriter):
+    async def get_render_inputs(
+        self, comparison, diff, changes, links, behind_by=None
+    ) -> dict:
+        return {"service": comparison.head.commit.repository.service}
+
     async def do_write_section(self, comparison, diff, changes, links, behind_by=None):
         hide_project_coverage = self.settings.get("hide_project_coverage", False)
         if hide_project_coverage:
@@ -103,6 +203,11 @@ class NewFooterSectionWriter(BaseSectionWriter):
 
 
 class NewHeaderSectionWriter(BaseSectionWriter):
+    async def get_render_inputs(
+        self, comparison, diff, changes, links, behind_by=None
+    ) -> dict:
+        return _get_header_render_inputs(comparison, diff, behind_by)
+
     async def do_write_section(self, comparison, diff, changes, links, behind_by=None):
         yaml = self.current_yaml
         base_report = comparison.base.report
@@ -111,7 +216,7 @@ class NewHeaderSectionWriter(BaseSectionWriter):
         pull_dict = comparison.enriched_pull.provider_pull
         repo_service = comparison.repository_service.service
 
-        diff_totals = head_report.apply_diff(diff)
+        diff_totals = comparison.apply_diff(diff)
         if diff_totals:
             misses_and_partials = diff_totals.misses + diff_totals.partials
         else:
@@ -202,6 +307,11 @@ class NewHeaderSectionWriter(BaseSectionWriter):
 
 
 class HeaderSectionWriter(BaseSectionWriter):
+    async def get_render_inputs(
+        self, comparison, diff, changes, links, behind_by=None
+    ) -> dict:
+        return _get_header_render_inputs(comparison, diff, behind_by)
+
     async def do_write_section(self, comparison, diff, changes, links, behind_by=None):
         yaml = self.current_yaml
         base_report = comparison.base.report
@@ -254,7 +364,7 @@ class HeaderSectionWriter(BaseSectionWriter):
                 f"> Report is {behind_by} commits behind head on {pull_dict['base']['branch']}."
             )
 
-        diff_totals = head_report.apply_diff(diff)
+        diff_totals = comparison.apply_diff(diff)
         if diff_totals and diff_totals.coverage is not None:
             yield (
                 "> The diff coverage is `{0}%`.".format(
@@ -316,6 +426,9 @@ class AnnouncementSectionWriter(BaseSectionWriter):
         #   "Codecov can now indicate which changes are the most critical in Pull Requests. [Learn more](https://about.codecov.io/product/feature/runtime-insights/)"  # This is disabled as of CODE-1885. But we might bring it back later.
     ]
 
+    def is_cacheable(self) -> bool:
+        return False
+
     async def do_write_section(self, comparison: ComparisonProxy, *args, **kwargs):
         if self._potential_ats_user(comparison):
             message_to_display = AnnouncementSectionWriter.ats_message
@@ -358,6 +471,9 @@ class AnnouncementSectionWriter(BaseSectionWriter):
 
 
 class ImpactedEntrypointsSectionWriter(BaseSectionWriter):
+    def is_cacheable(self) -> bool:
+        return False
+
     async def do_write_section(self, comparison, diff, changes, links, behind_by=None):
         overlay = comparison.get_overlay(OverlayType.line_execution_count)
         impacted_endpoints = await overlay.find_impacted_endpoints()
@@ -371,6 +487,11 @@ class ImpactedEntrypointsSectionWriter(BaseSectionWriter):
 
 
 class FooterSectionWriter(BaseSectionWriter):
+    async def get_render_inputs(
+        self, comparison, diff, changes, links, behind_by=None
+    ) -> dict:
+        return {"pull": _get_pull_refs(comparison.enriched_pull.provider_pull)}
+
     async def do_write_section(self, comparison, diff, changes, links, behind_by=None):
         pull_dict = comparison.enriched_pull.provider_pull
         yield ("------")
@@ -397,6 +518,12 @@ class FooterSectionWriter(BaseSectionWriter):
 
 
 class ReachSectionWriter(BaseSectionWriter):
+    async def get_render_inputs(
+        self, comparison, diff, changes, links, behind_by=None
+    ) -> dict:
+        pull = comparison.enriched_pull.database_pull
+        return {"pullid": pull.pullid, "image_token": pull.repository.image_token}
+
     async def do_write_section(self, comparison, diff, changes, links, behind_by=None):
         pull = comparison.enriched_pull.database_pull
         yield (
@@ -415,6 +542,16 @@ class ReachSectionWriter(BaseSectionWriter):
 
 
 class DiffSectionWriter(BaseSectionWriter):
+    async def get_render_inputs(
+        self, comparison, diff, changes, links, behind_by=None
+    ) -> dict:
+        return {
+            "pull": _get_pull_refs(comparison.enriched_pull.provider_pull),
+            "pullid": comparison.enriched_pull.database_pull.pullid,
+            "base_totals": _get_report_totals(comparison.base.report),
+            "head_totals": _get_report_totals(comparison.head.report),
+        }
+
     async def do_write_section(self, comparison, diff, changes, links, behind_by=None):
         base_report = comparison.base.report
         head_report = comparison.head.report
@@ -436,6 +573,11 @@ class DiffSectionWriter(BaseSectionWriter):
 
 
 class NewFilesSectionWriter(BaseSectionWriter):
+    async def get_render_inputs(
+        self, comparison, diff, changes, links, behind_by=None
+    ) -> dict:
+        return _get_files_render_inputs(comparison, diff, changes)
+
     async def do_write_section(self, comparison, diff, changes, links, behind_by=None):
         # create list of files changed in diff
         base_report = comparison.base.report
@@ -518,6 +660,11 @@ class NewFilesSectionWriter(BaseSectionWriter):
 
 
 class FileSectionWriter(BaseSectionWriter):
+    async def get_render_inputs(
+        self, comparison, diff, changes, links, behind_by=None
+    ) -> dict:
+        return _get_files_render_inputs(comparison, diff, changes)
+
     async def do_write_section(self, comparison, diff, changes, links, behind_by=None):
         # create list of files changed in diff
         base_report = comparison.base.report
@@ -611,8 +758,7 @@ class FileSectionWriter(BaseSectionWriter):
 
 
 class FlagSectionWriter(BaseSectionWriter):
-    async def do_write_section(self, comparison, diff, changes, links, behind_by=None):
-        # flags
+    def _get_table_data_for_flags(self, comparison, diff) -> List[dict]:
         base_report = comparison.base.report
         head_report = comparison.head.report
         if base_report is None:
@@ -634,7 +780,11 @@ class FlagSectionWriter(BaseSectionWriter):
                         "name": name,
                         "before": get_totals_from_file_in_reports(base_flags, name),
                         "after": flag.totals,
-                        "diff": flag.apply_diff(diff)
+                        "diff": comparison.artifacts.get_or_compute(
+                            "patch_totals",
+                            artifact_key([name], None),
+                            lambda: flag.apply_diff(diff, _save=False),
+                        )
                         if walk(diff, ("files",))
                         else None,
                         "carriedforward": flag.carriedforward,
@@ -653,6 +803,22 @@ class FlagSectionWriter(BaseSectionWriter):
                     "carriedforward_from": None,
                 }
             )
+        return flags
+
+    async def get_render_inputs(
+        self, comparison, diff, changes, links, behind_by=None
+    ) -> dict:
+        return {
+            "flags": [
+                # the flags missing on head are the whole base flag
+                dict(flag, before=getattr(flag["before"], "totals", flag["before"]))
+                for flag in self._get_table_data_for_flags(comparison, diff)
+            ]
+        }
+
+    async def do_write_section(self, comparison, diff, changes, links, behind_by=None):
+        show_carriedforward_flags = self.settings.get("show_carryforward_flags", False)
+        flags = self._get_table_data_for_flags(comparison, diff)
 
         # TODO: get icons working
         # flag_icon_url = ""
@@ -750,7 +916,6 @@ class ComponentsSectionWriter(BaseSectionWriter):
             filtered_comparison = comparison.get_filtered_comparison(
                 flags, component.paths
             )
-            diff = await filtered_comparison.get_diff()
             component_data.append(
                 {
                     "name": component.get_display_name(),
@@ -758,13 +923,20 @@ class ComponentsSectionWriter(BaseSectionWriter):
                     if filtered_comparison.base.report is not None
                     else None,
                     "after": filtered_comparison.head.report.totals,
-                    "diff": filtered_comparison.head.report.apply_diff(
-                        diff, _save=False
-                    ),
+                    "diff": await filtered_comparison.get_patch_totals(),
                 }
             )
         return component_data
 
+    async def get_render_inputs(
+        self, comparison, diff, changes, links, behind_by=None
+    ) -> dict:
+        return {
+            "components": await self._get_table_data_for_components(
+                get_components_from_yaml(self.current_yaml), comparison
+            )
+        }
+
     async def do_write_section(
         self, comparison: ComparisonProxy, diff, changes, links, behind_by=None
     ):
@@ -11,8 +11,7 @@ log = logging.getLogger(__name__)
 class StatusPatchMixin(object):
     async def get_patch_status(self, comparison) -> Tuple[str, str]:
         threshold = Decimal(self.notifier_yaml_settings.get("threshold") or "0.0")
-        diff = await self.get_diff(comparison)
-        totals = comparison.head.report.apply_diff(diff)
+        totals = await comparison.get_patch_totals()
         if self.notifier_yaml_settings.get("target") not in ("auto", None):
             target_coverage = Decimal(
                 str(self.notifier_yaml_settings.get("target")).replace("%", "")
@@ -233,8 +232,7 @@ class StatusProjectMixin(object):
                 extra=dict(commit=comparison.head.commit.commitid),
             )
             return None
-        diff = await self.get_diff(comparison)
-        patch_totals = comparison.head.report.apply_diff(diff)
+        patch_totals = await comparison.get_patch_totals()
         if patch_totals is None or patch_totals.lines == 0:
             # Coverage was not changed by patch
             return ("success", ", passed because coverage was not affected by patch")
@@ -7,6 +7,7 @@ from services.urls import get_commit_url, get_graph_url
 
 
 class SlackNotifier(RequestsYamlBasedNotifier):
+    concurrency_group = "slack"
 
     BASE_MESSAGE = " ".join(
         [
@@ -0,0 +1,243 @@
+import pytest
+from redis.exceptions import ConnectionError
+from shared.reports.types import ReportTotals
+
+from services.notification.notifiers.comment import CommentNotifier
+from services.notification.notifiers.mixins.message.cache import (
+    PullCommentCache,
+    get_section_fingerprint,
+)
+from services.notification.notifiers.mixins.message.sections import (
+    AnnouncementSectionWriter,
+    FooterSectionWriter,
+    HeaderSectionWriter,
+)
+
+
+class FakeRedis(object):
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def hget(self, key, field):
+        return self.values.get(key, {}).get(field)
+
+    def hset(self, key, field, value):
+        self.values.setdefault(key, {})[field] = value
+
+    def expire(self, key, ttl):
+        pass
+
+
+@pytest.fixture
+def comment_cache_enabled(mocker):
+    fake_redis = FakeRedis()
+    mocker.patch(
+        "services.notification.notifiers.comment.PULL_COMMENT_CACHE_BY_REPO_SLUG.check_value",
+        return_value=True,
+    )
+    mocker.patch(
+        "services.notification.notifiers.comment.get_redis_connection",
+        return_value=fake_redis,
+    )
+    return fake_redis
+
+
+class TestPullCommentCache(object):
+    def test_section_roundtrip(self):
+        cache = PullCommentCache(FakeRedis(), 1, 2)
+        assert cache.get_section("footer", "abc") is None
+        cache.set_section("footer", "abc", ["line", ""])
+        assert cache.get_section("footer", "abc") == ["line", ""]
+        assert cache.get_section("footer", "other_fingerprint") is None
+
+    def test_is_same_as_posted(self):
+        cache = PullCommentCache(FakeRedis(), 1, 2)
+        assert not cache.is_same_as_posted(123, "message")
+        cache.set_posted(123, "message")
+        assert cache.is_same_as_posted(123, "message")
+        assert cache.is_same_as_posted("123", "message")
+        assert not cache.is_same_as_posted(123, "other message")
+        assert not cache.is_same_as_posted(124, "message")
+
+    def test_posted_body_expires_sooner(self, mocker):
+        redis_connection = mocker.MagicMock()
+        cache = PullCommentCache(redis_connection, 1, 2, ttl=100, posted_ttl=10)
+        cache.set_posted(123, "message")
+        assert redis_connection.set.call_args.kwargs["ex"] == 10
+
+    def test_corrupt_entries_are_misses(self):
+        redis_connection = FakeRedis()
+        cache = PullCommentCache(redis_connection, 1, 2)
+        redis_connection.values[cache.body_key] = b"not json"
+        redis_connection.values[cache.sections_key] = {
+            "footer": b"\xff{",
+            "header": b"[]",
+            "files": b'{"fingerprint": "abc"}',
+        }
+        assert not cache.is_same_as_posted(123, "message")
+        assert cache.get_section("footer", "abc") is None
+        assert cache.get_section("header", "abc") is None
+        assert cache.get_section("files", "abc") is None
+
+    def test_redis_errors_are_not_fatal(self, mocker):
+        redis_connection = mocker.MagicMock(
+            get=mocker.MagicMock(side_effect=ConnectionError()),
+            hget=mocker.MagicMock(side_effect=ConnectionError()),
+            hset=mocker.MagicMock(side_effect=ConnectionError()),
+        )
+        cache = PullCommentCache(redis_connection, 1, 2)
+        assert cache.get_section("footer", "abc") is None
+        cache.set_section("footer", "abc", ["line"])
+        assert not cache.is_same_as_posted(123, "message")
+
+
+class TestGetSectionFingerprint(object):
+    @pytest.mark.asyncio
+    async def test_fingerprint(self, sample_comparison):
+        writer = FooterSectionWriter(None, "footer", False, {"layout": "footer"}, {})
+        links = {"pull": "https://app.codecov.io/gh/test/pull/1"}
+        fingerprint = await get_section_fingerprint(
+            writer, sample_comparison, None, None, links
+        )
+        assert fingerprint is not None
+        assert fingerprint == await get_section_fingerprint(
+            writer, sample_comparison, None, None, links
+        )
+        other_settings_writer = FooterSectionWriter(
+            None,
+            "footer",
+            False,
+            {"layout": "footer", "hide_project_coverage": True},
+            {},
+        )
+        assert fingerprint != await get_section_fingerprint(
+            other_settings_writer, sample_comparison, None, None, links
+        )
+        assert fingerprint != await get_section_fingerprint(
+            writer, sample_comparison, None, None, {"pull": "other"}
+        )
+
+    @pytest.mark.asyncio
+    async def test_fingerprint_only_what_the_section_renders(
+        self, sample_comparison, mocker
+    ):
+        links = {"pull": "https://app.codecov.io/gh/test/pull/1"}
+        footer = FooterSectionWriter(None, "footer", False, {}, {})
+        header = HeaderSectionWriter(None, "header", False, {}, {})
+        footer_fingerprint = await get_section_fingerprint(
+            footer, sample_comparison, None, None, links
+        )
+        header_fingerprint = await get_section_fingerprint(
+            header, sample_comparison, None, None, links
+        )
+        # the footer doesn't render behind_by
+        assert footer_fingerprint == await get_section_fingerprint(
+            footer, sample_comparison, None, None, links, behind_by=3
+        )
+        assert header_fingerprint != await get_section_fingerprint(
+            header, sample_comparison, None, None, links, behind_by=3
+        )
+        # nor the coverage of the head report
+        mocker.patch.object(
+            type(sample_comparison.head.report),
+            "totals",
+            new_callable=mocker.PropertyMock,
+            return_value=ReportTotals(files=2, lines=20, hits=3, coverage="15.00000"),
+        )
+        assert footer_fingerprint == await get_section_fingerprint(
+            footer, sample_comparison, None, None, links
+        )
+        assert header_fingerprint != await get_section_fingerprint(
+            header, sample_comparison, None, None, links
+        )
+
+    @pytest.mark.asyncio
+    async def test_fingerprint_not_cacheable(self, sample_comparison):
+        writer = AnnouncementSectionWriter(None, "announcements", False, {}, {})
+        assert (
+            await get_section_fingerprint(writer, sample_comparison, None, None, {})
+            is None
+        )
+        critical_writer = FooterSectionWriter(
+            None, "footer", False, {"show_critical_paths": True}, {}
+        )
+        assert (
+            await get_section_fingerprint(
+                critical_writer, sample_comparison, None, None, {}
+            )
+            is None
+        )
+
+
+class TestCommentNotifierWithCache(object):
+    @pytest.mark.asyncio
+    async def test_send_actual_notification_skips_unchanged_comment(
+        self,
+        dbsession,
+        mock_configuration,
+        mock_repo_provider,
+        sample_comparison,
+        comment_cache_enabled,
+    ):
+        notifier = CommentNotifier(
+            repository=sample_comparison.head.commit.repository,
+            title="title",
+            notifier_yaml_settings={"layout": "reach, diff, flags, files, footer"},
+            notifier_site_settings=True,
+            current_yaml={},
+        )
+        mock_repo_provider.edit_comment.return_value = {"id": "12345"}
+        data = {"message": ["message"], "commentid": "12345", "pullid": 98}
+        result = await notifier.send_actual_notification(data)
+        assert result.notification_attempted
+        assert mock_repo_provider.edit_comment.call_count == 1
+
+        result = await notifier.send_actual_notification(data)
+        assert not result.notification_attempted
+        assert result.explanation == "comment_unchanged"
+        assert result.data_received == {"id": "12345"}
+        assert mock_repo_provider.edit_comment.call_count == 1
+
+        data = {"message": ["new message"], "commentid": "12345", "pullid": 98}
+        result = await notifier.send_actual_notification(data)
+        assert result.notification_attempted
+        assert mock_repo_provider.edit_comment.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_create_message_reuses_sections(
+        self,
+        dbsession,
+        mock_configuration,
+        mock_repo_provider,
+        sample_comparison,
+        comment_cache_enabled,
+        mocker,
+    ):
+        mock_configuration.params["setup"]["codecov_dashboard_url"] = "test.example.br"
+        notifier = CommentNotifier(
+            repository=sample_comparison.head.commit.repository,
+            title="title",
+            notifier_yaml_settings={"layout": "reach, diff, flags, files, footer"},
+            notifier_site_settings=True,
+            current_yaml={},
+        )
+        pull_dict = sample_comparison.enriched_pull.provider_pull
+        settings = {"layout": "reach, diff, flags, files, footer"}
+        first_message = await notifier.create_message(
+            sample_comparison, pull_dict, settings
+        )
+        write_section = mocker.spy(FooterSectionWriter, "write_section")
+        second_message = await notifier.create_message(
+            sample_comparison, pull_dict, settings
+        )
+        assert first_message == second_message
+        assert not write_section.called
+        assert any(
+            key.endswith("/sections") for key in comment_cache_enabled.values.keys()
+        )
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from asyncio import CancelledError
 from asyncio import TimeoutError as AsyncioTimeoutError
@@ -12,9 +13,18 @@ from database.enums import Decoration, Notification, NotificationState
 from database.tests.factories import CommitFactory, PullFactory, RepositoryFactory
 from services.comparison import ComparisonProxy
 from services.comparison.types import Comparison, EnrichedPull, FullCommit
-from services.notification import NotificationService
+from services.notification import (
+    NotificationService,
+    get_notifier_concurrency_group,
+)
 from services.notification.notifiers.base import NotificationResult
 from services.notification.notifiers.checks import ProjectChecksNotifier
+from services.notification.notifiers.checks.checks_with_fallback import (
+    ChecksWithFallback,
+)
+from services.notification.notifiers.codecov_slack_app import CodecovSlackAppNotifier
+from services.notification.notifiers.slack import SlackNotifier
+from services.notification.notifiers.webhook import WebhookNotifier
 
 
 @pytest.fixture
@@ -570,3 +580,90 @@ class TestNotificationService(object):
             )
         )
         assert expected_result == res
+
+    def test_get_notifier_concurrency_group(self, mocker):
+        assert get_notifier_concurrency_group(mocker.MagicMock()) == "provider"
+        assert (
+            get_notifier_concurrency_group(
+                ChecksWithFallback(
+                    checks_notifier=mocker.MagicMock(), status_notifier=None
+                )
+            )
+            == "provider"
+        )
+        assert WebhookNotifier.concurrency_group == "webhook"
+        assert SlackNotifier.concurrency_group == "slack"
+        assert CodecovSlackAppNotifier.concurrency_group == "slack"
+
+    @pytest.mark.asyncio
+    async def test_notify_respects_concurrency_group_limits(
+        self, mocker, dbsession, sample_comparison, mock_configuration
+    ):
+        mock_configuration._params["setup"] = {
+            "notifications": {"concurrency": {"provider": 1, "webhook": 2}}
+        }
+        running = {"provider": 0, "webhook": 0}
+        max_running = {"provider": 0, "webhook": 0}
+
+        def build_notifier(name, group):
+            async def notify(comparison):
+                running[group] += 1
+                max_running[group] = max(max_running[group], running[group])
+                await asyncio.sleep(0.01)
+                running[group] -= 1
+                return NotificationResult(
+                    notification_attempted=False,
+                    notification_successful=None,
+                    explanation="no_need_to_send",
+                    data_sent=None,
+                )
+
+            notifier = mocker.MagicMock(
+                is_enabled=mocker.MagicMock(return_value=True),
+                notify=notify,
+                title=name,
+                concurrency_group=group,
+                notification_type=Notification.comment,
+                decoration_type=Decoration.standard,
+            )
+            notifier.name = name
+            return notifier
+
+        notifiers = [build_notifier(f"provider_{i}", "provider") for i in range(3)]
+        notifiers += [build_notifier(f"webhook_{i}", "webhook") for i in range(4)]
+        mocker.patch.object(
+            NotificationService, "get_notifiers_instances", return_value=notifiers
+        )
+        commit = sample_comparison.head.commit
+        notifications_service = NotificationService(commit.repository, {})
+        res = await notifications_service.notify(sample_comparison)
+        assert [r["title"] for r in res] == [n.title for n in notifiers]
+        assert max_running == {"provider": 1, "webhook": 2}
+
+    @pytest.mark.asyncio
+    async def test_notify_individual_notifier_deadline(
+        self, mocker, sample_comparison, mock_configuration
+    ):
+        mock_configuration._params["setup"] = {
+            "notifications": {"timeouts": {"provider": 0.01}}
+        }
+
+        async def notify(comparison):
+            await asyncio.sleep(1)
+
+        notifier = mocker.MagicMock(
+            title="slow_notifier",
+            notify=notify,
+            notification_type=Notification.comment,
+            decoration_type=Decoration.standard,
+        )
+        commit = sample_comparison.head.commit
+        notifications_service = NotificationService(commit.repository, {})
+        res = await notifications_service.notify_individual_notifier(
+            notifier, sample_comparison
+        )
+        assert res == {
+            "notifier": notifier.name,
+            "result": None,
+            "title": "slow_notifier",
+        }
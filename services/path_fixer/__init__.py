@@ -1,3 +1,4 @@
+import hashlib
 import logging
 import os.path
 import random
@@ -98,6 +99,18 @@ class PathFixer(object):
             return None
         return path
 
+    def get_configuration_key(self) -> str:
+        """
+        Digest of everything the paths this fixer returns depend on
+        """
+        configuration = (
+            self.yaml_fixes,
+            sorted(self.path_patterns),
+            self.toc,
+            bool(self.should_disable_default_pathfixes),
+        )
+        return hashlib.sha256(repr(configuration).encode()).hexdigest()
+
     def resolver(self, path: str, ancestors=None):
         return _resolve_path(self.tree, path, ancestors)
 
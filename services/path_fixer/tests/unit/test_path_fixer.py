@@ -45,6 +45,25 @@ class TestPathFixer(BaseTestCase):
             pf("simple/notapath/to/something.py") == "simple/notapath/to/something.py"
         )
 
+    def test_get_configuration_key(self):
+        key = PathFixer(
+            ["before/::after/"], ["!simple"], ["a.py"]
+        ).get_configuration_key()
+        assert (
+            PathFixer(
+                ["before/::after/"], ["!simple"], ["a.py"]
+            ).get_configuration_key()
+            == key
+        )
+        assert (
+            PathFixer(["before/::after/"], ["!simple"], []).get_configuration_key()
+            != key
+        )
+        assert PathFixer([], ["!simple"], ["a.py"]).get_configuration_key() != key
+        assert (
+            PathFixer(["before/::after/"], [], ["a.py"]).get_configuration_key() != key
+        )
+
     def test_init_from_user_yaml(self):
         commit_yaml = {
             "fixes": [r"(?s:before/tests\-[^\/]+)::after/"],
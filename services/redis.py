@@ -1,12 +1,56 @@
 import logging
+import time
 import zlib
 from typing import Optional
 
-from redis import Redis
+from redis import BlockingConnectionPool, Redis
 from shared.config import get_config
 
+from helpers.metrics import metrics
+
 log = logging.getLogger(__name__)
 
+_connection_pools = {}
+
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """
+    Connection pool that waits (up to `timeout` seconds) for a connection when all
+    `max_connections` are in use, and reports how it's being used. The wait of
+    every checkout is timed, the usage gauges are only sent at most once every
+    `usage_report_interval` seconds.
+    """
+
+    metrics_prefix = "worker.redis.pool"
+    usage_report_interval = 10
+
+    def reset(self):
+        self.in_use = 0
+        self._usage_reported_at = None
+        super().reset()
+
+    def _report_usage(self):
+        now = time.monotonic()
+        if (
+            self._usage_reported_at is not None
+            and now - self._usage_reported_at < self.usage_report_interval
+        ):
+            return
+        self._usage_reported_at = now
+        metrics.gauge(f"{self.metrics_prefix}.in_use", self.in_use)
+        metrics.gauge(f"{self.metrics_prefix}.connections", len(self._connections))
+
+    def get_connection(self, command_name, *keys, **options):
+        with metrics.timer(f"{self.metrics_prefix}.checkout_wait"):
+            connection = super().get_connection(command_name, *keys, **options)
+        self.in_use += 1
+        self._report_usage()
+        return connection
+
+    def release(self, connection):
+        super().release(connection)
+        self.in_use = max(self.in_use - 1, 0)
+
 
 def get_redis_url() -> str:
     url = get_config("services", "redis_url")
@@ -22,8 +66,37 @@ def get_redis_connection() -> Redis:
     return _get_redis_instance_from_url(url)
 
 
-def _get_redis_instance_from_url(url) -> Redis:
-    return Redis.from_url(url)
+def get_redis_lock_connection() -> Redis:
+    """
+    Connection to take task locks with. With `setup.redis.separate_lock_pool` it
+    comes from a pool of its own, so tasks waiting on locks can't use up the
+    connections everything else needs.
+    """
+    url = get_redis_url()
+    if get_config("setup", "redis", "separate_lock_pool", default=False):
+        return _get_redis_instance_from_url(url, pool_name="locks")
+    return _get_redis_instance_from_url(url)
+
+
+def _get_connection_pool(url, pool_name) -> InstrumentedConnectionPool:
+    # pools are per process, redis-py resets them in forked children
+    pool = _connection_pools.get((url, pool_name))
+    if pool is None:
+        pool = InstrumentedConnectionPool.from_url(
+            url,
+            max_connections=get_config("setup", "redis", "max_connections", default=50),
+            timeout=get_config("setup", "redis", "pool_timeout", default=20),
+            health_check_interval=get_config(
+                "setup", "redis", "health_check_interval", default=30
+            ),
+        )
+        pool.metrics_prefix = f"worker.redis.pool.{pool_name}"
+        _connection_pools[(url, pool_name)] = pool
+    return pool
+
+
+def _get_redis_instance_from_url(url, pool_name="default") -> Redis:
+    return Redis(connection_pool=_get_connection_pool(url, pool_name))
 
 
 def download_archive_from_redis(
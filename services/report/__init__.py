@@ -19,6 +19,7 @@ from shared.reports.resources import Report
 from shared.reports.types import ReportFileSummary, ReportTotals
 from shared.storage.exceptions import FileNotInStorageError
 from shared.torngit.exceptions import TorngitError
+from shared.utils.match import match
 from shared.utils.sessions import Session, SessionType
 from shared.yaml import UserYaml
 
@@ -39,7 +40,20 @@ from helpers.exceptions import (
     RepositoryWithoutValidBotError,
 )
 from helpers.labels import get_all_report_labels, get_labels_per_session
+from rollouts import (
+    PARSED_FILE_CACHE_BY_REPO_SLUG,
+    PARTIAL_REPORT_LOADING_BY_REPO_SLUG,
+    repo_slug,
+)
 from services.archive import ArchiveService
+from services.report.chunk_loading import (
+    compress_chunks,
+    read_chunks_partially,
+)
+from services.report.parsed_file_cache import (
+    ParsedFileCache,
+    get_commit_parsed_file_cache,
+)
 from services.report.parser import get_proper_parser
 from services.report.parser.types import ParsedRawReport
 from services.report.raw_upload_processor import process_raw_upload
@@ -107,6 +121,17 @@ class ReportService(object):
             current_yaml = UserYaml(current_yaml)
         self.current_yaml = current_yaml
 
+    def get_parsed_file_cache(self, commit: Commit) -> Optional[ParsedFileCache]:
+        """
+        The files parsed for the uploads of `commit` by any task of this worker
+            process, when enabled for its repository
+        """
+        if not PARSED_FILE_CACHE_BY_REPO_SLUG.check_value(
+            repo_slug(commit.repository), default=False
+        ):
+            return None
+        return get_commit_parsed_file_cache(commit.repoid, commit.commitid)
+
     def has_initialized_report(self, commit: Commit) -> bool:
         """Says whether a commit has already initialized its report or not
 
@@ -417,21 +442,94 @@ class ReportService(object):
                 chunks=chunks, files=files, sessions=sessions, totals=totals
             )
 
+    def should_load_partially(self, commit: Commit) -> bool:
+        return PARTIAL_REPORT_LOADING_BY_REPO_SLUG.check_value(
+            repo_slug(commit.repository), default=False
+        )
+
     def get_archive_service(self, repository: Repository) -> ArchiveService:
         return ArchiveService(repository)
 
     async def build_report_from_commit(self, commit) -> Report:
         return await self._do_build_report_from_commit(commit)
 
+    def _files_matching_paths(self, files, paths: Optional[Sequence[str]]):
+        """
+        Restricts the per-file index of a report to the files matching `paths`, so
+        the chunks of every other file are never parsed
+        """
+        if paths is None:
+            return files
+        return {
+            filename: summary
+            for filename, summary in files.items()
+            if match(paths, filename)
+        }
+
+    def _read_chunks(
+        self,
+        archive_service: ArchiveService,
+        commit: Commit,
+        report_code,
+        files,
+        paths: Optional[Sequence[str]],
+    ) -> str:
+        """
+        Reads the chunks of the report of `commit`. When the report is only loaded
+        for some `paths`, just the chunks of their `files` are downloaded if the
+        chunks were saved with an index (the rest of the chunks are left empty).
+        """
+        if paths is not None and self.should_load_partially(commit):
+            try:
+                chunks_index = archive_service.read_chunks_index(
+                    commit.commitid, report_code
+                )
+                chunks = read_chunks_partially(
+                    lambda start, end: archive_service.read_chunks_range(
+                        commit.commitid, start, end, report_code
+                    ),
+                    chunks_index,
+                    [
+                        summary.file_index
+                        if isinstance(summary, ReportFileSummary)
+                        else summary[0]
+                        for summary in files.values()
+                    ],
+                )
+            except Exception:
+                log.warning(
+                    "Unable to read the chunks of the report partially",
+                    extra=dict(
+                        commit=commit.commitid,
+                        repo=commit.repoid,
+                        report_code=report_code,
+                    ),
+                    exc_info=True,
+                )
+                chunks = None
+            if chunks is not None:
+                metrics.incr("worker.services.report.partial_loading.success")
+                return chunks
+            metrics.incr("worker.services.report.partial_loading.fallback")
+        return archive_service.read_chunks(commit.commitid, report_code)
+
     def get_existing_report_for_commit_from_legacy_data(
-        self, commit: Commit, report_class=None, *, report_code=None
+        self,
+        commit: Commit,
+        report_class=None,
+        *,
+        report_code=None,
+        paths: Optional[Sequence[str]] = None,
     ) -> Optional[Report]:
         commitid = commit.commitid
         if commit._report_json is None and commit._report_json_storage_path is None:
             return None
+        files = self._files_matching_paths(commit.report_json["files"], paths)
         try:
             archive_service = self.get_archive_service(commit.repository)
-            chunks = archive_service.read_chunks(commitid, report_code)
+            chunks = self._read_chunks(
+                archive_service, commit, report_code, files, paths
+            )
         except FileNotInStorageError:
             log.warning(
                 "File for chunks not found in storage",
@@ -442,9 +540,9 @@ class ReportService(object):
             return None
         if chunks is None:
             return None
-        files = commit.report_json["files"]
         sessions = commit.report_json["sessions"]
-        totals = commit.totals
+        # the stored totals are the ones of the whole report
+        totals = commit.totals if paths is None else None
         res = self.build_report(
             chunks, files, sessions, totals, report_class=report_class
         )
@@ -463,8 +561,19 @@ class ReportService(object):
 
     @sentry_sdk.trace
     def get_existing_report_for_commit(
-        self, commit: Commit, report_class=None, *, report_code=None
+        self,
+        commit: Commit,
+        report_class=None,
+        *,
+        report_code=None,
+        paths: Optional[Sequence[str]] = None,
     ) -> Optional[Report]:
+        """
+        Loads the report of `commit` from storage. When `paths` is given only the
+        files matching those path patterns are part of the returned report (and its
+        totals are calculated from them), and only their chunks are downloaded when
+        partial loading is enabled for the repo.
+        """
         commit_report = commit.report
         if commit_report is None:
             log.warning(
@@ -472,7 +581,7 @@ class ReportService(object):
                 extra=dict(commitid=commit.commitid),
             )
             return self.get_existing_report_for_commit_from_legacy_data(
-                commit, report_class=report_class, report_code=report_code
+                commit, report_class=report_class, report_code=report_code, paths=paths
             )
 
         # TODO: this can be removed once confirmed working well on prod
@@ -485,7 +594,7 @@ class ReportService(object):
         )
         if not new_report_builder_enabled:
             return self.get_existing_report_for_commit_from_legacy_data(
-                commit, report_class=report_class, report_code=report_code
+                commit, report_class=report_class, report_code=report_code, paths=paths
             )
 
         commitid = commit.commitid
@@ -493,12 +602,16 @@ class ReportService(object):
         files = {}
         sessions = self.build_sessions(commit)
         if commit_report.details:
-            files = self.build_files(commit_report.details)
-        if commit_report.totals:
+            files = self._files_matching_paths(
+                self.build_files(commit_report.details), paths
+            )
+        if commit_report.totals and paths is None:
             totals = self.build_totals(commit_report.totals)
         try:
             archive_service = self.get_archive_service(commit.repository)
-            chunks = archive_service.read_chunks(commitid, report_code)
+            chunks = self._read_chunks(
+                archive_service, commit, report_code, files, paths
+            )
         except FileNotInStorageError:
             log.warning(
                 "File for chunks not found in storage",
@@ -792,6 +905,7 @@ class ReportService(object):
                     flags,
                     session,
                     upload=upload,
+                    parsed_file_cache=self.get_parsed_file_cache(commit),
                 )
                 report = result.report
             log.info(
@@ -892,7 +1006,29 @@ class ReportService(object):
         totals, network_json_str = report.to_database()
         network = loads(network_json_str)
         archive_data = report.to_archive().encode()
-        url = archive_service.write_chunks(commit.commitid, archive_data, report_code)
+        if self.should_load_partially(commit):
+            # gzipped a chunk at a time so the chunks of some files can be read (and
+            # decompressed) on their own with the byte ranges of the index
+            archive_data, chunks_index = compress_chunks(archive_data)
+            url = archive_service.write_chunks(
+                commit.commitid, archive_data, report_code, is_already_gzipped=True
+            )
+            try:
+                archive_service.write_chunks_index(
+                    commit.commitid, chunks_index, report_code
+                )
+            except Exception:
+                # the frames are checked when reading them, so a missing or stale
+                # index only has the report read in full
+                log.warning(
+                    "Unable to save the index of the chunks",
+                    extra=dict(commit=commit.commitid, repoid=commit.repoid),
+                    exc_info=True,
+                )
+        else:
+            url = archive_service.write_chunks(
+                commit.commitid, archive_data, report_code
+            )
         commit.state = "complete" if report else "error"
         commit.totals = totals
         if (
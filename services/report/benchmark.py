@@ -0,0 +1,413 @@
+import json
+import logging
+import random
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from io import BytesIO
+from typing import Callable, Dict, Iterable, List
+
+from shared.reports.resources import Report
+from shared.yaml.user_yaml import UserYaml
+
+from services.path_fixer import PathFixer
+from services.report.parser.types import ParsedUploadedReportFile
+from services.report.report_builder import (
+    CoverageType,
+    ReportBuilder,
+    yaml_supports_labels,
+)
+from services.report.report_processor import process_report
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TOLERANCE = 0.1
+
+
+def _coverage_values(rng: random.Random, count: int) -> List[int]:
+    # roughly 70% of the lines hit, like a typical codebase
+    return [rng.choice((0, 0, 0, 1, 1, 2, 5, 12, 40, 100)) for _ in range(count)]
+
+
+def _generate_cobertura(rng: random.Random, files: int, lines: int) -> bytes:
+    parts = ['<?xml version="1.0" ?>\n<coverage version="7.2.7">\n<packages>']
+    parts.append('<package name="src"><classes>')
+    for file_number in range(files):
+        filename = f"src/module_{file_number}/file_{file_number}.py"
+        parts.append(
+            f'<class name="file_{file_number}.py" filename="{filename}"><lines>'
+        )
+        for ln, hits in enumerate(_coverage_values(rng, lines), start=1):
+            if ln % 7 == 0:
+                covered = min(hits, 2)
+                parts.append(
+                    f'<line number="{ln}" hits="{hits}" branch="true"'
+                    f' condition-coverage="{covered * 50}% ({covered}/2)"/>'
+                )
+            else:
+                parts.append(f'<line number="{ln}" hits="{hits}"/>')
+        parts.append("</lines></class>")
+    parts.append("</classes></package>\n</packages>\n</coverage>\n")
+    return "\n".join(parts).encode()
+
+
+def _generate_jacoco(rng: random.Random, files: int, lines: int) -> bytes:
+    parts = ['<?xml version="1.0" ?>\n<report name="project">']
+    parts.append('<package name="com/example/app">')
+    for file_number in range(files):
+        parts.append(
+            f'<class name="com/example/app/File{file_number}">'
+            f'<method name="run" desc="()V" line="1">'
+            f'<counter type="COMPLEXITY" missed="1" covered="2"/></method></class>'
+        )
+        parts.append(f'<sourcefile name="File{file_number}.java">')
+        for ln, hits in enumerate(_coverage_values(rng, lines), start=1):
+            if ln % 7 == 0:
+                covered = min(hits, 2)
+                parts.append(
+                    f'<line nr="{ln}" mi="0" ci="{hits}" mb="{2 - covered}"'
+                    f' cb="{covered}"/>'
+                )
+            else:
+                missed = 0 if hits else 3
+                parts.append(
+                    f'<line nr="{ln}" mi="{missed}" ci="{hits}" mb="0" cb="0"/>'
+                )
+        parts.append("</sourcefile>")
+    parts.append("</package>\n</report>\n")
+    return "\n".join(parts).encode()
+
+
+def _istanbul_location(ln: int, start: int, end: int) -> dict:
+    return {"start": {"line": ln, "column": start}, "end": {"line": ln, "column": end}}
+
+
+def _generate_node(rng: random.Random, files: int, lines: int) -> bytes:
+    report = {}
+    for file_number in range(files):
+        statements, counts = {}, {}
+        branches, branch_counts = {}, {}
+        functions, function_counts = {}, {}
+        for ln, hits in enumerate(_coverage_values(rng, lines), start=1):
+            statements[str(ln)] = _istanbul_location(ln, 0, 30)
+            counts[str(ln)] = hits
+            if ln % 7 == 0:
+                branches[str(ln)] = {
+                    "type": "if",
+                    "loc": _istanbul_location(ln, 0, 30),
+                    "locations": [
+                        _istanbul_location(ln, 4, 12),
+                        _istanbul_location(ln, 14, 30),
+                    ],
+                }
+                branch_counts[str(ln)] = [hits, min(hits, 1)]
+            if ln % 25 == 1:
+                functions[str(ln)] = {
+                    "name": f"function_{ln}",
+                    "decl": _istanbul_location(ln, 9, 20),
+                    "loc": _istanbul_location(ln, 0, 30),
+                }
+                function_counts[str(ln)] = hits
+        path = f"src/module_{file_number}/file_{file_number}.js"
+        report[path] = {
+            "path": path,
+            "statementMap": statements,
+            "fnMap": functions,
+            "branchMap": branches,
+            "s": counts,
+            "f": function_counts,
+            "b": branch_counts,
+        }
+    return json.dumps(report).encode()
+
+
+def _generate_gcov(rng: random.Random, files: int, lines: int) -> bytes:
+    # a gcov report only ever describes one file
+    parts = ["        -:    0:Source:src/main.c", "        -:    0:Runs:1"]
+    for ln, hits in enumerate(_coverage_values(rng, files * lines), start=1):
+        parts.append(f"{hits or '#####':>9}:{ln:>5}:    value_{ln} = compute();")
+        if ln % 7 == 0:
+            parts.append(f"branch  0 taken {hits}")
+            parts.append("branch  1 taken 0")
+    return ("\n".join(parts) + "\n").encode()
+
+
+def _generate_lcov(rng: random.Random, files: int, lines: int) -> bytes:
+    parts = []
+    for file_number in range(files):
+        parts.append("TN:")
+        parts.append(f"SF:src/module_{file_number}/file_{file_number}.c")
+        parts.append("FN:1,main")
+        parts.append("FNDA:1,main")
+        for ln, hits in enumerate(_coverage_values(rng, lines), start=1):
+            parts.append(f"DA:{ln},{hits}")
+            if ln % 7 == 0:
+                parts.append(f"BRDA:{ln},0,0,{hits or '-'}")
+                parts.append(f"BRDA:{ln},0,1,0")
+        parts.append(f"LF:{lines}")
+        parts.append("end_of_record")
+    return ("\n".join(parts) + "\n").encode()
+
+
+def _generate_go(rng: random.Random, files: int, lines: int) -> bytes:
+    parts = ["mode: count"]
+    for file_number in range(files):
+        filename = f"github.com/example/project/module_{file_number}/file.go"
+        for ln, hits in enumerate(_coverage_values(rng, lines), start=1):
+            parts.append(f"{filename}:{ln}.2,{ln}.30 1 {hits}")
+    return ("\n".join(parts) + "\n").encode()
+
+
+def _generate_pycoverage(rng: random.Random, files: int, lines: int) -> bytes:
+    report_files = {}
+    for file_number in range(files):
+        coverage = _coverage_values(rng, lines)
+        report_files[f"src/module_{file_number}/file_{file_number}.py"] = {
+            "executed_lines": [ln for ln, hits in enumerate(coverage, 1) if hits],
+            "missing_lines": [ln for ln, hits in enumerate(coverage, 1) if not hits],
+            "excluded_lines": [],
+            "summary": {"num_statements": lines},
+        }
+    report = {
+        "meta": {
+            "version": "7.2.7",
+            "timestamp": "2023-06-01T00:00:00",
+            "branch_coverage": False,
+            "show_contexts": False,
+        },
+        "files": report_files,
+        "totals": {"num_statements": files * lines},
+    }
+    return json.dumps(report).encode()
+
+
+def _generate_simplecov(rng: random.Random, files: int, lines: int) -> bytes:
+    report = {
+        "timestamp": 1685577600,
+        "command_name": "RSpec",
+        "files": [
+            {
+                "filename": f"lib/module_{file_number}/file_{file_number}.rb",
+                "coverage": {"lines": _coverage_values(rng, lines)},
+            }
+            for file_number in range(files)
+        ],
+    }
+    return json.dumps(report).encode()
+
+
+REPORT_GENERATORS: Dict[str, Callable[[random.Random, int, int], bytes]] = {
+    "cobertura": _generate_cobertura,
+    "jacoco": _generate_jacoco,
+    "node": _generate_node,
+    "gcov": _generate_gcov,
+    "lcov": _generate_lcov,
+    "go": _generate_go,
+    "pycoverage": _generate_pycoverage,
+    "simplecov": _generate_simplecov,
+}
+
+
+def generate_report(
+    report_format: str, files: int, lines_per_file: int, seed: int = 0
+) -> bytes:
+    """
+    A synthetic `report_format` report of `files` files of `lines_per_file` lines
+    each. The same arguments always generate the same report.
+    """
+    return REPORT_GENERATORS[report_format](random.Random(seed), files, lines_per_file)
+
+
+@dataclass
+class BenchmarkResult(object):
+    report_format: str
+    size: int
+    lines: int
+    seconds: float
+    peak_rss: int
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.size / 1_000_000 / self.seconds
+
+    @property
+    def lines_per_second(self) -> float:
+        return self.lines / self.seconds
+
+    def to_dict(self) -> dict:
+        return dict(
+            asdict(self),
+            mb_per_second=self.mb_per_second,
+            lines_per_second=self.lines_per_second,
+        )
+
+
+def _reset_peak_rss() -> None:
+    """
+    Lowers the peak RSS of the process to its current RSS, so what was allocated
+    before (like the generated report) doesn't count. Only possible on linux.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        log.warning("Unable to reset the peak RSS", exc_info=True)
+
+
+def _get_peak_rss() -> int:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # linux reports it in kilobytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def process_generated_report(contents: bytes, filename: str) -> Report:
+    """
+    Processes `contents` the way an uploaded file is, with an empty commit yaml
+    """
+    commit_yaml = UserYaml({})
+    path_fixer = PathFixer.init_from_user_yaml(
+        commit_yaml=commit_yaml, toc=None, flags=[]
+    )
+    report_builder = ReportBuilder(
+        commit_yaml,
+        0,
+        {},
+        path_fixer.get_relative_path_aware_pathfixer(filename),
+    )
+    report = process_report(
+        report=ParsedUploadedReportFile(filename, BytesIO(contents)),
+        report_builder=report_builder,
+    )
+    if not report:
+        raise ValueError("No processor matched the generated report")
+    return report
+
+
+def _time_processing(contents: bytes, filename: str) -> float:
+    start = time.perf_counter()
+    process_generated_report(contents, filename)
+    return time.perf_counter() - start
+
+
+def run_parser_benchmark(
+    report_format: str,
+    files: int,
+    lines_per_file: int,
+    repeat: int = 3,
+) -> BenchmarkResult:
+    """
+    Processes a generated `report_format` report `repeat` times and keeps the
+    fastest run. The peak RSS is measured from after the report was generated.
+    """
+    contents = generate_report(report_format, files, lines_per_file)
+    filename = f"coverage.{report_format}"
+    _reset_peak_rss()
+    seconds = min(_time_processing(contents, filename) for _ in range(repeat))
+    lines = lines_per_file * files
+    return BenchmarkResult(
+        report_format=report_format,
+        size=len(contents),
+        lines=lines,
+        seconds=seconds,
+        peak_rss=_get_peak_rss(),
+    )
+
+
+def run_parser_benchmarks(
+    report_formats: Iterable[str],
+    files: int,
+    lines_per_file: int,
+    repeat: int = 3,
+) -> List[BenchmarkResult]:
+    """
+    Runs the benchmark of each format in a new process, so the peak RSS of one
+    format isn't hidden by the previous ones
+    """
+    results = []
+    for report_format in report_formats:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(
+                run_parser_benchmark,
+                report_format,
+                files,
+                lines_per_file,
+                repeat,
+            ).result()
+        log.info("Finished parser benchmark", extra=result.to_dict())
+        results.append(result)
+    return results
+
+
+# a commit yaml with a few flags, that doesn't use labels
+LINE_OVERHEAD_YAML = {
+    "flag_management": {
+        "default_rules": {"carryforward": True, "carryforward_mode": "all"},
+        "individual_flags": [
+            {"name": f"flag_{number}", "paths": [f"src/module_{number}/"]}
+            for number in range(10)
+        ],
+    },
+    "parsers": {"cobertura": {"partials_as_hits": True}},
+}
+
+
+class _UncachedReportBuilder(ReportBuilder):
+    # reads the yaml for every line, like before the parser settings existed
+    def supports_labels(self) -> bool:
+        return yaml_supports_labels(self.current_yaml)
+
+
+def measure_line_overhead(
+    lines: int = 100_000, current_yaml: dict = LINE_OVERHEAD_YAML, cached=True
+) -> float:
+    """
+    Nanoseconds `create_coverage_line` takes per line
+    """
+    builder_class = ReportBuilder if cached else _UncachedReportBuilder
+    session = builder_class(
+        UserYaml(current_yaml), 0, {}, None
+    ).create_report_builder_session("coverage.xml")
+    start = time.perf_counter()
+    for ln in range(lines):
+        session.create_coverage_line("file.py", ln % 3, coverage_type=CoverageType.line)
+    return (time.perf_counter() - start) / lines * 1e9
+
+
+def results_to_baseline(results: Iterable[BenchmarkResult]) -> dict:
+    return {result.report_format: result.to_dict() for result in results}
+
+
+def compare_to_baseline(
+    results: Iterable[BenchmarkResult],
+    baseline: dict,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> List[str]:
+    """
+    Describes every format whose throughput dropped, or whose peak RSS grew, by
+    more than `tolerance` (a fraction) compared to `baseline`
+    """
+    regressions = []
+    for result in results:
+        expected = baseline.get(result.report_format)
+        if expected is None:
+            continue
+        for field, current, reference in (
+            ("mb_per_second", result.mb_per_second, expected["mb_per_second"]),
+            ("lines_per_second", result.lines_per_second, expected["lines_per_second"]),
+        ):
+            if current < reference * (1 - tolerance):
+                regressions.append(
+                    f"{result.report_format}: {field} went from {reference:.2f} to {current:.2f}"
+                )
+        if result.peak_rss > expected["peak_rss"] * (1 + tolerance):
+            regressions.append(
+                f"{result.report_format}: peak_rss went from {expected['peak_rss']} to {result.peak_rss}"
+            )
+    return regressions
@@ -0,0 +1,138 @@
+import gzip
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+END_OF_CHUNK = b"<<<<< end_of_chunk >>>>>"
+# 3: the index has the byte ranges of the gzip frames the chunks are compressed in
+CHUNKS_INDEX_VERSION = 3
+# consecutive chunks are compressed together until their frame has this many
+# bytes, so small chunks don't each pay for a gzip header and a new dictionary
+FRAME_SIZE = 64 * 1024
+
+
+def compress_chunks(
+    archive_data: bytes, frame_size: int = FRAME_SIZE
+) -> Tuple[bytes, Dict]:
+    """
+    Gzips an encoded chunks file in frames of consecutive chunks (with the markers
+    that follow them), so the chunks of a few files can be read from storage and
+    decompressed without the whole file.
+
+    Returns the concatenated frames, which are still a valid gzip file of the whole
+    chunks file, and their index (see `build_chunks_index`).
+    """
+    chunks = archive_data.split(END_OF_CHUNK)
+    frames = []
+    first = 0
+    size = 0
+    for end, chunk in enumerate(chunks, start=1):
+        size += len(chunk) + len(END_OF_CHUNK)
+        if size < frame_size and end < len(chunks):
+            continue
+        data = END_OF_CHUNK.join(chunks[first:end])
+        if end < len(chunks):
+            data += END_OF_CHUNK
+        frames.append((gzip.compress(data, mtime=0), end - first))
+        first = end
+        size = 0
+    return b"".join(frame for frame, _ in frames), build_chunks_index(frames)
+
+
+def build_chunks_index(frames: List[Tuple[bytes, int]]) -> Dict:
+    """
+    Byte range and number of chunks of every `(frame, chunks_count)` of a chunks
+    file compressed with `compress_chunks`. The chunk of the file with
+    `file_index` i is the i-th chunk across the frames.
+    """
+    index = []
+    start = 0
+    for frame, chunks_count in frames:
+        index.append([start, start + len(frame), chunks_count])
+        start += len(frame)
+    return {"version": CHUNKS_INDEX_VERSION, "frames": index}
+
+
+def _empty_chunk(index: int, chunks_count: int) -> bytes:
+    # what is left between two markers by a chunk with no lines
+    return b"\n" * ((index > 0) + (index < chunks_count - 1))
+
+
+def _decompress_frame(
+    frame: bytes, chunks_count: int, is_last: bool
+) -> Optional[List[bytes]]:
+    try:
+        data = gzip.decompress(frame)
+    except (OSError, EOFError, zlib.error):
+        return None
+    chunks = data.split(END_OF_CHUNK)
+    # every frame but the last one ends with a marker
+    if not is_last and chunks.pop() != b"":
+        return None
+    if len(chunks) != chunks_count:
+        return None
+    return chunks
+
+
+def read_chunks_partially(
+    read_range: Callable[[int, int], bytes],
+    chunks_index: Dict,
+    file_indexes: Iterable[int],
+    max_gap: int = 64 * 1024,
+    max_reads: int = 50,
+) -> Optional[str]:
+    """
+    The chunks file described by `chunks_index` with only the chunks of
+    `file_indexes` in it, the other ones are left empty (like the chunks of deleted
+    files). The frames they are in are fetched with `read_range(start, end)`, one
+    read for the frames that are less than `max_gap` bytes apart.
+
+    Returns None when the index doesn't match the file it is read against or when
+    it would take more than `max_reads` reads, so the whole file is read instead.
+    """
+    if not chunks_index or chunks_index.get("version") != CHUNKS_INDEX_VERSION:
+        return None
+    frame_ranges = chunks_index["frames"]
+    # the frame every chunk is in, and its position in it
+    chunk_frames = [
+        (frame_number, position)
+        for frame_number, (_, _, chunks_count) in enumerate(frame_ranges)
+        for position in range(chunks_count)
+    ]
+    chunks_count = len(chunk_frames)
+    needed = sorted(set(file_indexes))
+    if needed and (needed[0] < 0 or needed[-1] >= chunks_count):
+        return None
+
+    groups = []
+    for frame_number in sorted({chunk_frames[index][0] for index in needed}):
+        start, end, _ = frame_ranges[frame_number]
+        if groups and start - groups[-1][1] <= max_gap:
+            groups[-1][1] = end
+            groups[-1][2].append(frame_number)
+        else:
+            groups.append([start, end, [frame_number]])
+    if len(groups) > max_reads:
+        return None
+
+    frames = {}
+    for start, end, frame_numbers in groups:
+        data = read_range(start, end)
+        if len(data) != end - start:
+            return None
+        for frame_number in frame_numbers:
+            frame_start, frame_end, frame_chunks_count = frame_ranges[frame_number]
+            frames[frame_number] = _decompress_frame(
+                data[frame_start - start : frame_end - start],
+                frame_chunks_count,
+                is_last=frame_number == len(frame_ranges) - 1,
+            )
+            if frames[frame_number] is None:
+                return None
+
+    needed = set(needed)
+    return END_OF_CHUNK.join(
+        frames[frame_number][position]
+        if index in needed
+        else _empty_chunk(index, chunks_count)
+        for index, (frame_number, position) in enumerate(chunk_frames)
+    ).decode(errors="replace")
@@ -1,68 +1,179 @@
-from typing import Any, Callable, Dict
+from array import array
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Union
 
 
-def get_fixes_from_raw(content, fix: Callable) -> Dict[str, Dict[str, Any]]:
+class LineRanges(object):
+    """
+    Set of line numbers kept as sorted, non overlapping, inclusive ranges
+
+    A whole `LCOV_EXCL_START`/`LCOV_EXCL_STOP` block is a single range instead of
+    one entry per line. It works wherever the sets of lines it replaces did
+    (`ReportFile(ignore=...)` only checks `ln in lines` and iterates them), and
+    membership is a bisect over the starts of the ranges.
+    """
+
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self, ranges: Iterable[Tuple[int, int]] = ()):
+        self._starts = array("q")
+        self._ends = array("q")
+        last_end = None
+        for start, end in sorted(ranges):
+            if start > end:
+                continue
+            if last_end is not None and start <= last_end + 1:
+                if end > last_end:
+                    last_end = self._ends[-1] = end
+            else:
+                self._starts.append(start)
+                self._ends.append(end)
+                last_end = end
+
+    @property
+    def ranges(self) -> List[Tuple[int, int]]:
+        return list(zip(self._starts, self._ends))
+
+    def __contains__(self, ln) -> bool:
+        index = bisect_right(self._starts, ln) - 1
+        return index >= 0 and ln <= self._ends[index]
+
+    def __iter__(self):
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end + 1)
+
+    def __len__(self) -> int:
+        return sum(end - start + 1 for start, end in zip(self._starts, self._ends))
+
+    def __bool__(self) -> bool:
+        return bool(self._starts)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, LineRanges):
+            return self._starts == other._starts and self._ends == other._ends
+        if isinstance(other, (set, frozenset)):
+            return len(self) == len(other) and all(ln in self for ln in other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"LineRanges({self.ranges!r})"
+
+
+def _consecutive_runs(sorted_lines: List[int]) -> Iterable[Tuple[int, int]]:
+    """
+    The runs of consecutive lines of `sorted_lines`, as inclusive ranges
+    """
+    start = end = None
+    for ln in sorted_lines:
+        if end is not None and ln <= end + 1:
+            if ln > end:
+                end = ln
+            continue
+        if start is not None:
+            yield start, end
+        start = end = ln
+    if start is not None:
+        yield start, end
+
+
+def _parse_line_number(value: bytes):
+    value = value.strip()
+    return value if value.isdigit() else None
+
+
+def get_fixes_from_raw(
+    content: Union[bytes, str], fix: Callable
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Lines to ignore (and the end of the file, when given) of every file listed in
+    the `# path=fixes` section of an upload:
+
+        EOF: 188 ./file.kt
+        file.go:5,10,20
+        file.go:21:  /* the source of line 21
+
+    Comment blocks (`/*` to `*/`, `LCOV_EXCL_START` to `LCOV_EXCL_STOP`) ignore the
+    lines in between them too. Lines that can't be read are skipped.
+    """
+    if isinstance(content, str):
+        content = content.encode()
     files = {}
-    files_long_comments = {}
-    _cur_file = None
-    lines = None
-    ignore_this = None
+    # file -> (ignored lines, comment starts, comment stops), for the files not
+    # ignored by `fix`
+    found = {}
+    fixed_names = {}
+
+    def get_fixed_name(filename: bytes):
+        if filename not in fixed_names:
+            fixed_names[filename] = fix(filename.decode(errors="replace"))
+        return fixed_names[filename]
 
+    _cur_file = None
+    _cur_found = None
     for line in content.splitlines():
-        if line:
-            try:
-                if line[:5] == "EOF: ":
-                    _, line, filename = line.split(" ", 2)
-                    files.setdefault(fix(filename), {})["eof"] = int(line)
-
-                else:
-                    # filename:5
-                    # filename:5,10,20
-                    filename, line = line.split(":", 1)
-
-                    if _cur_file != filename:
-                        _cur_file = filename
-                        _fixed = fix(filename)
-                        if not _fixed:
-                            continue
-                        lines = files.setdefault(_fixed, {"lines": set()})["lines"]
-
-                    if ":" not in line:
-                        # multi line
-                        for sp in line.split(","):
-                            lines.add(int(sp))
-
-                    else:
-                        ln, source = line.split(":", 1)
-                        ln = int(ln)
-                        source = source.strip()
-
-                        if source[:2] == "/*" or "LCOV_EXCL_START" in source:
-                            files_long_comments.setdefault(_fixed, ([], []))[0].append(
-                                ln
-                            )
-
-                        elif (
-                            source[-2:] == "*/"
-                            or "LCOV_EXCL_STOP" in source
-                            or "LCOV_EXCL_END" in source
-                        ):
-                            files_long_comments.setdefault(_fixed, ([], []))[1].append(
-                                ln
-                            )
-
-                        lines.add(ln)
-
-            except Exception:
-                pass
-
-    for filename, (starts, stops) in files_long_comments.items():
-        if filename and starts and stops:
-            starts = sorted(starts)
-            stops = sorted(stops)
-            lines = files[filename]["lines"]
-            for x in range(len(starts)):
-                if len(stops) > x:
-                    lines.update(range(int(starts[x]) + 1, int(stops[x])))
+        if not line:
+            continue
+        if line[:5] == b"EOF: ":
+            eof, _, filename = line[5:].partition(b" ")
+            eof = _parse_line_number(eof)
+            if eof is None or not filename:
+                continue
+            fixed = get_fixed_name(filename)
+            if fixed:
+                files.setdefault(fixed, {})["eof"] = int(eof)
+            continue
+
+        # filename:5
+        # filename:5,10,20
+        # filename:5:source
+        filename, separator, rest = line.partition(b":")
+        if not separator:
+            continue
+        if filename != _cur_file:
+            _cur_file = filename
+            fixed = get_fixed_name(filename)
+            _cur_found = (
+                found.setdefault(fixed, (array("q"), [], [])) if fixed else None
+            )
+        if _cur_found is None:
+            continue
+        lines, starts, stops = _cur_found
+
+        ln, separator, source = rest.partition(b":")
+        if not separator:
+            # multi line
+            for value in rest.split(b","):
+                value = value if value.isdigit() else _parse_line_number(value)
+                if value is not None:
+                    lines.append(int(value))
+            continue
+
+        ln = ln if ln.isdigit() else _parse_line_number(ln)
+        if ln is None:
+            continue
+        ln = int(ln)
+        lines.append(ln)
+        source = source.strip()
+        if not source:
+            continue
+        if source[:2] == b"/*" or b"LCOV_EXCL_START" in source:
+            starts.append(ln)
+        elif (
+            source[-2:] == b"*/"
+            or b"LCOV_EXCL_STOP" in source
+            or b"LCOV_EXCL_END" in source
+        ):
+            stops.append(ln)
 
+    for fixed, (lines, starts, stops) in found.items():
+        ranges = list(_consecutive_runs(sorted(lines)))
+        if starts and stops:
+            # the n-th start goes with the n-th stop
+            ranges.extend(
+                (start + 1, stop - 1)
+                for start, stop in zip(sorted(starts), sorted(stops))
+            )
+        files.setdefault(fixed, {})["lines"] = LineRanges(ranges)
     return files
@@ -11,7 +11,6 @@ from services.report.report_builder import (
     ReportBuilder,
     ReportBuilderSession,
 )
-from services.yaml import read_yaml_field
 
 
 class BullseyeProcessor(BaseLanguageProcessor):
@@ -25,19 +24,17 @@ class BullseyeProcessor(BaseLanguageProcessor):
 
 
 def from_xml(xml, report_builder_session: ReportBuilderSession):
-    path_fixer, ignored_lines, sessionid, yaml = (
+    path_fixer, ignored_lines, sessionid, max_report_age = (
         report_builder_session.path_fixer,
         report_builder_session.ignored_lines,
         report_builder_session.sessionid,
-        report_builder_session.current_yaml,
+        report_builder_session.parser_settings.max_report_age,
     )
-    if read_yaml_field(yaml, ("codecov", "max_report_age"), "12h ago"):
+    if max_report_age:
         build_id = xml.attrib.get("buildId")
         # build_id format has timestamp at the end "4362c668_2020-10-28_17:55:47"
         timestamp = " ".join(build_id.split("_")[1:])
-        if timestamp and Date(timestamp) < read_yaml_field(
-            yaml, ("codecov", "max_report_age"), "12h ago"
-        ):
+        if timestamp and Date(timestamp) < max_report_age:
             raise ReportExpiredException("Bullseye report expired %s" % timestamp)
 
     for folder in xml.iter("{https://www.bullseye.com/covxml}folder"):
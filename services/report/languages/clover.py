@@ -10,7 +10,6 @@ from services.report.report_builder import (
     ReportBuilder,
     ReportBuilderSession,
 )
-from services.yaml import read_yaml_field
 
 
 class CloverProcessor(BaseLanguageProcessor):
@@ -39,22 +38,20 @@ def get_end_of_file(filename, xmlfile):
 
 
 def from_xml(xml, report_builder_session: ReportBuilderSession) -> Report:
-    path_fixer, ignored_lines, sessionid, yaml = (
+    path_fixer, ignored_lines, sessionid, max_report_age = (
         report_builder_session.path_fixer,
         report_builder_session.ignored_lines,
         report_builder_session.sessionid,
-        report_builder_session.current_yaml,
+        report_builder_session.parser_settings.max_report_age,
     )
 
-    if read_yaml_field(yaml, ("codecov", "max_report_age"), "12h ago"):
+    if max_report_age:
         try:
             timestamp = next(xml.iter("coverage")).get("generated")
             if "-" in timestamp:
                 t = timestamp.split("-")
                 timestamp = t[1] + "-" + t[0] + "-" + t[2]
-            if timestamp and Date(timestamp) < read_yaml_field(
-                yaml, ("codecov", "max_report_age"), "12h ago"
-            ):
+            if timestamp and Date(timestamp) < max_report_age:
                 # report expired over 12 hours ago
                 raise ReportExpiredException("Clover report expired %s" % timestamp)
         except StopIteration:
@@ -14,7 +14,6 @@ from services.report.report_builder import (
     ReportBuilder,
     ReportBuilderSession,
 )
-from services.yaml import read_yaml_field
 
 log = logging.getLogger(__name__)
 
@@ -45,15 +44,15 @@ def get_sources_to_attempt(xml) -> List[str]:
 
 
 def from_xml(xml, report_builder_session: ReportBuilderSession) -> Report:
-    path_fixer, ignored_lines, sessionid, repo_yaml = (
+    path_fixer, ignored_lines, sessionid, settings = (
         report_builder_session.path_fixer,
         report_builder_session.ignored_lines,
         report_builder_session.sessionid,
-        report_builder_session.current_yaml,
+        report_builder_session.parser_settings,
     )
 
     # # process timestamp
-    if read_yaml_field(repo_yaml, ("codecov", "max_report_age"), "12h ago"):
+    if settings.max_report_age:
         try:
             timestamp = next(xml.iter("coverage")).get("timestamp")
         except StopIteration:
@@ -72,8 +71,7 @@ def from_xml(xml, report_builder_session: ReportBuilderSession) -> Report:
         if (
             timestamp
             and is_valid_timestamp
-            and parsed_datetime
-            < read_yaml_field(repo_yaml, ("codecov", "max_report_age"), "12h ago")
+            and parsed_datetime < settings.max_report_age
         ):
             # report expired over 12 hours ago
             raise ReportExpiredException("Cobertura report expired " + timestamp)
@@ -121,11 +119,7 @@ def from_xml(xml, report_builder_session: ReportBuilderSession) -> Report:
                         for _ in line.iter("condition")
                         if _.attrib.get("coverage") != "100%"
                     ]
-                    if read_yaml_field(
-                        repo_yaml,
-                        ("parsers", "cobertura", "handle_missing_conditions"),
-                        False,
-                    ):
+                    if settings.cobertura_handle_missing_conditions:
                         if type(coverage) is str:
                             covered_conditions, total_conditions = coverage.split("/")
                             if len(conditions) < int(total_conditions):
@@ -171,11 +165,7 @@ def from_xml(xml, report_builder_session: ReportBuilderSession) -> Report:
                 if (
                     type(coverage) is str
                     and not coverage[0] == "0"
-                    and read_yaml_field(
-                        repo_yaml,
-                        ("parsers", "cobertura", "partials_as_hits"),
-                        False,
-                    )
+                    and settings.cobertura_partials_as_hits
                 ):  # if coverage[0] is 0 this is a miss
                     missing_branches = None
                     coverage = 1
@@ -11,7 +11,6 @@ from services.report.report_builder import (
     ReportBuilder,
     ReportBuilderSession,
 )
-from services.yaml import read_yaml_field
 
 
 class GcovProcessor(BaseLanguageProcessor):
@@ -66,7 +65,7 @@ def _process_gcov_file(
     gcov_line_iterator,
     report_builder_session: ReportBuilderSession,
 ):
-    settings = read_yaml_field(report_builder_session.current_yaml, ("parsers", "gcov"))
+    settings = report_builder_session.parser_settings
 
     ignore = False
     ln = None
@@ -99,7 +98,7 @@ def _process_gcov_file(
 
         elif line[:4] == "bran" and ln in lines:
             if _cur_branch_detected is False:
-                # skip read_yaml_fielding/regexp checks because of repeated branchs
+                # skip settings/regexp checks because of repeated branchs
                 continue
 
             elif _cur_branch_detected is None:
@@ -107,31 +106,20 @@ def _process_gcov_file(
 
                 # class
                 if line_types[ln] == CoverageType.method:
-                    if (
-                        read_yaml_field(settings, ("branch_detection", "method"))
-                        is not True
-                    ):
+                    if not settings.gcov_branch_detection_method:
                         continue
                 # loop
                 elif detect_loop(data):
                     line_types[ln] = CoverageType.branch
-                    if (
-                        read_yaml_field(settings, ("branch_detection", "loop"))
-                        is not True
-                    ):
+                    if not settings.gcov_branch_detection_loop:
                         continue
                 # conditional
                 elif detect_conditional(data):
                     line_types[ln] = CoverageType.branch
-                    if (
-                        read_yaml_field(settings, ("branch_detection", "conditional"))
-                        is not True
-                    ):
+                    if not settings.gcov_branch_detection_conditional:
                         continue
                 # else macro
-                elif (
-                    read_yaml_field(settings, ("branch_detection", "macro")) is not True
-                ):
+                elif not settings.gcov_branch_detection_macro:
                     continue
 
                 _cur_branch_detected = True  # proven true
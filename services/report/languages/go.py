@@ -14,7 +14,6 @@ from services.report.report_builder import (
     ReportBuilder,
     ReportBuilderSession,
 )
-from services.yaml import read_yaml_field
 
 
 class GoProcessor(BaseLanguageProcessor):
@@ -29,9 +28,7 @@ class GoProcessor(BaseLanguageProcessor):
 
 
 def from_txt(string: bytes, report_builder_session: ReportBuilderSession) -> Report:
-    go_parser_settings = (
-        read_yaml_field(report_builder_session.current_yaml, ("parsers", "go")) or {}
-    )
+    partials_as_hits = report_builder_session.parser_settings.go_partials_as_hits
 
     # Process the bytes from uploaded report to intermediary representation
     # files: {new_name: <lines defaultdict(list)>}
@@ -50,10 +47,7 @@ def from_txt(string: bytes, report_builder_session: ReportBuilderSession) -> Rep
                 cov_to_use = cov
             else:
                 cov_to_use = best_in_partials
-            if (
-                go_parser_settings.get("partials_as_hits", False)
-                and line_type(cov_to_use) == LineType.partial
-            ):
+            if partials_as_hits and line_type(cov_to_use) == LineType.partial:
                 cov_to_use = 1
             _file[ln] = report_builder_session.create_coverage_line(
                 filename=filename, coverage=cov_to_use, coverage_type=CoverageType.line
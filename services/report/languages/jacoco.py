@@ -12,7 +12,6 @@ from services.report.report_builder import (
     ReportBuilder,
     ReportBuilderSession,
 )
-from services.yaml import read_yaml_field
 
 
 class JacocoProcessor(BaseLanguageProcessor):
@@ -35,15 +34,13 @@ def from_xml(xml, report_builder_session: ReportBuilderSession):
     cb = covered branches
     """
     path_fixer = report_builder_session.path_fixer
-    yaml = report_builder_session.current_yaml
+    settings = report_builder_session.parser_settings
     ignored_lines = report_builder_session.ignored_lines
     sessionid = report_builder_session.sessionid
-    if read_yaml_field(yaml, ("codecov", "max_report_age"), "12h ago"):
+    if settings.max_report_age:
         try:
             timestamp = next(xml.iter("sessioninfo")).get("start")
-            if timestamp and Date(timestamp) < read_yaml_field(
-                yaml, ("codecov", "max_report_age"), "12h ago"
-            ):
+            if timestamp and Date(timestamp) < settings.max_report_age:
                 # report expired over 12 hours ago
                 raise ReportExpiredException("Jacoco report expired %s" % timestamp)
 
@@ -53,8 +50,6 @@ def from_xml(xml, report_builder_session: ReportBuilderSession):
     project = xml.attrib.get("name", "")
     project = "" if " " in project else project.strip("/")
 
-    jacoco_parser_settings = read_yaml_field(yaml, ("parsers", "jacoco")) or {}
-
     def try_to_fix_path(path):
         if project:
             # project/package/path
@@ -120,7 +115,7 @@ def from_xml(xml, report_builder_session: ReportBuilderSession):
                 if (
                     coverage_type == CoverageType.branch
                     and branch_type(cov) == LineType.partial
-                    and jacoco_parser_settings.get("partials_as_hits", False)
+                    and settings.jacoco_partials_as_hits
                 ):
                     cov = 1
 
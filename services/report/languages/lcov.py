@@ -1,7 +1,6 @@
 import logging
 import typing
 from collections import defaultdict
-from io import BytesIO
 
 from shared.reports.resources import Report
 
@@ -31,145 +30,205 @@ def detect(report):
 
 
 # def from_txt(reports, fix, ignored_lines, sessionid):
-def from_txt(reports, report_builder_session: ReportBuilderSession) -> Report:
+def from_txt(reports: bytes, report_builder_session: ReportBuilderSession) -> Report:
     # http://ltp.sourceforge.net/coverage/lcov/geninfo.1.php
     # merge same files
-    for string in reports.split(b"\nend_of_record"):
-        report_builder_session.append(_process_file(string, report_builder_session))
+    for start, end in _iter_records(reports):
+        report_builder_session.append(
+            _process_file(reports, report_builder_session, start, end)
+        )
 
     return report_builder_session.output_report()
 
 
-def _process_file(doc: bytes, report_builder_session: ReportBuilderSession):
-    ignored_lines = report_builder_session.ignored_lines
-    _already_informed_of_negative_execution_count = False
-    lines = {}
-    branches = defaultdict(dict)
-    fln, fh = {}, {}
-    JS = False
-    CPP = False
-    skip_lines = []
-    _file = None
-    for encoded_line in BytesIO(doc):
-        line = encoded_line.decode(errors="replace").rstrip("\n")
-        if line == "" or ":" not in line:
-            continue
-
-        method, content = line.split(":", 1)
-        content = content.strip()
-        if method in ("TN", "LF", "LH", "BRF", "BRH"):
-            # TN: test title
-            # LF: lines found
-            # LH: lines hit
-            # FNF: functions found
-            # FNH: functions hit
-            # BRF: branches found
-            # BRH: branches hit
-            continue
-
-        elif method == "SF":
-            """
-            For  each  source  file  referenced in the .da file, there is a section
-            containing filename and coverage data:
-
-            SF:<absolute path to the source file>
-            """
-            # file name
-            content = report_builder_session.path_fixer(content)
-            if content is None:
-                return None
-
-            _file = report_builder_session.file_class(
-                content, ignore=ignored_lines.get(content)
-            )
-            JS = content[-3:] == ".js"
-            CPP = content[-4:] == ".cpp"
-
-        elif method == "DA":
-            """
-            Then there is a list of execution counts for each instrumented line
-            (i.e. a line which resulted in executable code):
-
-            DA:<line number>,<execution count>[,<checksum>]
-            """
-            #  DA:<line number>,<execution count>[,<checksum>]
-            if line.startswith("undefined,"):
-                continue
-
-            splited_content = content.split(",")
-            line = splited_content[0]
-            hit = splited_content[1]
-            if line[0] in ("0", "n") or hit[0] in ("=", "s"):
-                continue
-
-            if hit == "undefined" or line == "undefined":
-                continue
-
-            cov = int(hit)
-            if cov < -1:
-                # https://github.com/linux-test-project/lcov/commit/dfec606f3b30e1ac0f4114cfb98b29f91e9edb21
-                if not _already_informed_of_negative_execution_count:
-                    log.warning(
-                        "At least one occurrence of negative execution counts on Lcov",
-                        extra=dict(
-                            execution_count=cov, lcov_report_filename=_file.name
-                        ),
-                    )
-                    _already_informed_of_negative_execution_count = True
-                cov = 0
-            coverage_line = report_builder_session.create_coverage_line(
-                filename=_file.name, coverage=cov, coverage_type=CoverageType.line
+def _iter_records(reports: bytes) -> typing.Iterator[typing.Tuple[int, int]]:
+    """
+    Where each record (the text between two `end_of_record`) starts and ends, so
+    they don't have to be copied out of the report
+    """
+    start = 0
+    while True:
+        end = reports.find(RECORD_SEPARATOR, start)
+        if end < 0:
+            yield start, len(reports)
+            return
+        yield start, end
+        start = end + len(RECORD_SEPARATOR)
+
+
+class _RecordState(object):
+    __slots__ = (
+        "report_builder_session",
+        "file",
+        "is_js",
+        "is_cpp",
+        "branches",
+        "function_lines",
+        "skip_lines",
+        "informed_of_negative_count",
+    )
+
+    def __init__(self, report_builder_session: ReportBuilderSession):
+        self.report_builder_session = report_builder_session
+        self.file = None
+        self.is_js = False
+        self.is_cpp = False
+        self.branches = defaultdict(dict)
+        self.function_lines = {}
+        self.skip_lines = []
+        self.informed_of_negative_count = False
+
+
+def _parse_source_file(state: _RecordState, content: bytes) -> bool:
+    """
+    For  each  source  file  referenced in the .da file, there is a section
+    containing filename and coverage data:
+
+    SF:<absolute path to the source file>
+    """
+    report_builder_session = state.report_builder_session
+    filename = report_builder_session.path_fixer(
+        content.decode(errors="replace").strip()
+    )
+    if filename is None:
+        return False
+    state.file = report_builder_session.file_class(
+        filename, ignore=report_builder_session.ignored_lines.get(filename)
+    )
+    state.is_js = filename[-3:] == ".js"
+    state.is_cpp = filename[-4:] == ".cpp"
+    return True
+
+
+def _parse_line_data(state: _RecordState, content: bytes) -> bool:
+    """
+    Then there is a list of execution counts for each instrumented line
+    (i.e. a line which resulted in executable code):
+
+    DA:<line number>,<execution count>[,<checksum>]
+    """
+    line, _, hit = content.partition(b",")
+    hit = hit.split(b",", 1)[0]
+    # lines missing their number or their hits are skipped
+    if not line or not hit:
+        return True
+    if line[0] in _SKIPPED_LINE_STARTS or hit[:1] in (b"=", b"s"):
+        return True
+    if hit == b"undefined" or line == b"undefined":
+        return True
+
+    cov = int(hit)
+    _file = state.file
+    if cov < -1:
+        # https://github.com/linux-test-project/lcov/commit/dfec606f3b30e1ac0f4114cfb98b29f91e9edb21
+        if not state.informed_of_negative_count:
+            log.warning(
+                "At least one occurrence of negative execution counts on Lcov",
+                extra=dict(execution_count=cov, lcov_report_filename=_file.name),
             )
-            _file.append(int(line), coverage_line)
-
-        elif method == "FN" and not JS:
-            """
-            Following is a list of line numbers for each function name found in the
-            source file:
-
-            FN:<line number of function start>,<function name>
-            """
-            line, name = content.split(",", 1)
-            if CPP and name[:2] in ("_Z", "_G"):
-                skip_lines.append(line)
-                continue
-
-            fln[name] = line
-
-        elif method == "FNDA" and not JS:
-            #  FNDA:<execution count>,<function name>
-            hit, name = content.split(",", 1)
-            if CPP and name[0] == "_":
-                skip_lines.append(line)
-                continue
-
-            if hit != "":
-                fh[name] = int(hit)
-
-        elif method == "BRDA" and not JS:
-            """
-            Branch coverage information is stored which one line per branch:
-
-              BRDA:<line number>,<block number>,<branch number>,<taken>
-
-            Block  number  and  branch  number are gcc internal IDs for the branch.
-            Taken is either "-" if the basic block containing the branch was  never
-            executed or a number indicating how often that branch was taken.
-            """
-            # BRDA:<line number>,<block number>,<branch number>,<taken>
-            ln, block, branch, taken = content.split(",", 3)
-            if ln == "1" and _file.name.endswith(".ts"):
-                continue
-
-            elif ln not in ("0", ""):
-                branches[ln]["%s:%s" % (block, branch)] = (
-                    0 if taken in ("-", "0") else 1
-                )
-
+            state.informed_of_negative_count = True
+        cov = 0
+    coverage_line = state.report_builder_session.create_coverage_line(
+        filename=_file.name, coverage=cov, coverage_type=CoverageType.line
+    )
+    _file.append(int(line), coverage_line)
+    return True
+
+
+def _parse_function(state: _RecordState, content: bytes) -> bool:
+    """
+    Following is a list of line numbers for each function name found in the
+    source file:
+
+    FN:<line number of function start>,<function name>
+    """
+    if state.is_js:
+        return True
+    line, name = content.split(b",", 1)
+    if state.is_cpp and name[:2] in (b"_Z", b"_G"):
+        state.skip_lines.append(line)
+        return True
+    state.function_lines[name] = line
+    return True
+
+
+def _parse_function_data(state: _RecordState, content: bytes) -> bool:
+    #  FNDA:<execution count>,<function name>
+    if state.is_js:
+        return True
+    hit, _, name = content.partition(b",")
+    # the hits of functions aren't used, mangled C++ names are skipped
+    if not (state.is_cpp and name[:1] == b"_") and hit != b"":
+        int(hit)
+    return True
+
+
+def _parse_branch_data(state: _RecordState, content: bytes) -> bool:
+    """
+    Branch coverage information is stored which one line per branch:
+
+      BRDA:<line number>,<block number>,<branch number>,<taken>
+
+    Block  number  and  branch  number are gcc internal IDs for the branch.
+    Taken is either "-" if the basic block containing the branch was  never
+    executed or a number indicating how often that branch was taken.
+    """
+    if state.is_js:
+        return True
+    ln, block, branch, taken = content.split(b",", 3)
+    if ln == b"1" and state.file.name.endswith(".ts"):
+        return True
+    if ln not in (b"0", b""):
+        branch_id = (block + b":" + branch).decode(errors="replace")
+        state.branches[ln][branch_id] = 0 if taken in (b"-", b"0") else 1
+    return True
+
+
+# every other record (TN, LF, LH, BRF, BRH...) is ignored
+_RECORD_PARSERS = {
+    b"SF": _parse_source_file,
+    b"DA": _parse_line_data,
+    b"FN": _parse_function,
+    b"FNDA": _parse_function_data,
+    b"BRDA": _parse_branch_data,
+}
+
+RECORD_SEPARATOR = b"\nend_of_record"
+
+# line numbers starting with these ("0", "nan") are skipped
+_SKIPPED_LINE_STARTS = (ord("0"), ord("n"))
+
+
+def _process_file(
+    reports: bytes, report_builder_session: ReportBuilderSession, start: int, end: int
+):
+    """
+    Parses the record between `start` and `end` of `reports`, one line at a time,
+    dispatching on the prefix of the line (before the first `:`). Only the prefix
+    and the content of each line are sliced out of `reports`, as bytes: the parsers
+    split and strip them, which a memoryview can't do without copying them anyway.
+    """
+    state = _RecordState(report_builder_session)
+    position = start
+    while position < end:
+        line_end = reports.find(b"\n", position, end)
+        if line_end < 0:
+            line_end = end
+        colon = reports.find(b":", position, line_end)
+        if colon >= 0:
+            parse = _RECORD_PARSERS.get(reports[position:colon])
+            if parse is not None:
+                if not parse(state, reports[colon + 1 : line_end].strip()):
+                    return None
+        position = line_end + 1
+
+    branches = state.branches
     # remove skipped
-    [(branches.pop(sl, None), lines.pop(sl, None)) for sl in skip_lines]
+    for skipped_line in state.skip_lines:
+        branches.pop(skipped_line, None)
 
-    methods = fln.values()
+    methods = set(state.function_lines.values())
+    _file = state.file
 
     # work branches
     for ln, br in branches.items():
@@ -1,6 +1,8 @@
 import typing
-from collections import defaultdict
 from fractions import Fraction
+from itertools import chain
+from json import JSONDecoder
+from json.decoder import WHITESPACE, scanstring
 
 from shared.reports.resources import Report
 from shared.utils.merge import partials_to_line
@@ -11,11 +13,66 @@ from services.report.report_builder import (
     ReportBuilder,
     ReportBuilderSession,
 )
-from services.yaml import read_yaml_field
+
+
+class NotIstanbulReport(Exception):
+    """
+    The upload read as an `IstanbulReport` turned out not to be one (or not to be
+    valid json), it has to be parsed and matched like any other
+    """
+
+
+class IstanbulReport(object):
+    """
+    An upload that may be an Istanbul report: a json object mapping file names to
+    objects. Its files are only parsed one at a time, as they are iterated, so
+    only the parsed data of the file being processed is held in memory.
+
+    Iterating raises `NotIstanbulReport` when the upload is not such an object,
+    the caller has to fall back to parsing it fully.
+    """
+
+    def __init__(self, text: str):
+        self._text = text
+
+    def _skip_whitespace(self, pos: int) -> int:
+        return WHITESPACE.match(self._text, pos).end()
+
+    def _expect(self, char: str, pos: int) -> int:
+        if self._text[pos : pos + 1] != char:
+            raise NotIstanbulReport()
+        return pos + 1
+
+    def __iter__(self) -> typing.Iterator[typing.Tuple[str, dict]]:
+        text, decoder = self._text, JSONDecoder()
+        filenames = set()
+        try:
+            pos = self._expect("{", self._skip_whitespace(0))
+            pos = self._skip_whitespace(pos)
+            while True:
+                filename, pos = scanstring(text, self._expect('"', pos))
+                pos = self._skip_whitespace(pos)
+                pos = self._skip_whitespace(self._expect(":", pos))
+                if filename in filenames or text[pos : pos + 1] != "{":
+                    # not the dict of dicts the parsed upload would be
+                    raise NotIstanbulReport()
+                filenames.add(filename)
+                data, pos = decoder.raw_decode(text, pos)
+                yield filename, data
+                pos = self._skip_whitespace(pos)
+                if text[pos : pos + 1] == "}":
+                    break
+                pos = self._skip_whitespace(self._expect(",", pos))
+            if self._skip_whitespace(pos + 1) != len(text):
+                raise NotIstanbulReport()
+        except ValueError:
+            raise NotIstanbulReport()
 
 
 class NodeProcessor(BaseLanguageProcessor):
     def matches_content(self, content, first_line, name):
+        if isinstance(content, IstanbulReport):
+            return True
         if not isinstance(content, dict):
             return False
         return all(isinstance(data, dict) for data in content.values())
@@ -30,8 +87,11 @@ class NodeProcessor(BaseLanguageProcessor):
 def get_line_coverage(location, cov, line_type):
     if location.get("skip"):
         return None, None, None
+    return _line_coverage_at(get_location(location), cov, line_type)
+
 
-    sl, sc, el, ec = get_location(location)
+def _line_coverage_at(position, cov, line_type):
+    sl, sc, el, ec = position
 
     if not sl or (sc + 1 == ec and sl == el):
         return None, None, None
@@ -78,13 +138,26 @@ def must_be_dict(value):
         return value
 
 
-def next_from_json(report_dict, report_builder_session: ReportBuilderSession) -> Report:
+def _iter_files(report) -> typing.Iterator[typing.Tuple[str, dict]]:
+    """
+    Yields the files of `report` (an `IstanbulReport`, or an already parsed
+    upload) in order, so the parsed data of a file can be freed as soon as it is
+    processed. The files of a parsed upload are removed from it as they go.
+    """
+    if isinstance(report, IstanbulReport):
+        yield from report
+        return
+    for filename in list(report):
+        yield filename, report.pop(filename)
+
+
+def next_from_json(files, report_builder_session: ReportBuilderSession) -> Report:
     fix, ignored_lines, sessionid = (
         report_builder_session.path_fixer,
         report_builder_session.ignored_lines,
         report_builder_session.sessionid,
     )
-    for filename, data in report_dict.items():
+    for filename, data in files:
         name = fix(filename)
         if name is None:
             name = fix(filename.replace("lib/", "src/", 1))
@@ -103,78 +176,78 @@ def next_from_json(report_dict, report_builder_session: ReportBuilderSession) ->
             data = data["data"]
 
         ifs = {}
-        _ifends = {}
+        if_branches = []
         for bid, branch in must_be_dict(data.get("branchMap")).items():
-            if branch.get("skip") is not True:
-                if branch.get("type") == "if":
-                    # first skip ifs
-                    sl, sc, el, ec = get_location(branch)
-                    ifs[sl] = (sc, el, ec)
+            if branch.get("skip") is True:
+                continue
+            if branch.get("type") == "if":
+                # first skip ifs, they are merged with the statements below
+                position = get_location(branch)
+                sl, sc, el, ec = position
+                ifs[sl] = (sc, el, ec)
+                if_branches.append((bid, branch, position))
+                continue
 
+            # line number -> (coverage of its first location, partials)
+            line_parts = {}
+            for lid, location in enumerate(branch["locations"]):
+                ln, cov, partials = get_line_coverage(
+                    location, data["b"][bid][lid], "b"
+                )
+                if ln:
+                    if ln in line_parts:
+                        line_parts[ln][1].append(partials)
+                    else:
+                        line_parts[ln] = (cov, [partials])
+
+            for ln, (first_cov, partials) in line_parts.items():
+                partials = list(filter(None, partials))
+                if len(partials) > 1:
+                    branches = [
+                        str(i)
+                        for i, partial in enumerate(partials)
+                        if partial and partial[2] == 0
+                    ]
+                    cov = "%d/%d" % (
+                        len(partials) - len(branches),
+                        len(partials),
+                    )
+                    partials = sorted(partials, key=lambda p: p[0])
                 else:
-                    line_parts = defaultdict(list)
-                    line_cov = defaultdict(list)
-                    for lid, location in enumerate(branch["locations"]):
-                        ln, cov, partials = get_line_coverage(
-                            location, data["b"][bid][lid], "b"
-                        )
-                        if ln:
-                            line_parts[ln].append(partials)
-                            line_cov[ln].append(cov)
-                            if ln == location["end"]["line"]:
-                                _ifends[location["end"]["line"]] = location["end"][
-                                    "column"
-                                ]
-
-                    for ln, partials in line_parts.items():
-                        partials = list(filter(None, partials))
-                        if len(partials) > 1:
-                            branches = [
-                                str(i)
-                                for i, partial in enumerate(partials)
-                                if partial and partial[2] == 0
-                            ]
-                            cov = "%d/%d" % (
-                                len(partials) - len(branches),
-                                len(partials),
-                            )
-                            partials = sorted(partials, key=lambda p: p[0])
-                        else:
-                            branches = None
-                            cov = line_cov[ln][0]
-                            partials = None
-                        _file.append(
-                            ln,
-                            report_builder_session.create_coverage_line(
-                                filename=name,
-                                coverage=cov,
-                                coverage_type=CoverageType.branch,
-                                partials=partials,
-                                missing_branches=branches,
-                            ),
-                        )
+                    branches = None
+                    cov = first_cov
+                    partials = None
+                _file.append(
+                    ln,
+                    report_builder_session.create_coverage_line(
+                        filename=name,
+                        coverage=cov,
+                        coverage_type=CoverageType.branch,
+                        partials=partials,
+                        missing_branches=branches,
+                    ),
+                )
 
         # statements
         inlines = {}
-        line_parts = defaultdict(list)
-        line_cov = defaultdict(list)
+        line_parts = {}
         for sid, statement in must_be_dict(data.get("statementMap")).items():
-            if statement.get("skip") is not True:
-                ln, cov, partials = get_line_coverage(statement, data["s"][sid], None)
-                if ln:
-                    sl, sc, el, ec = get_location(statement)
-                    if ifs.get(ln) == (sc, el, ec):
-                        # we will chop it of later
-                        if partials:
-                            inlines[ln] = partials
-
-                    else:
-                        line_parts[ln].append(partials)
-                        line_cov[ln].append(cov)
+            if statement.get("skip"):
+                continue
+            position = get_location(statement)
+            ln, cov, partials = _line_coverage_at(position, data["s"][sid], None)
+            if ln:
+                if ifs.get(ln) == position[1:]:
+                    # we will chop it of later
+                    if partials:
+                        inlines[ln] = partials
+                elif ln in line_parts:
+                    line_parts[ln][1].append(partials)
+                else:
+                    line_parts[ln] = (cov, [partials])
 
-        for ln, partials in line_parts.items():
+        for ln, (cov, partials) in line_parts.items():
             partials = sorted(filter(None, partials), key=lambda p: p[0])
-            cov = line_cov[ln][0]
             line = _file.get(ln)
             if line and line.sessions[0].partials is not None:
                 continue
@@ -189,87 +262,83 @@ def next_from_json(report_dict, report_builder_session: ReportBuilderSession) ->
                     ),
                 )
 
-        for bid, branch in must_be_dict(data.get("branchMap")).items():
-            # single stmt ifs only
-            if branch.get("skip") is not True and branch.get("type") == "if":
-                sl, sc, el, ec = get_location(branch)
-                if sl:
-                    branches = data["b"][bid]
-                    tb = len(branches)
-                    cov = "%s/%s" % (tb - branches.count(0), tb)
-                    mb = [str(i) for i, b in enumerate(branches) if b == 0]
-
-                    line = _file.get(sl)
-                    if line:
-                        inline_part = inlines.pop(sl, None)
-                        if inline_part:
-                            cur_partials = line.sessions[-1].partials
-                            if not cur_partials:
-                                _, cov, partials = get_line_coverage(branch, cov, "b")
-                                _file[sl] = report_builder_session.create_coverage_line(
-                                    filename=name,
-                                    coverage=cov,
-                                    coverage_type=CoverageType.branch,
-                                    missing_branches=mb,
-                                    partials=partials,
-                                )
-                                continue
-
-                            sc, ec = sc + 4, cur_partials[0][0] - 2
-                            isc, iec, icov = inline_part
-                            if sc > ec:
-                                cur_partials.append(
-                                    [cur_partials[-1][1] + 2, iec, icov]
-                                )
-                                _file[sl] = report_builder_session.create_coverage_line(
-                                    filename=name,
-                                    coverage=cov,
-                                    coverage_type=CoverageType.branch,
-                                    missing_branches=mb,
-                                    partials=cur_partials,
-                                )
-                            else:
-                                partials = [[sc, ec, cov]]
-                                found = False
-                                for p in cur_partials:
-                                    if (p[0], p[1]) != (ec + 2, iec):
-                                        # add these partials
-                                        partials.append(p)
-                                    elif p[2] == 0 or isinstance(p[2], str):
-                                        # dont add trimmed, this part was missed
-                                        partials.append(p)
-                                    else:
-                                        partials.append([ec + 2, iec, icov])
-                                _file[sl] = report_builder_session.create_coverage_line(
-                                    filename=name,
-                                    coverage=cov,
-                                    coverage_type=CoverageType.branch,
-                                    missing_branches=mb,
-                                    partials=sorted(partials, key=lambda p: p[0]),
-                                )
-
-                        else:
-                            # if ( exp && expr )
-                            # change to branch
+        # single stmt ifs only
+        for bid, branch, (sl, sc, el, ec) in if_branches:
+            if sl:
+                branches = data["b"][bid]
+                tb = len(branches)
+                cov = "%s/%s" % (tb - branches.count(0), tb)
+                mb = [str(i) for i, b in enumerate(branches) if b == 0]
+
+                line = _file.get(sl)
+                if line:
+                    inline_part = inlines.pop(sl, None)
+                    if inline_part:
+                        cur_partials = line.sessions[-1].partials
+                        if not cur_partials:
+                            _, cov, partials = get_line_coverage(branch, cov, "b")
                             _file[sl] = report_builder_session.create_coverage_line(
                                 filename=name,
                                 coverage=cov,
                                 coverage_type=CoverageType.branch,
                                 missing_branches=mb,
-                                partials=_file[sl].sessions[-1].partials,
+                                partials=partials,
                             )
+                            continue
 
-                    else:
-                        _file.append(
-                            sl,
-                            report_builder_session.create_coverage_line(
+                        sc, ec = sc + 4, cur_partials[0][0] - 2
+                        isc, iec, icov = inline_part
+                        if sc > ec:
+                            cur_partials.append([cur_partials[-1][1] + 2, iec, icov])
+                            _file[sl] = report_builder_session.create_coverage_line(
                                 filename=name,
                                 coverage=cov,
                                 coverage_type=CoverageType.branch,
                                 missing_branches=mb,
-                            ),
+                                partials=cur_partials,
+                            )
+                        else:
+                            partials = [[sc, ec, cov]]
+                            found = False
+                            for p in cur_partials:
+                                if (p[0], p[1]) != (ec + 2, iec):
+                                    # add these partials
+                                    partials.append(p)
+                                elif p[2] == 0 or isinstance(p[2], str):
+                                    # dont add trimmed, this part was missed
+                                    partials.append(p)
+                                else:
+                                    partials.append([ec + 2, iec, icov])
+                            _file[sl] = report_builder_session.create_coverage_line(
+                                filename=name,
+                                coverage=cov,
+                                coverage_type=CoverageType.branch,
+                                missing_branches=mb,
+                                partials=sorted(partials, key=lambda p: p[0]),
+                            )
+
+                    else:
+                        # if ( exp && expr )
+                        # change to branch
+                        _file[sl] = report_builder_session.create_coverage_line(
+                            filename=name,
+                            coverage=cov,
+                            coverage_type=CoverageType.branch,
+                            missing_branches=mb,
+                            partials=_file[sl].sessions[-1].partials,
                         )
 
+                else:
+                    _file.append(
+                        sl,
+                        report_builder_session.create_coverage_line(
+                            filename=name,
+                            coverage=cov,
+                            coverage_type=CoverageType.branch,
+                            missing_branches=mb,
+                        ),
+                    )
+
         for fid, func in must_be_dict(data["fnMap"]).items():
             if func.get("skip") is not True:
                 ln, cov, partials = get_line_coverage(func, data["f"][fid], "m")
@@ -301,16 +370,17 @@ def _location_to_int(location) -> typing.Optional[int]:
     return int(location["start"]["line"])
 
 
+# the coverage of a jscoverage partial, by how many of its two outcomes were hit
+_JSCOVERAGE_PARTIAL_COVERAGE = (Fraction(0), Fraction(1, 2), Fraction(1))
+
+
 def _jscoverage_eval_partial(partial):
     return [
         partial["position"],
         partial["position"] + partial["nodeLength"],
-        Fraction(
-            "{0}/2".format(
-                (1 if partial["evalTrue"] else 0) + (1 if partial["evalFalse"] else 0)
-            )
-        )
-        # It seems like the above line on Python2 would make something in `partials_to_line` always return True
+        _JSCOVERAGE_PARTIAL_COVERAGE[
+            (1 if partial["evalTrue"] else 0) + (1 if partial["evalFalse"] else 0)
+        ],
     ]
 
 
@@ -337,22 +407,21 @@ def jscoverage(_file, data, report_builder_session: ReportBuilderSession):
 
 
 def from_json(report_dict, report_builder_session: ReportBuilderSession) -> Report:
-    config = (
-        read_yaml_field(report_builder_session.current_yaml, ("parsers", "javascript"))
-        or {}
-    )
     fix, ignored_lines, sessionid = (
         report_builder_session.path_fixer,
         report_builder_session.ignored_lines,
         report_builder_session.sessionid,
     )
 
-    if config.get("enable_partials", False):
-        if next(iter(report_dict.items()))[0].endswith(".js"):
+    files = _iter_files(report_dict)
+    if report_builder_session.parser_settings.javascript_enable_partials:
+        first_file = next(files)
+        files = chain([first_file], files)
+        if first_file[0].endswith(".js"):
             # only javascript is supported ATM
-            return next_from_json(report_dict, report_builder_session)
+            return next_from_json(files, report_builder_session)
 
-    for filename, data in report_dict.items():
+    for filename, data in files:
         name = fix(filename)
         if name is None:
             name = fix(filename.replace("lib/", "src/", 1))
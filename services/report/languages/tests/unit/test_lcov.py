@@ -185,3 +185,36 @@ class TestLcov(BaseTestCase):
                 (6, 0, None, [[0, 0, None, None, None]], None, None),
             ]
         }
+
+    def test_empty_function_names_and_missing_hits(self):
+        text = "\n".join(
+            [
+                "TN:",
+                "SF:file.cpp",
+                "FN:2,",
+                "FNDA:1,",
+                "FNDA:,",
+                "FNDA:3",
+                "DA:1",
+                "DA:2,",
+                "DA:,4",
+                "DA:3,5",
+                "BRDA:2,1,0,1",
+                "BRDA:2,1,1,0",
+                "end_of_record",
+            ]
+        ).encode()
+        report_builder = ReportBuilder(
+            current_yaml={}, sessionid=0, path_fixer=lambda x: x, ignored_lines={}
+        )
+        report_builder_session = report_builder.create_report_builder_session(
+            "filepath"
+        )
+        report = lcov.from_txt(text, report_builder_session)
+        processed_report = self.convert_report_to_better_readable(report)
+        assert processed_report["archive"] == {
+            "file.cpp": [
+                (2, "1/2", "m", [[0, "1/2", ["1:1"], None, None]], None, None),
+                (3, 5, None, [[0, 5, None, None, None]], None, None),
+            ]
+        }
@@ -112,6 +112,72 @@ class TestNodeProcessor(BaseTestCase):
         print("\n")
         assert expected_result["archive"] == archive.split("<<<<< end_of_chunk >>>>>")
 
+    @pytest.mark.parametrize("enable_partials", [True, False])
+    def test_report_files_are_released_once_processed(self, enable_partials):
+        nodejson = loads(self.readfile("node/node1.json"))
+        filenames = list(nodejson)
+        report_builder = ReportBuilder(
+            current_yaml={
+                "parsers": {"javascript": {"enable_partials": enable_partials}}
+            },
+            path_fixer=str,
+            ignored_lines={},
+            sessionid=0,
+        )
+        report_builder_session = report_builder.create_report_builder_session(
+            "filename"
+        )
+        report = node.from_json(nodejson, report_builder_session)
+        assert nodejson == {}
+        # the files keep the order of the report
+        assert report.files == [name for name in filenames if name in report.files]
+
+    @pytest.mark.parametrize("enable_partials", [True, False])
+    def test_istanbul_report_is_processed_like_the_parsed_upload(self, enable_partials):
+        text = self.readfile("node/node1.json")
+        reports = []
+        for content in (loads(text), node.IstanbulReport(text)):
+            report_builder = ReportBuilder(
+                current_yaml={
+                    "parsers": {"javascript": {"enable_partials": enable_partials}}
+                },
+                path_fixer=str,
+                ignored_lines={},
+                sessionid=0,
+            )
+            assert node.NodeProcessor().matches_content(content, "", "")
+            reports.append(
+                node.from_json(
+                    content, report_builder.create_report_builder_session("filename")
+                )
+            )
+        parsed_report, istanbul_report = reports
+        assert istanbul_report.files == parsed_report.files
+        assert istanbul_report.to_archive() == parsed_report.to_archive()
+
+    def test_istanbul_report_files(self):
+        text = '\n{ "a.js" : { } ,\n "b\\"c.js":{"s": {"1": "}"}} }\n'
+        assert list(node.IstanbulReport(text)) == [
+            ("a.js", {}),
+            ('b"c.js', {"s": {"1": "}"}}),
+        ]
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "{}",
+            "[]",
+            '{"a.js": 1}',
+            '{"a.js": {}, "a.js": {}}',
+            '{"a.js": {}} {}',
+            '{"a.js": {}',
+            '{"a.js": {"s": [}}',
+        ],
+    )
+    def test_not_istanbul_report(self, text):
+        with pytest.raises(node.NotIstanbulReport):
+            list(node.IstanbulReport(text))
+
     @pytest.mark.parametrize("name", ["inline", "ifbinary", "ifbinarymb"])
     def test_singles(self, name):
         record = self.readjson("node/%s.json" % name)
@@ -0,0 +1,175 @@
+import dataclasses
+import hashlib
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from shared.config import get_config
+from shared.reports.resources import LineSession, Report, ReportFile
+
+from helpers.metrics import metrics
+from services.report.parser.types import ParsedUploadedReportFile
+
+# files bigger than this are always parsed, and once the files kept add up to
+# `max_total_size` no new ones are kept. The files of up to `max_commits` commits
+# are kept by a worker process.
+DEFAULT_PARSED_FILE_CACHE_SETTINGS = {
+    "max_file_size": 50_000_000,
+    "max_total_size": 200_000_000,
+    "max_commits": 20,
+}
+
+
+def get_parsed_file_cache_settings() -> dict:
+    settings = get_config("setup", "parsed_file_cache", default={}) or {}
+    return {
+        name: settings.get(name, default)
+        for name, default in DEFAULT_PARSED_FILE_CACHE_SETTINGS.items()
+    }
+
+
+def _normalize(value):
+    # the same value always has the same repr, whatever order its dicts and sets
+    # were filled in
+    if isinstance(value, dict):
+        return tuple(
+            sorted(((_normalize(k), _normalize(v)) for k, v in value.items()), key=repr)
+        )
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((_normalize(item) for item in value), key=repr))
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(item) for item in value)
+    return value
+
+
+def digest(value) -> str:
+    return hashlib.sha256(repr(_normalize(value)).encode()).hexdigest()
+
+
+def restamp_report(report: Report, sessionid: int) -> Report:
+    """
+    A copy of `report` whose lines all belong to the session `sessionid`
+    """
+    restamped = Report()
+    for filename in report.files:
+        original_file = report.get(filename)
+        new_file = ReportFile(name=filename)
+        for ln, line in original_file.lines:
+            new_file[ln] = dataclasses.replace(
+                line,
+                sessions=[
+                    LineSession(
+                        id=sessionid,
+                        coverage=line_session.coverage,
+                        branches=line_session.branches,
+                        partials=line_session.partials,
+                        complexity=line_session.complexity,
+                    )
+                    for line_session in line.sessions or []
+                ],
+                datapoints=(
+                    [
+                        dataclasses.replace(datapoint, sessionid=sessionid)
+                        for datapoint in line.datapoints
+                    ]
+                    if line.datapoints
+                    else line.datapoints
+                ),
+            )
+        restamped.append(new_file)
+    return restamped
+
+
+class ParsedFileCache(object):
+    """
+    Reports parsed from the uploaded files of a commit, so a file uploaded again
+    with the very same contents (common with CI matrices) is copied over to the new
+    session instead of being parsed again
+
+    Entries are keyed on the digest of the contents of the file and on everything
+    else its parsing depends on (see `get_key`). The reports are kept as copies, so
+    merging them into other reports can't change them.
+    """
+
+    def __init__(
+        self,
+        max_file_size: Optional[int] = None,
+        max_total_size: Optional[int] = None,
+    ):
+        settings = get_parsed_file_cache_settings()
+        self.max_file_size = (
+            max_file_size if max_file_size is not None else settings["max_file_size"]
+        )
+        self.max_total_size = (
+            max_total_size if max_total_size is not None else settings["max_total_size"]
+        )
+        self.total_size = 0
+        self._reports = {}
+
+    @staticmethod
+    def get_key(
+        report_file: ParsedUploadedReportFile, upload_key: Hashable
+    ) -> Tuple[str, Optional[str], Hashable]:
+        """
+        `upload_key` stands for whatever the processing depends on besides the
+        file itself: the path fixer, the report fixes and the parser settings
+        """
+        return (report_file.content_hash, report_file.filename, upload_key)
+
+    def lookup(self, key, sessionid: int) -> Tuple[bool, Optional[Report]]:
+        """
+        Whether the file of `key` was kept and, if so, the report parsed from it
+        (None when no processor could read it) stamped with `sessionid`
+        """
+        if key not in self._reports:
+            metrics.incr("worker.services.report.parsed_file_cache.miss")
+            return False, None
+        metrics.incr("worker.services.report.parsed_file_cache.hit")
+        cached = self._reports[key]
+        if cached is None:
+            return True, None
+        return True, restamp_report(cached, sessionid)
+
+    def add(
+        self,
+        key,
+        report_file: ParsedUploadedReportFile,
+        report: Optional[Report],
+        sessionid: int,
+    ) -> None:
+        size = report_file.size
+        if size > self.max_file_size or self.total_size + size > self.max_total_size:
+            return
+        self.total_size += size
+        self._reports[key] = (
+            restamp_report(report, sessionid) if report is not None else None
+        )
+
+
+_commit_caches: "OrderedDict[Tuple[int, str], ParsedFileCache]" = OrderedDict()
+
+
+def get_commit_parsed_file_cache(repoid: int, commitid: str) -> ParsedFileCache:
+    """
+    The files parsed for the uploads of a commit, kept by this worker process for
+    every task processing uploads of that commit. The caches of the commits used
+    the least recently are dropped once there are more than `max_commits` of them,
+    or once their files add up to more than `max_total_size`.
+    """
+    key = (repoid, commitid)
+    cache = _commit_caches.pop(key, None)
+    if cache is None:
+        cache = ParsedFileCache()
+    _commit_caches[key] = cache
+    settings = get_parsed_file_cache_settings()
+    while len(_commit_caches) > 1 and (
+        len(_commit_caches) > settings["max_commits"]
+        or sum(cached.total_size for cached in _commit_caches.values())
+        > settings["max_total_size"]
+    ):
+        _commit_caches.popitem(last=False)
+        metrics.incr("worker.services.report.parsed_file_cache.evicted")
+    return cache
+
+
+def clear_commit_parsed_file_caches() -> None:
+    _commit_caches.clear()
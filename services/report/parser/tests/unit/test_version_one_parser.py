@@ -1,10 +1,14 @@
 import base64
+import json
 import zlib
-from io import BytesIO
 
+from services.report.parser.types import LazyUploadedReportFile
 from services.report.parser.version_one import (
+    DECODE_CHUNK_SIZE,
+    JsonScanner,
     ParsedUploadedReportFile,
     VersionOneReportParser,
+    decode_compressed_data,
 )
 
 input_data = b"""{
@@ -106,5 +110,99 @@ def test_version_one_parser_parse_coverage_file_contents_base64_zip_format():
         "filename": "filename.py",
     }
     res = subject._parse_coverage_file_contents(coverage_file)
-    assert isinstance(res, BytesIO)
-    assert res.getvalue() == b"some_cool_string right \n here"
+    assert res == b"some_cool_string right \n here"
+
+
+def test_version_one_parser_decodes_files_lazily(mocker):
+    subject = VersionOneReportParser()
+    decode = mocker.spy(subject, "_parse_coverage_file_contents")
+    res = subject.parse_raw_report_from_bytes(input_data)
+    first_file, second_file = res.get_uploaded_files()
+    assert isinstance(first_file, LazyUploadedReportFile)
+    assert decode.call_count == 0
+    assert first_file.get_first_line() == b"Lorem ipsum dolor sit amet,\n"
+    assert first_file.size == 123
+    assert decode.call_count == 1
+    first_file.release()
+    assert first_file.size == 123
+    assert decode.call_count == 1
+    assert first_file.contents.startswith(b"Lorem ipsum")
+    assert decode.call_count == 2
+
+
+def test_version_one_parser_big_and_escaped_files():
+    original_input = bytes(range(256)) * (DECODE_CHUNK_SIZE // 64)
+    encoded = base64.b64encode(zlib.compress(original_input, level=0)).decode()
+    assert "/" in encoded
+    raw_report = json.dumps(
+        {
+            "path_fixes": {"format": "legacy", "value": {}},
+            "network_files": [],
+            "coverage_files": [
+                {
+                    "filename": 'weird "name".xml',
+                    "format": "base64+compressed",
+                    "data": encoded,
+                    "labels": None,
+                },
+                {
+                    "filename": "escaped.xml",
+                    "format": "base64+compressed",
+                    "data": encoded.replace("/", "\\/"),
+                    "labels": ["label"],
+                },
+            ],
+            "metadata": {"nested": [{"value": "]}"}, 1.5, True, None]},
+        },
+        indent=4,
+    ).encode()
+    # JSON allows escaping the slashes of the base64 data
+    raw_report = raw_report.replace(b"\\\\/", b"\\/")
+    res = VersionOneReportParser().parse_raw_report_from_bytes(raw_report)
+    first_file, second_file = res.get_uploaded_files()
+    assert first_file.filename == 'weird "name".xml'
+    assert first_file.contents == original_input
+    assert second_file.labels == ["label"]
+    assert second_file.contents == original_input
+
+
+def test_decode_compressed_data_wrapped_base64():
+    original_input = bytes(range(256)) * (3 * DECODE_CHUNK_SIZE // 256)
+    # 76 characters per line, the chunks don't line up on the groups of 4
+    encoded = base64.encodebytes(zlib.compress(original_input, level=0))
+    assert b"\n" in encoded[:DECODE_CHUNK_SIZE]
+    assert decode_compressed_data(encoded) == original_input
+    assert decode_compressed_data(memoryview(encoded)) == original_input
+    assert decode_compressed_data(encoded.replace(b"\n", b"\r\n")) == original_input
+
+
+def test_version_one_parser_wrapped_and_escaped_base64():
+    original_input = bytes(range(256)) * (3 * DECODE_CHUNK_SIZE // 256)
+    encoded = base64.encodebytes(zlib.compress(original_input, level=0)).decode()
+    raw_report = json.dumps(
+        {
+            "path_fixes": {"format": "legacy", "value": {}},
+            "network_files": [],
+            "coverage_files": [
+                {
+                    "filename": "wrapped.xml",
+                    "format": "base64+compressed",
+                    # the line breaks are escaped in the JSON
+                    "data": encoded,
+                    "labels": None,
+                },
+            ],
+        }
+    ).encode()
+    assert b"\\n" in raw_report
+    res = VersionOneReportParser().parse_raw_report_from_bytes(raw_report)
+    (uploaded_file,) = res.get_uploaded_files()
+    assert uploaded_file.contents == original_input
+
+
+def test_json_scanner():
+    scanner = JsonScanner(b' {"a": [1, "x\\"]", {"b": null}], "c": -2.5e3 , "d": {}} ')
+    values = {}
+    for key in scanner.iter_object():
+        values[key] = scanner.read_value()
+    assert values == {"a": [1, 'x"]', {"b": None}], "c": -2500.0, "d": {}}
@@ -1,5 +1,6 @@
+import hashlib
 from io import BytesIO
-from typing import Any, BinaryIO, Dict, List, Optional
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
 
 from services.path_fixer.fixpaths import clean_toc
 from services.report.fixes import get_fixes_from_raw
@@ -16,14 +17,67 @@ class ParsedUploadedReportFile(object):
         self.contents = file_contents.getvalue()
         self.size = len(self.contents)
         self.labels = labels
+        self._content_hash = None
 
     @property
     def file_contents(self):
         return BytesIO(self.contents)
 
+    @property
+    def content_hash(self) -> str:
+        """
+        Digest of the contents, identical files have the same one whichever upload
+        they come from. It's kept after `release`.
+        """
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha256(self.contents).hexdigest()
+        return self._content_hash
+
     def get_first_line(self):
         return self.file_contents.readline()
 
+    def release(self):
+        """
+        Frees the contents if they can be loaded again. These can't.
+        """
+        pass
+
+
+class LazyUploadedReportFile(ParsedUploadedReportFile):
+    """
+    Uploaded file whose contents are only loaded (with `load_contents`) when they
+    are first needed, and can be freed again with `release` once processed
+    """
+
+    def __init__(
+        self,
+        filename: Optional[str],
+        load_contents: Callable[[], bytes],
+        labels: Optional[List[str]] = None,
+    ):
+        self.filename = filename
+        self.labels = labels
+        self._load_contents = load_contents
+        self._contents = None
+        self._size = None
+        self._content_hash = None
+
+    @property
+    def contents(self) -> bytes:
+        if self._contents is None:
+            self._contents = self._load_contents()
+            self._size = len(self._contents)
+        return self._contents
+
+    @property
+    def size(self) -> int:
+        if self._size is None:
+            self._size = len(self.contents)
+        return self._size
+
+    def release(self):
+        self._contents = None
+
 
 class ParsedRawReport(object):
     """
@@ -126,5 +180,4 @@ class LegacyParsedRawReport(ParsedRawReport):
         return self.uploaded_files
 
     def get_report_fixes(self, path_fixer) -> Dict[str, Dict[str, Any]]:
-        report_fixes = self.report_fixes.read().decode(errors="replace")
-        return get_fixes_from_raw(report_fixes, path_fixer)
+        return get_fixes_from_raw(self.report_fixes.read(), path_fixer)
@@ -1,29 +1,170 @@
 import base64
 import json
 import logging
+import re
 import zlib
-from io import BytesIO
+from typing import Iterator, Tuple
 
 import sentry_sdk
 
 from services.report.parser.types import (
+    LazyUploadedReportFile,
     ParsedUploadedReportFile,
     VersionOneParsedRawReport,
 )
 
 log = logging.getLogger(__name__)
 
+# base64 characters decoded (and decompressed) at a time, multiple of 4
+DECODE_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = b" \t\n\r"
+_STRUCTURAL_CHARS = re.compile(rb'["{}\[\]]')
+_SCALAR_END = re.compile(rb"[,}\]\s]")
+_NON_BASE64_CHARS = re.compile(rb"[^A-Za-z0-9+/=]")
+
+
+class JsonScanner(object):
+    """
+    Walks a JSON document without decoding it, so big values (like the coverage
+    files of an upload) can be sliced out of it instead of being copied into
+    python objects. Skipping a value is done with `bytes.find` and regex searches,
+    so it doesn't look at every byte of long strings from python.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def peek(self) -> bytes:
+        while self.pos < len(self.data) and self.data[self.pos] in _WHITESPACE:
+            self.pos += 1
+        return self.data[self.pos : self.pos + 1]
+
+    def expect(self, char: bytes) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at position {self.pos}")
+        self.pos += 1
+
+    def _string_end(self, start: int) -> int:
+        pos = start + 1
+        while True:
+            end = self.data.find(b'"', pos)
+            if end < 0:
+                raise ValueError(f"Unterminated string starting at position {start}")
+            backslashes = 0
+            while self.data[end - 1 - backslashes] == ord("\\"):
+                backslashes += 1
+            if backslashes % 2 == 0:
+                return end + 1
+            pos = end + 1
+
+    def skip_value(self) -> Tuple[int, int]:
+        """
+        Moves past the value at the current position, returns where it starts and
+        ends
+        """
+        first = self.peek()
+        start = self.pos
+        if first == b'"':
+            self.pos = self._string_end(start)
+        elif first in (b"{", b"["):
+            depth = 0
+            pos = start
+            while True:
+                match = _STRUCTURAL_CHARS.search(self.data, pos)
+                if match is None:
+                    raise ValueError(f"Unterminated value starting at position {start}")
+                if match.group() == b'"':
+                    pos = self._string_end(match.start())
+                    continue
+                depth += 1 if match.group() in (b"{", b"[") else -1
+                pos = match.end()
+                if depth == 0:
+                    break
+            self.pos = pos
+        else:
+            match = _SCALAR_END.search(self.data, start)
+            self.pos = match.start() if match is not None else len(self.data)
+        return start, self.pos
+
+    def read_value(self):
+        start, end = self.skip_value()
+        return json.loads(self.data[start:end])
+
+    def _items(self, closing: bytes) -> Iterator[None]:
+        if self.peek() == closing:
+            self.pos += 1
+            return
+        while True:
+            yield
+            separator = self.peek()
+            self.pos += 1
+            if separator == closing:
+                return
+            if separator != b",":
+                raise ValueError(f"Expected ',' or {closing!r} at {self.pos - 1}")
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Yields the keys of the object at the current position. The value of each
+        key has to be read (or skipped) before moving to the next one.
+        """
+        self.expect(b"{")
+        for _ in self._items(b"}"):
+            key = self.read_value()
+            self.expect(b":")
+            yield key
+
+    def iter_array(self) -> Iterator[None]:
+        """
+        Yields once per element of the array at the current position, the element
+        has to be read (or skipped) before moving to the next one
+        """
+        self.expect(b"[")
+        yield from self._items(b"]")
+
+
+def decode_compressed_data(encoded_data) -> bytes:
+    """
+    Base64-decodes and decompresses `encoded_data` a chunk at a time, so only
+    the decompressed output is ever held in full
+    """
+    if _NON_BASE64_CHARS.search(encoded_data) is not None:
+        # `b64decode` skips them (like the line breaks of wrapped base64), which
+        # would make the chunks not line up on groups of 4 characters
+        encoded_data = _NON_BASE64_CHARS.sub(b"", encoded_data)
+    decompressor = zlib.decompressobj()
+    output = []
+    for start in range(0, len(encoded_data), DECODE_CHUNK_SIZE):
+        output.append(
+            decompressor.decompress(
+                base64.b64decode(encoded_data[start : start + DECODE_CHUNK_SIZE])
+            )
+        )
+    output.append(decompressor.flush())
+    return b"".join(output)
+
 
 class VersionOneReportParser(object):
     @sentry_sdk.trace
     def parse_raw_report_from_bytes(self, raw_report: bytes):
-        data = json.loads(raw_report)
+        """
+        Reads everything but the coverage files, those are only decoded when the
+        processors get to them (see `LazyUploadedReportFile`)
+        """
+        scanner = JsonScanner(raw_report)
+        data = {}
+        uploaded_files = []
+        for key in scanner.iter_object():
+            if key == "coverage_files":
+                uploaded_files = list(self._iter_coverage_files(scanner))
+            else:
+                data[key] = scanner.read_value()
         return VersionOneParsedRawReport(
             toc=data["network_files"],
             env=None,
-            uploaded_files=[
-                self._parse_single_coverage_file(x) for x in data["coverage_files"]
-            ],
+            uploaded_files=uploaded_files,
             report_fixes=self._parse_report_fixes(
                 # want backwards compatibility with older versions of the CLI that still name this section path_fixes
                 data["report_fixes"]
@@ -35,19 +176,48 @@ class VersionOneReportParser(object):
     def _parse_report_fixes(self, value):
         return value["value"]
 
-    def _parse_single_coverage_file(self, coverage_file):
-        actual_data = self._parse_coverage_file_contents(coverage_file)
-        return ParsedUploadedReportFile(
+    def _iter_coverage_files(
+        self, scanner: JsonScanner
+    ) -> Iterator[ParsedUploadedReportFile]:
+        for _ in scanner.iter_array():
+            coverage_file = {}
+            data_position = None
+            for key in scanner.iter_object():
+                if key == "data" and scanner.peek() == b'"':
+                    data_position = scanner.skip_value()
+                else:
+                    coverage_file[key] = scanner.read_value()
+            yield self._parse_single_coverage_file(
+                coverage_file, scanner.data, data_position
+            )
+
+    def _parse_single_coverage_file(self, coverage_file, raw_report, data_position):
+        return LazyUploadedReportFile(
             filename=coverage_file["filename"],
-            file_contents=actual_data,
+            load_contents=lambda: self._parse_coverage_file_contents(
+                coverage_file, raw_report, data_position
+            ),
             labels=coverage_file["labels"],
         )
 
-    def _parse_coverage_file_contents(self, coverage_file):
+    def _parse_coverage_file_contents(
+        self, coverage_file, raw_report=None, data_position=None
+    ) -> bytes:
+        if data_position is None:
+            encoded_data = coverage_file.get("data") or b""
+            if isinstance(encoded_data, str):
+                encoded_data = encoded_data.encode()
+        else:
+            start, end = data_position
+            # without the quotes, and without copying it out of the raw report
+            encoded_data = memoryview(raw_report)[start + 1 : end - 1]
+            if raw_report.find(b"\\", start, end) >= 0:
+                # escaped characters, it has to be decoded as JSON first
+                encoded_data = json.loads(raw_report[start:end]).encode()
         if coverage_file["format"] == "base64+compressed":
-            return BytesIO(zlib.decompress(base64.b64decode(coverage_file["data"])))
+            return decode_compressed_data(encoded_data)
         log.warning(
             "Unkown format found while parsing upload",
             extra=dict(coverage_file_filename=coverage_file["filename"]),
         )
-        return coverage_file["data"]
+        return bytes(encoded_data)
@@ -16,8 +16,13 @@ from helpers.labels import get_all_report_labels, get_labels_per_session
 from rollouts import USE_LABEL_INDEX_IN_REPORT_PROCESSING_BY_REPO_SLUG, repo_slug
 from services.path_fixer import PathFixer
 from services.report.labels_index import LabelsIndexService
+from services.report.parsed_file_cache import ParsedFileCache, digest
 from services.report.parser.types import ParsedRawReport
-from services.report.report_builder import ReportBuilder, SpecialLabelsEnum
+from services.report.report_builder import (
+    ParserSettings,
+    ReportBuilder,
+    SpecialLabelsEnum,
+)
 from services.report.report_processor import process_report
 from services.yaml import read_yaml_field
 
@@ -57,6 +62,7 @@ def process_raw_upload(
     flags,
     session=None,
     upload: Upload = None,
+    parsed_file_cache: typing.Optional[ParsedFileCache] = None,
 ) -> UploadProcessingResult:
     toc, env = None, None
 
@@ -115,24 +121,45 @@ def process_raw_upload(
     # Process reports
     # ---------------
     ignored_lines = ignored_file_lines or {}
+    parser_settings = ParserSettings.from_yaml(commit_yaml)
+    if parsed_file_cache is not None:
+        # what parsing a file depends on besides its contents and name
+        upload_key = (
+            path_fixer.get_configuration_key(),
+            digest(ignored_lines),
+            parser_settings,
+        )
     for report_file in reports.get_uploaded_files():
         current_filename = report_file.filename
         if report_file.contents:
             if current_filename in skip_files:
                 log.info("Skipping file %s", current_filename)
+                report_file.release()
                 continue
-            path_fixer_to_use = path_fixer.get_relative_path_aware_pathfixer(
-                current_filename
-            )
-            report_builder_to_use = ReportBuilder(
-                commit_yaml, sessionid, ignored_lines, path_fixer_to_use
-            )
-            report = process_report(
-                report=report_file, report_builder=report_builder_to_use
-            )
+            cache_key, found = None, False
+            if parsed_file_cache is not None:
+                cache_key = parsed_file_cache.get_key(report_file, upload_key)
+                found, report = parsed_file_cache.lookup(cache_key, sessionid)
+            if not found:
+                path_fixer_to_use = path_fixer.get_relative_path_aware_pathfixer(
+                    current_filename
+                )
+                report_builder_to_use = ReportBuilder(
+                    commit_yaml,
+                    sessionid,
+                    ignored_lines,
+                    path_fixer_to_use,
+                    parser_settings=parser_settings,
+                )
+                report = process_report(
+                    report=report_file, report_builder=report_builder_to_use
+                )
+                if cache_key is not None:
+                    parsed_file_cache.add(cache_key, report_file, report, sessionid)
+                path_fixer_to_use.log_abnormalities()
             if report:
                 temporary_report.merge(report, joined=True)
-            path_fixer_to_use.log_abnormalities()
+        report_file.release()
     _possibly_log_pathfixer_unusual_results(path_fixer, sessionid)
     if not temporary_report:
         raise ReportEmptyError("No files found in report.")
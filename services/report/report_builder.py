@@ -8,6 +8,7 @@ from shared.reports.types import CoverageDatapoint
 from shared.yaml.user_yaml import UserYaml
 
 from helpers.labels import SpecialLabelsEnum
+from services.yaml import read_yaml_field
 
 log = logging.getLogger(__name__)
 
@@ -56,6 +57,10 @@ class ReportBuilderSession(object):
     def ignored_lines(self):
         return self._report_builder.ignored_lines
 
+    @property
+    def parser_settings(self) -> "ParserSettings":
+        return self._report_builder.parser_settings
+
     def ignore_lines(self, *args, **kwargs):
         return self._report.ignore_lines(*args, **kwargs)
 
@@ -218,11 +223,19 @@ class ReportBuilder(object):
         sessionid: int,
         ignored_lines,
         path_fixer: typing.Callable,
+        parser_settings: typing.Optional["ParserSettings"] = None,
     ):
         self.current_yaml = current_yaml
         self.sessionid = sessionid
         self.ignored_lines = ignored_lines
         self.path_fixer = path_fixer
+        self._parser_settings = parser_settings
+
+    @property
+    def parser_settings(self) -> "ParserSettings":
+        if self._parser_settings is None:
+            self._parser_settings = ParserSettings.from_yaml(self.current_yaml)
+        return self._parser_settings
 
     @property
     def repo_yaml(self) -> UserYaml:
@@ -233,37 +246,98 @@ class ReportBuilder(object):
         return ReportBuilderSession(self, filepath)
 
     def supports_labels(self) -> bool:
-        if self.current_yaml is None or self.current_yaml == {}:
-            return False
-        old_flag_style = self.current_yaml.get("flags")
-        flag_management = self.current_yaml.get("flag_management")
-        # Check if some of the old style flags uses labels
-        old_flag_with_carryforward_labels = False
-        if old_flag_style:
-            old_flag_with_carryforward_labels = any(
-                map(
-                    lambda flag_definition: flag_definition.get("carryforward_mode")
-                    == "labels",
-                    old_flag_style.values(),
-                )
+        return self.parser_settings.supports_labels
+
+
+def yaml_supports_labels(current_yaml) -> bool:
+    if current_yaml is None or current_yaml == {}:
+        return False
+    old_flag_style = current_yaml.get("flags")
+    flag_management = current_yaml.get("flag_management")
+    # Check if some of the old style flags uses labels
+    old_flag_with_carryforward_labels = False
+    if old_flag_style:
+        old_flag_with_carryforward_labels = any(
+            map(
+                lambda flag_definition: flag_definition.get("carryforward_mode")
+                == "labels",
+                old_flag_style.values(),
             )
-        # Check if some of the flags or default rules use labels
-        flag_management_default_rule_carryforward_labels = False
-        flag_management_flag_with_carryforward_labels = False
-        if flag_management:
-            flag_management_default_rule_carryforward_labels = (
-                flag_management.get("default_rules", {}).get("carryforward_mode")
-                == "labels"
+        )
+    # Check if some of the flags or default rules use labels
+    flag_management_default_rule_carryforward_labels = False
+    flag_management_flag_with_carryforward_labels = False
+    if flag_management:
+        flag_management_default_rule_carryforward_labels = (
+            flag_management.get("default_rules", {}).get("carryforward_mode")
+            == "labels"
+        )
+        flag_management_flag_with_carryforward_labels = any(
+            map(
+                lambda flag_definition: flag_definition.get("carryforward_mode")
+                == "labels",
+                flag_management.get("individual_flags", []),
             )
-            flag_management_flag_with_carryforward_labels = any(
-                map(
-                    lambda flag_definition: flag_definition.get("carryforward_mode")
-                    == "labels",
-                    flag_management.get("individual_flags", []),
-                )
+        )
+    return (
+        old_flag_with_carryforward_labels
+        or flag_management_default_rule_carryforward_labels
+        or flag_management_flag_with_carryforward_labels
+    )
+
+
+@dataclasses.dataclass(frozen=True)
+class ParserSettings(object):
+    """
+    Everything the processors read from the commit yaml, read once per upload
+    instead of once per file or line
+    """
+
+    supports_labels: bool = False
+    max_report_age: typing.Any = "12h ago"
+    cobertura_handle_missing_conditions: bool = False
+    cobertura_partials_as_hits: bool = False
+    gcov_branch_detection_method: bool = False
+    gcov_branch_detection_loop: bool = False
+    gcov_branch_detection_conditional: bool = False
+    gcov_branch_detection_macro: bool = False
+    go_partials_as_hits: bool = False
+    jacoco_partials_as_hits: bool = False
+    javascript_enable_partials: bool = False
+
+    @classmethod
+    def from_yaml(cls, current_yaml: UserYaml) -> "ParserSettings":
+        def field(*keys, default=None):
+            return read_yaml_field(current_yaml, ("parsers", *keys), default)
+
+        return cls(
+            supports_labels=yaml_supports_labels(current_yaml),
+            max_report_age=read_yaml_field(
+                current_yaml, ("codecov", "max_report_age"), "12h ago"
+            ),
+            cobertura_handle_missing_conditions=bool(
+                field("cobertura", "handle_missing_conditions", default=False)
+            ),
+            cobertura_partials_as_hits=bool(
+                field("cobertura", "partials_as_hits", default=False)
+            ),
+            gcov_branch_detection_method=field("gcov", "branch_detection", "method")
+            is True,
+            gcov_branch_detection_loop=field("gcov", "branch_detection", "loop")
+            is True,
+            gcov_branch_detection_conditional=field(
+                "gcov", "branch_detection", "conditional"
             )
-        return (
-            old_flag_with_carryforward_labels
-            or flag_management_default_rule_carryforward_labels
-            or flag_management_flag_with_carryforward_labels
+            is True,
+            gcov_branch_detection_macro=field("gcov", "branch_detection", "macro")
+            is True,
+            go_partials_as_hits=bool(
+                (field("go") or {}).get("partials_as_hits", False)
+            ),
+            jacoco_partials_as_hits=bool(
+                (field("jacoco") or {}).get("partials_as_hits", False)
+            ),
+            javascript_enable_partials=bool(
+                (field("javascript") or {}).get("enable_partials", False)
+            ),
         )
@@ -2,6 +2,7 @@
 
 import logging
 import numbers
+import re
 from json import load
 from typing import Any, Optional, Tuple
 
@@ -41,6 +42,7 @@ from services.report.languages import (
     XCodeProcessor,
 )
 from services.report.languages.helpers import remove_non_ascii
+from services.report.languages.node import IstanbulReport, NotIstanbulReport
 from services.report.parser.types import ParsedUploadedReportFile
 from services.report.report_builder import ReportBuilder
 
@@ -94,6 +96,41 @@ def report_type_matching(report: ParsedUploadedReportFile) -> Tuple[Any, Optiona
     return raw_report, "txt"
 
 
+# keys the other json processors match on. An upload without any of them (even
+# nested, the check is only a byte search) can only be matched by `NodeProcessor`
+_NON_ISTANBUL_JSON_KEYS = (
+    b'"coverageData"',
+    b'"uploader"',
+    b'"flowStatus"',
+    b'"coverage"',
+    b'"RSpec"',
+    b'"MiniTest"',
+    b'"fileReports"',
+    b'"source_files"',
+    b'"command_name"',
+    b'"meta"',
+    b'"Type"',
+    b'"File"',
+)
+_JSON_OBJECT_START = re.compile(rb"[ \t\n\r]*\{")
+
+
+def get_istanbul_report(report: ParsedUploadedReportFile) -> Optional[IstanbulReport]:
+    """
+    The upload as an `IstanbulReport` (parsed a file at a time) if it can only be
+    an Istanbul report, without parsing it
+    """
+    raw_report = report.contents
+    if not _JSON_OBJECT_START.match(raw_report):
+        return None
+    if any(raw_report.find(key) >= 0 for key in _NON_ISTANBUL_JSON_KEYS):
+        return None
+    try:
+        return IstanbulReport(raw_report.decode())
+    except UnicodeDecodeError:
+        return None
+
+
 def get_possible_processors_list(report_type) -> list:
     processor_dict = {
         "plist": [XCodePlistProcessor()],
@@ -140,6 +177,17 @@ def process_report(
 ) -> Optional[Report]:
     name = report.filename or ""
     first_line = remove_non_ascii(report.get_first_line().decode(errors="replace"))
+    istanbul_report = get_istanbul_report(report)
+    if istanbul_report is not None:
+        try:
+            return _run_processor(
+                NodeProcessor(), name, istanbul_report, report_builder
+            )
+        except NotIstanbulReport:
+            log.info(
+                "Upload is not an Istanbul report, parsing it fully",
+                extra=dict(report_filename=name),
+            )
     parsed_report, report_type = report_type_matching(report)
     if report_type == "txt" and parsed_report[-11:] == b"has no code":
         # empty [dlst]
@@ -147,31 +195,7 @@ def process_report(
     processors = get_possible_processors_list(report_type)
     for processor in processors:
         if processor.matches_content(parsed_report, first_line, name):
-            with metrics.timer(
-                f"worker.services.report.processors.{processor.name}.run"
-            ):
-                try:
-                    res = processor.process(name, parsed_report, report_builder)
-                    metrics.incr(
-                        f"worker.services.report.processors.{processor.name}.success"
-                    )
-                    return res
-                except CorruptRawReportError as e:
-                    log.warning(
-                        "Processor matched file but later a problem with file was discovered",
-                        extra=dict(
-                            processor_name=processor.name,
-                            expected_format=e.expected_format,
-                            corruption_error=e.corruption_error,
-                        ),
-                        exc_info=True,
-                    )
-                    return None
-                except Exception:
-                    metrics.incr(
-                        f"worker.services.report.processors.{processor.name}.failure"
-                    )
-                    raise
+            return _run_processor(processor, name, parsed_report, report_builder)
     log.info(
         "File format could not be recognized",
         extra=dict(
@@ -179,3 +203,29 @@ def process_report(
         ),
     )
     return None
+
+
+def _run_processor(
+    processor, name: str, parsed_report, report_builder: ReportBuilder
+) -> Optional[Report]:
+    with metrics.timer(f"worker.services.report.processors.{processor.name}.run"):
+        try:
+            res = processor.process(name, parsed_report, report_builder)
+            metrics.incr(f"worker.services.report.processors.{processor.name}.success")
+            return res
+        except CorruptRawReportError as e:
+            log.warning(
+                "Processor matched file but later a problem with file was discovered",
+                extra=dict(
+                    processor_name=processor.name,
+                    expected_format=e.expected_format,
+                    corruption_error=e.corruption_error,
+                ),
+                exc_info=True,
+            )
+            return None
+        except NotIstanbulReport:
+            raise
+        except Exception:
+            metrics.incr(f"worker.services.report.processors.{processor.name}.failure")
+            raise
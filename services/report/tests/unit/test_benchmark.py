@@ -0,0 +1,68 @@
+import pytest
+
+from database.tests.factories import RepositoryFactory
+from services.report.benchmark import (
+    REPORT_GENERATORS,
+    BenchmarkResult,
+    compare_to_baseline,
+    generate_report,
+    measure_line_overhead,
+    process_generated_report,
+    results_to_baseline,
+    run_parser_benchmark,
+)
+
+
+@pytest.mark.parametrize("report_format", sorted(REPORT_GENERATORS))
+def test_generated_reports_are_processed(report_format):
+    contents = generate_report(report_format, files=3, lines_per_file=20)
+    assert contents == generate_report(report_format, files=3, lines_per_file=20)
+    report = process_generated_report(contents, f"coverage.{report_format}")
+    # gcov reports only ever have one file
+    expected_files = 1 if report_format == "gcov" else 3
+    assert len(report.files) == expected_files
+    assert report.totals.lines > 0
+
+
+def test_run_parser_benchmark():
+    result = run_parser_benchmark("lcov", files=2, lines_per_file=10, repeat=2)
+    assert result.report_format == "lcov"
+    assert result.lines == 20
+    assert result.size == len(generate_report("lcov", 2, 10))
+    assert result.seconds > 0
+    assert result.peak_rss > 0
+    assert result.mb_per_second == result.size / 1_000_000 / result.seconds
+
+
+def test_compare_to_baseline():
+    baseline = results_to_baseline(
+        [
+            BenchmarkResult("lcov", 1_000_000, 1000, 1.0, 100_000_000),
+            BenchmarkResult("go", 1_000_000, 1000, 1.0, 100_000_000),
+        ]
+    )
+    assert baseline["lcov"]["mb_per_second"] == 1.0
+    assert baseline["lcov"]["lines_per_second"] == 1000
+    results = [
+        BenchmarkResult("lcov", 1_000_000, 1000, 1.05, 105_000_000),
+        BenchmarkResult("go", 1_000_000, 1000, 2.0, 150_000_000),
+        BenchmarkResult("node", 1_000_000, 1000, 5.0, 100_000_000),
+    ]
+    assert compare_to_baseline(results, baseline) == [
+        "go: mb_per_second went from 1.00 to 0.50",
+        "go: lines_per_second went from 1000.00 to 500.00",
+        "go: peak_rss went from 100000000 to 150000000",
+    ]
+    assert compare_to_baseline(results, baseline, tolerance=0.01) == [
+        "lcov: mb_per_second went from 1.00 to 0.95",
+        "lcov: lines_per_second went from 1000.00 to 952.38",
+        "lcov: peak_rss went from 100000000 to 105000000",
+        "go: mb_per_second went from 1.00 to 0.50",
+        "go: lines_per_second went from 1000.00 to 500.00",
+        "go: peak_rss went from 100000000 to 150000000",
+    ]
+
+
+def test_measure_line_overhead():
+    assert measure_line_overhead(lines=100) > 0
+    assert measure_line_overhead(lines=100, cached=False) > 0
@@ -0,0 +1,148 @@
+import gzip
+from json import loads
+
+from shared.reports.resources import LineSession, Report, ReportFile, ReportLine
+
+from services.report.chunk_loading import compress_chunks, read_chunks_partially
+
+
+def _sample_report() -> Report:
+    report = Report()
+    for i in range(5):
+        report_file = ReportFile(f"file_{i}.py")
+        for ln in range(1, 20):
+            coverage = (ln + i) % 3
+            report_file.append(
+                ln, ReportLine.create(coverage, sessions=[LineSession(0, coverage)])
+            )
+        report_file.append(
+            25, ReportLine.create("1/2", type="b", sessions=[LineSession(0, "1/2")])
+        )
+        report.append(report_file)
+    return report
+
+
+def test_compress_chunks():
+    archive_data = _sample_report().to_archive().encode()
+    compressed, chunks_index = compress_chunks(archive_data)
+    # small chunks share a frame
+    assert chunks_index == {"version": 3, "frames": [[0, len(compressed), 5]]}
+    assert gzip.decompress(compressed) == archive_data
+
+    compressed, chunks_index = compress_chunks(archive_data, frame_size=1)
+    # the frames are still a gzip file of the whole chunks
+    assert gzip.decompress(compressed) == archive_data
+    assert [
+        gzip.decompress(compressed[start:end])
+        for start, end, _ in chunks_index["frames"]
+    ] == [
+        chunk + b"<<<<< end_of_chunk >>>>>"
+        for chunk in archive_data.split(b"<<<<< end_of_chunk >>>>>")[:-1]
+    ] + [
+        archive_data.split(b"<<<<< end_of_chunk >>>>>")[-1]
+    ]
+    assert [count for _, _, count in chunks_index["frames"]] == [1] * 5
+
+    compressed, chunks_index = compress_chunks(b"")
+    assert gzip.decompress(compressed) == b""
+    assert chunks_index == {"version": 3, "frames": [[0, len(compressed), 1]]}
+
+
+def test_read_chunks_partially():
+    original = _sample_report()
+    compressed, chunks_index = compress_chunks(
+        original.to_archive().encode(), frame_size=1
+    )
+    _, report_json = original.to_database()
+    files = loads(report_json)["files"]
+    reads = []
+
+    def read_range(start, end):
+        reads.append((start, end))
+        return compressed[start:end]
+
+    wanted = {"file_1.py", "file_3.py"}
+    chunks = read_chunks_partially(
+        read_range,
+        chunks_index,
+        [files[filename][0] for filename in wanted],
+        max_gap=0,
+    )
+    assert len(reads) == 2
+    assert sum(end - start for start, end in reads) < len(compressed) / 2
+    report = Report.from_chunks(
+        chunks=chunks,
+        files={name: files[name] for name in wanted},
+        sessions={},
+        totals=None,
+    )
+    assert sorted(report.files) == sorted(wanted)
+    for filename in wanted:
+        assert list(report.get(filename).lines) == list(original.get(filename).lines)
+
+    # close enough frames are read at once
+    reads.clear()
+    assert (
+        read_chunks_partially(
+            read_range, chunks_index, [files[filename][0] for filename in wanted]
+        )
+        == chunks
+    )
+    assert len(reads) == 1
+
+    # every chunk, like the whole file
+    assert read_chunks_partially(read_range, chunks_index, range(5)) == (
+        original.to_archive()
+    )
+
+
+def test_read_chunks_partially_shared_frame():
+    original = _sample_report()
+    compressed, chunks_index = compress_chunks(original.to_archive().encode())
+    _, report_json = original.to_database()
+    files = loads(report_json)["files"]
+    chunks = read_chunks_partially(
+        lambda start, end: compressed[start:end], chunks_index, [files["file_2.py"][0]]
+    )
+    report = Report.from_chunks(
+        chunks=chunks, files={"file_2.py": files["file_2.py"]}, sessions={}, totals=None
+    )
+    assert list(report.get("file_2.py").lines) == list(original.get("file_2.py").lines)
+    # the other chunks of the frame are left empty
+    assert chunks.split("<<<<< end_of_chunk >>>>>")[3] == "\n\n"
+
+
+def test_read_chunks_partially_index_not_matching():
+    archive_data = _sample_report().to_archive().encode()
+    compressed, chunks_index = compress_chunks(archive_data, frame_size=1)
+    other_data = compressed[1:] + b"\n"
+
+    def read_range(start, end):
+        return other_data[start:end]
+
+    assert read_chunks_partially(read_range, chunks_index, [2]) is None
+    assert read_chunks_partially(read_range, chunks_index, [5]) is None
+    assert read_chunks_partially(read_range, {"version": 2}, [2]) is None
+    assert read_chunks_partially(read_range, None, [2]) is None
+    # the index of the chunks before they were saved again
+    report = _sample_report()
+    report_file = ReportFile("file_0.py")
+    report_file.append(30, ReportLine.create(1, sessions=[LineSession(0, 1)]))
+    report.append(report_file)
+    new_compressed, _ = compress_chunks(report.to_archive().encode(), frame_size=1)
+    assert (
+        read_chunks_partially(
+            lambda start, end: new_compressed[start:end], chunks_index, [2]
+        )
+        is None
+    )
+    assert (
+        read_chunks_partially(
+            lambda start, end: compressed[start:end],
+            chunks_index,
+            [0, 2, 4],
+            max_gap=0,
+            max_reads=2,
+        )
+        is None
+    )
@@ -74,3 +74,64 @@ class TestFixes(unittest.TestCase):
             },
         }
         assert expected_result == res
+
+    def test_fixes_bytes(self):
+        res = fixes.get_fixes_from_raw(b"file:1,2,3\nEOF: 10 file", str)
+        assert res == {"file": {"eof": 10, "lines": {1, 2, 3}}}
+
+    def test_fixes_comment_block_is_a_single_range(self):
+        res = fixes.get_fixes_from_raw(
+            "file:1:LCOV_EXCL_START\nfile:5000000:LCOV_EXCL_STOP\nfile:7000000:", str
+        )
+        lines = res["file"]["lines"]
+        assert lines.ranges == [(1, 5000000), (7000000, 7000000)]
+        assert 1 in lines
+        assert 2500000 in lines
+        assert 5000001 not in lines
+        assert 7000000 in lines
+        assert len(lines) == 5000001
+
+    def test_fixes_eof_before_lines(self):
+        res = fixes.get_fixes_from_raw("EOF: 17 file\nfile:8,12", str)
+        assert res == {"file": {"eof": 17, "lines": {8, 12}}}
+
+    def test_fixes_ignored_file(self):
+        res = fixes.get_fixes_from_raw(
+            "file:1\nignored:2\nignored:3:/*\nfile:4",
+            lambda path: None if path == "ignored" else path,
+        )
+        assert res == {"file": {"lines": {1, 4}}}
+
+    def test_fixes_path_fixer_called_once_per_file(self):
+        calls = []
+
+        def fix(path):
+            calls.append(path)
+            return path
+
+        fixes.get_fixes_from_raw("a:1\nb:2\na:3\nEOF: 5 a\nb:4", fix)
+        assert calls == ["a", "b"]
+
+
+class TestLineRanges(unittest.TestCase):
+    def test_line_ranges(self):
+        lines = fixes.LineRanges([(5, 8), (1, 1), (9, 10), (20, 19), (7, 12), (30, 30)])
+        assert lines.ranges == [(1, 1), (5, 12), (30, 30)]
+        assert [ln in lines for ln in (0, 1, 2, 4, 5, 12, 13, 30, 31)] == [
+            False,
+            True,
+            False,
+            False,
+            True,
+            True,
+            False,
+            True,
+            False,
+        ]
+        assert list(lines) == [1, 5, 6, 7, 8, 9, 10, 11, 12, 30]
+        assert len(lines) == 10
+        assert lines == set(lines)
+        assert lines != {1, 5}
+        assert lines == fixes.LineRanges([(1, 1), (5, 12), (30, 30)])
+        assert not fixes.LineRanges()
+        assert 1 not in fixes.LineRanges()
@@ -13,6 +13,14 @@ from shared.yaml import UserYaml
 
 from helpers.exceptions import CorruptRawReportError, ReportEmptyError
 from services.report import raw_upload_processor as process
+from services.report import report_processor
+from services.report.languages import node
+from services.report.parsed_file_cache import (
+    ParsedFileCache,
+    clear_commit_parsed_file_caches,
+    digest,
+    get_commit_parsed_file_cache,
+)
 from services.report.parser import LegacyReportParser
 from services.report.parser.types import LegacyParsedRawReport, ParsedUploadedReportFile
 from services.report.report_builder import ReportBuilder
@@ -308,6 +316,89 @@ class TestProcessRawUpload(BaseTestCase):
             )
 
 
+class TestProcessRawUploadParsedFileCache(BaseTestCase):
+    def _parse(self, contents):
+        return LegacyReportParser().parse_raw_report_from_io(BytesIO(contents))
+
+    def test_identical_files_are_parsed_once(self, mocker):
+        process_report = mocker.spy(process, "process_report")
+        parsed_file_cache = ParsedFileCache()
+        contents = b"# path=app.coverage.txt\n/file:\n 1 | 1|line\n 2 | 0|line\n"
+        master = None
+        for _ in range(3):
+            master = process.process_raw_upload(
+                commit_yaml=UserYaml({}),
+                original_report=master,
+                reports=self._parse(contents),
+                flags=[],
+                parsed_file_cache=parsed_file_cache,
+            ).report
+        assert process_report.call_count == 1
+        assert sorted(master.sessions) == [0, 1, 2]
+        assert [s.id for s in master["file"][1].sessions] == [0, 1, 2]
+        assert [s.id for s in master["file"][2].sessions] == [0, 1, 2]
+        assert master["file"][1].coverage == 1
+        assert master["file"][2].coverage == 0
+        # every session got the totals of its own copy
+        assert master.sessions[2].totals.lines == 2
+
+        # different contents or another path fixer are parsed again
+        process.process_raw_upload(
+            commit_yaml=UserYaml({}),
+            original_report=master,
+            reports=self._parse(contents.replace(b"0|line", b"2|line")),
+            flags=[],
+            parsed_file_cache=parsed_file_cache,
+        )
+        process.process_raw_upload(
+            commit_yaml=UserYaml({"fixes": ["::prefix/"]}),
+            original_report=master,
+            reports=self._parse(contents),
+            flags=[],
+            parsed_file_cache=parsed_file_cache,
+        )
+        assert process_report.call_count == 3
+
+    def test_big_files_are_not_kept(self):
+        parsed_file_cache = ParsedFileCache(max_file_size=10)
+        report_file = ParsedUploadedReportFile(
+            filename="app.coverage.txt",
+            file_contents=BytesIO(b"/file:\n 1 | 1|line\n"),
+        )
+        key = parsed_file_cache.get_key(report_file, "upload")
+        parsed_file_cache.add(key, report_file, Report(), 0)
+        assert parsed_file_cache.lookup(key, 1) == (False, None)
+
+    def test_commit_caches(self, mock_configuration):
+        mock_configuration._params["setup"]["parsed_file_cache"] = {
+            "max_commits": 2,
+            "max_total_size": 100,
+        }
+        clear_commit_parsed_file_caches()
+        try:
+            first = get_commit_parsed_file_cache(1, "abc")
+            # the same cache for every task of the process
+            assert get_commit_parsed_file_cache(1, "abc") is first
+            assert get_commit_parsed_file_cache(2, "abc") is not first
+            second = get_commit_parsed_file_cache(1, "def")
+            # the least recently used commit is dropped
+            assert get_commit_parsed_file_cache(1, "abc") is not first
+            assert get_commit_parsed_file_cache(1, "def") is second
+            second.total_size = 80
+            get_commit_parsed_file_cache(1, "abc").total_size = 30
+            # over `max_total_size`, the least recently used commit is dropped
+            assert get_commit_parsed_file_cache(1, "def") is second
+            assert get_commit_parsed_file_cache(1, "abc").total_size == 0
+        finally:
+            clear_commit_parsed_file_caches()
+
+    def test_digest_ignores_order(self):
+        assert digest({"b.py": {3, 1, 2}, "a.py": {"lines": {5, 4}, "eof": 10}}) == (
+            digest({"a.py": {"eof": 10, "lines": {4, 5}}, "b.py": {2, 3, 1}})
+        )
+        assert digest({"a.py": {1}}) != digest({"a.py": {2}})
+
+
 class TestProcessRawUploadFixed(BaseTestCase):
     def test_fixes(self):
         reports = "\n".join(
@@ -780,6 +871,41 @@ class TestProcessReport(BaseTestCase):
         )
         assert res is None
 
+    def test_istanbul_report_is_parsed_a_file_at_a_time(self, mocker):
+        from_json = mocker.spy(node, "from_json")
+        report = ParsedUploadedReportFile(
+            filename=None,
+            file_contents=BytesIO(
+                b'{"a.js": {"statementMap": {"1": {"start": {"line": 1, "column": 0},'
+                b' "end": {"line": 1, "column": 5}}}, "s": {"1": 2}, "fnMap": {}}}'
+            ),
+        )
+        res = process.process_report(
+            report=report,
+            report_builder=ReportBuilder(
+                current_yaml=None, sessionid=0, ignored_lines={}, path_fixer=str
+            ),
+        )
+        assert isinstance(from_json.call_args[0][0], node.IstanbulReport)
+        assert res.files == ["a.js"]
+        assert res.get("a.js").get(1).coverage == 2
+
+    def test_not_istanbul_report_is_parsed_fully(self, mocker):
+        report_type_matching = mocker.spy(report_processor, "report_type_matching")
+        report = ParsedUploadedReportFile(
+            filename=None,
+            file_contents=BytesIO(b'{"a.js": {"statementMap": {}}, "b.js": 1}'),
+        )
+        res = process.process_report(
+            report=report,
+            report_builder=ReportBuilder(
+                current_yaml=None, sessionid=0, ignored_lines={}, path_fixer=str
+            ),
+        )
+        # not all files are objects, so nothing matches it
+        assert res is None
+        report_type_matching.assert_called_with(report)
+
     def test_xxe_entity_not_called(self, mocker):
         report_xxe_xml = """<?xml version="1.0"?>
         <!DOCTYPE coverage [
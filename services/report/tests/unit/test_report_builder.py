@@ -4,6 +4,7 @@ from shared.reports.types import CoverageDatapoint
 
 from services.report.report_builder import (
     CoverageType,
+    ParserSettings,
     ReportBuilder,
     SpecialLabelsEnum,
 )
@@ -355,3 +356,51 @@ def test_report_builder_session_create_line(mocker):
 def test_report_builder_supports_flags(current_yaml, expected_result):
     builder = ReportBuilder(current_yaml, 0, None, None)
     assert builder.supports_labels() == expected_result
+
+
+def test_parser_settings_from_yaml():
+    assert ParserSettings.from_yaml({}) == ParserSettings()
+    assert ParserSettings.from_yaml(None) == ParserSettings()
+    settings = ParserSettings.from_yaml(
+        {
+            "codecov": {"max_report_age": False},
+            "flags": {"unit": {"carryforward_mode": "labels"}},
+            "parsers": {
+                "cobertura": {"handle_missing_conditions": True},
+                "gcov": {"branch_detection": {"loop": True, "macro": "yes"}},
+                "go": {"partials_as_hits": True},
+                "javascript": {"enable_partials": True},
+            },
+        }
+    )
+    assert settings == ParserSettings(
+        supports_labels=True,
+        max_report_age=False,
+        cobertura_handle_missing_conditions=True,
+        gcov_branch_detection_loop=True,
+        go_partials_as_hits=True,
+        javascript_enable_partials=True,
+    )
+
+
+def test_report_builder_reads_the_yaml_once(mocker):
+    from_yaml = mocker.spy(ParserSettings, "from_yaml")
+    builder = ReportBuilder(
+        {"flag_management": {"default_rules": {"carryforward_mode": "labels"}}},
+        0,
+        {},
+        None,
+    )
+    builder_session = builder.create_report_builder_session("path")
+    for ln in range(10):
+        builder_session.create_coverage_line(
+            "file.py", 1, coverage_type=CoverageType.line
+        )
+    assert builder.supports_labels()
+    assert from_yaml.call_count == 1
+
+    settings = ParserSettings(go_partials_as_hits=True)
+    builder = ReportBuilder({}, 0, {}, None, parser_settings=settings)
+    assert builder_session.parser_settings.supports_labels
+    assert builder.create_report_builder_session("path").parser_settings is settings
+    assert from_yaml.call_count == 1
@@ -15,6 +15,7 @@ from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 
 from database.models import Commit, Owner, Pull, Repository
+from helpers.event_loop import get_shared_http_client
 from helpers.token_refresh import get_token_refresh_callback
 from services.bots import get_repo_appropriate_bot_token, get_token_type_mapping
 from services.yaml import read_yaml_field
@@ -59,7 +60,26 @@ def get_repo_provider_service(
 
 
 def _get_repo_provider_service_instance(service_name, **adapter_params):
-    return torngit.get(service_name, **adapter_params)
+    adapter = torngit.get(service_name, **adapter_params)
+    _share_http_clients(adapter, service_name)
+    return adapter
+
+
+def _share_http_clients(adapter, service_name) -> None:
+    """
+    Makes `adapter` use the http clients shared by the tasks of this process, so
+    connections to the provider (and their TLS handshakes) are reused
+
+    `get_client` is private to torngit, the tests of `get_repo_provider_service`
+    check the adapters still make their clients with it.
+    """
+    make_client = adapter.get_client
+
+    def get_client(*args, **kwargs):
+        key = (service_name, repr(args), repr(sorted(kwargs.items())))
+        return get_shared_http_client(key, lambda: make_client(*args, **kwargs))
+
+    adapter.get_client = get_client
 
 
 async def fetch_appropriate_parent_for_commit(
@@ -1,6 +1,6 @@
 import logging
 
-from shared.storage import get_appropriate_storage_service
+from shared.storage import MinioStorageService, get_appropriate_storage_service
 from shared.storage.base import BaseStorageService
 
 log = logging.getLogger(__name__)
@@ -18,3 +18,28 @@ def _cached_get_storage_client() -> BaseStorageService:
         log.info("Initializing singleton storage service")
         _storage_client = get_appropriate_storage_service()
     return _storage_client
+
+
+def read_file_range(
+    storage: BaseStorageService, bucket_name: str, path: str, start: int, end: int
+) -> bytes:
+    """
+    The bytes from `start` to `end` of the file at `path`, as they are stored (so
+    still gzipped for the files written gzipped).
+
+    The storage services of shared have no ranged reads, this is the one place
+    that does them. Only the minio service supports them for now, the other ones
+    raise NotImplementedError.
+    """
+    if not isinstance(storage, MinioStorageService):
+        raise NotImplementedError(
+            f"Ranged reads are not supported by {type(storage).__name__}"
+        )
+    response = storage.minio_client.get_object(
+        bucket_name, path, offset=start, length=end - start
+    )
+    try:
+        return response.read(decode_content=False)
+    finally:
+        response.close()
+        response.release_conn()
@@ -0,0 +1,172 @@
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterable, Optional
+
+from shared.config import get_config
+
+from helpers.metrics import metrics
+from services.storage import get_storage_client
+
+log = logging.getLogger(__name__)
+
+PROFILES_FOLDER = "task_profiles"
+
+DEFAULT_PROFILING_SETTINGS = {
+    # fraction of the runs of a task that are profiled
+    "sample_rate": 0.0,
+    # when set, only the profiles of the runs that took longer than this (in
+    # seconds) are saved
+    "duration_threshold": None,
+    # seconds between two samples of the stack
+    "interval": 0.005,
+}
+
+
+def get_task_profiling_settings(task_name: str) -> dict:
+    """
+    Profiling settings of `task_name`: `setup.task_profiling`, overridden by
+    `setup.task_profiling.tasks.<task name>`
+    """
+    settings = get_config("setup", "task_profiling", default={}) or {}
+    task_settings = (settings.get("tasks") or {}).get(task_name) or {}
+    return {
+        name: task_settings.get(name, settings.get(name, default))
+        for name, default in DEFAULT_PROFILING_SETTINGS.items()
+    }
+
+
+def _bucket_name() -> str:
+    return get_config("services", "minio", "bucket", default="archive")
+
+
+class StackSampler(object):
+    """
+    Samples the stack of the thread that started it every `interval` seconds of
+    wall time, and counts the samples of each stack in `samples`
+
+    The stacks are kept in the collapsed format (`outer;inner;innermost`) that
+    flamegraph tools read. Since it's wall time it shows where a task waits on I/O
+    too. Samples are taken from another thread with `sys._current_frames()`, so
+    no signal interrupts the system calls of the task.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples = Counter()
+        self._thread_id = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _take_sample(self) -> None:
+        frame = sys._current_frames().get(self._thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_filename}:{code.co_name}")
+            frame = frame.f_back
+        if stack:
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self._take_sample()
+
+    def start(self) -> None:
+        self._thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="task-profiling", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def to_collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.items())
+
+
+def get_profile_path(task_name: str, day: str, task_id: Optional[str]) -> str:
+    return f"{PROFILES_FOLDER}/{task_name}/{day}/{task_id or 'unknown'}.txt"
+
+
+def save_task_profile(
+    task_name: str, task_id: Optional[str], sampler: StackSampler
+) -> Optional[str]:
+    path = get_profile_path(task_name, datetime.utcnow().strftime("%Y-%m-%d"), task_id)
+    try:
+        get_storage_client().write_file(
+            _bucket_name(), path, sampler.to_collapsed().encode()
+        )
+    except Exception:
+        log.warning("Unable to save task profile", exc_info=True)
+        return None
+    metrics.incr(f"worker.task_profiling.{task_name}.saved")
+    return path
+
+
+_profiling = threading.local()
+
+
+@contextmanager
+def profile_task(task_name: str, task_id: Optional[str]):
+    """
+    Samples the stacks of the block when this run of `task_name` is picked by
+    `sample_rate`, and saves them to the archive bucket under
+    `task_profiles/<task name>/<day>/<task id>.txt` (if it took longer than
+    `duration_threshold`, when set). Inside the block of another `profile_task`
+    (eg a task run from another one) it does nothing, the outer one samples it.
+    """
+    settings = get_task_profiling_settings(task_name)
+    if getattr(_profiling, "active", False) or not (
+        random.random() < settings["sample_rate"]
+    ):
+        yield
+        return
+    threshold = settings["duration_threshold"]
+    sampler = StackSampler(settings["interval"])
+    start = time.monotonic()
+    _profiling.active = True
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        _profiling.active = False
+        duration = time.monotonic() - start
+        if threshold is None or duration >= threshold:
+            path = save_task_profile(task_name, task_id, sampler)
+            log.info(
+                "Saved task profile",
+                extra=dict(task_name=task_name, duration=duration, path=path),
+            )
+
+
+def aggregate_task_profiles(task_name: str, days: Iterable[str] = ()) -> Counter:
+    """
+    Sums the samples of every saved profile of `task_name` (only the ones of
+    `days`, when given) per stack
+    """
+    storage = get_storage_client()
+    bucket = _bucket_name()
+    prefixes = [f"{PROFILES_FOLDER}/{task_name}/{day}/" for day in days] or [
+        f"{PROFILES_FOLDER}/{task_name}/"
+    ]
+    aggregated = Counter()
+    for prefix in prefixes:
+        for stored_file in storage.list_folder_contents(bucket, prefix):
+            content = storage.read_file(bucket, stored_file["name"]).decode()
+            for line in content.splitlines():
+                stack, _, count = line.rpartition(" ")
+                if stack:
+                    aggregated[stack] += int(count)
+    return aggregated
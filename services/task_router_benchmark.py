@@ -0,0 +1,40 @@
+import time
+from typing import List
+
+import shared.celery_config as shared_celery_config
+
+from celery_task_router import owner_plan_cache, route_task
+from database.engine import get_db_session
+from database.models import Repository
+
+
+def get_benchmark_repoids(repos: int = 100) -> List[int]:
+    return [
+        repoid for (repoid,) in get_db_session().query(Repository.repoid).limit(repos)
+    ]
+
+
+def measure_plan_lookup(
+    repoids: List[int], lookups: int = 1000, cached: bool = True
+) -> float:
+    """
+    Microseconds `route_task` takes to route an upload, going through `repoids`
+    in turn, with the owner plan cache on or off. The cache is emptied before and
+    after, and left in the state it was in.
+    """
+    enabled = owner_plan_cache.enabled
+    owner_plan_cache.enabled = cached
+    owner_plan_cache.invalidate()
+    try:
+        start = time.perf_counter()
+        for number in range(lookups):
+            route_task(
+                shared_celery_config.upload_task_name,
+                [],
+                dict(repoid=repoids[number % len(repoids)]),
+                {},
+            )
+        return (time.perf_counter() - start) / lookups * 1e6
+    finally:
+        owner_plan_cache.enabled = enabled
+        owner_plan_cache.invalidate()
@@ -0,0 +1,155 @@
+from redis.exceptions import ConnectionError
+
+from database.models import Commit, CommitReport, Pull, Upload, UploadLevelTotals
+from database.models.staticanalysis import (
+    StaticAnalysisSingleFileSnapshot,
+    StaticAnalysisSuiteFilepath,
+)
+from database.tests.factories import (
+    BranchFactory,
+    CommitFactory,
+    CompareCommitFactory,
+    PullFactory,
+    RepositoryFactory,
+)
+from database.tests.factories.core import (
+    ReportFactory,
+    UploadFactory,
+    UploadLevelTotalsFactory,
+)
+from database.tests.factories.staticanalysis import StaticAnalysisSuiteFilepathFactory
+from services.deletion import (
+    ChunkedDeletion,
+    DeletionCheckpoint,
+    delete_repository_contents,
+)
+
+
+class TestDeletionCheckpoint(object):
+    def test_redis_errors_are_not_fatal(self, mocker):
+        redis_connection = mocker.MagicMock(
+            hget=mocker.MagicMock(side_effect=ConnectionError()),
+            hset=mocker.MagicMock(side_effect=ConnectionError()),
+            delete=mocker.MagicMock(side_effect=ConnectionError()),
+        )
+        checkpoint = DeletionCheckpoint(redis_connection, "flush_repo/1")
+        assert checkpoint.get("1/commits") is None
+        assert checkpoint.get_deleted("1/commits") == 0
+        checkpoint.set("1/commits", 10, deleted=20)
+        checkpoint.clear()
+
+    def test_get(self, mock_redis):
+        mock_redis.hget.return_value = b"123"
+        checkpoint = DeletionCheckpoint(mock_redis, "flush_repo/1")
+        assert checkpoint.get("1/commits") == "123"
+        mock_redis.hget.assert_called_with(
+            "deletion_checkpoint/flush_repo/1", "1/commits"
+        )
+        assert checkpoint.get_deleted("1/commits") == 123
+        mock_redis.hget.assert_called_with(
+            "deletion_checkpoint/flush_repo/1", "1/commits/deleted"
+        )
+
+    def test_set(self, mock_redis):
+        checkpoint = DeletionCheckpoint(mock_redis, "flush_repo/1")
+        checkpoint.set("1/commits", 10, deleted=20)
+        mock_redis.hset.assert_called_with(
+            "deletion_checkpoint/flush_repo/1",
+            mapping={"1/commits": "10", "1/commits/deleted": "20"},
+        )
+
+
+class TestChunkedDeletion(object):
+    def test_delete_repository_contents(self, dbsession, mock_redis):
+        mock_redis.hget.return_value = None
+        repository = RepositoryFactory.create()
+        dbsession.add(repository)
+        dbsession.flush()
+        for _ in range(5):
+            commit = CommitFactory.create(repository=repository)
+            report = ReportFactory.create(commit=commit)
+            upload = UploadFactory.create(report=report)
+            dbsession.add(UploadLevelTotalsFactory.create(upload=upload))
+        base_commit = CommitFactory.create(repository=repository)
+        head_commit = CommitFactory.create(repository=repository)
+        dbsession.add(
+            CompareCommitFactory.create(
+                base_commit=base_commit, compare_commit=head_commit
+            )
+        )
+        filepath = StaticAnalysisSuiteFilepathFactory.create(
+            analysis_suite__commit=CommitFactory.create(repository=repository),
+            file_snapshot__repository=repository,
+        )
+        dbsession.add(filepath)
+        for i in range(3):
+            dbsession.add(PullFactory.create(repository=repository, pullid=i + 1))
+        dbsession.add(BranchFactory.create(repository=repository))
+        other_commit = CommitFactory.create()
+        dbsession.add(other_commit)
+        dbsession.flush()
+
+        deletion = ChunkedDeletion(
+            dbsession, DeletionCheckpoint(mock_redis, "test"), batch_size=2
+        )
+        res = delete_repository_contents(deletion, repository.repoid)
+
+        assert res == {
+            "deleted_commits_count": 8,
+            "delete_branches_count": 1,
+            "deleted_pulls_count": 3,
+        }
+        assert deletion.deleted["reports_upload"] == 5
+        assert deletion.deleted["compare_commitcomparison"] == 1
+        assert dbsession.query(Commit).filter_by(repoid=repository.repoid).count() == 0
+        assert dbsession.query(Pull).filter_by(repoid=repository.repoid).count() == 0
+        assert dbsession.query(CommitReport).count() == 0
+        assert dbsession.query(Upload).count() == 0
+        assert dbsession.query(UploadLevelTotals).count() == 0
+        assert dbsession.query(StaticAnalysisSuiteFilepath).count() == 0
+        assert dbsession.query(StaticAnalysisSingleFileSnapshot).count() == 0
+        assert dbsession.query(Commit).filter_by(id_=other_commit.id_).count() == 1
+        # every batch of commits saves the progress of the step
+        commit_checkpoints = [
+            call.kwargs["mapping"]
+            for call in mock_redis.hset.call_args_list
+            if f"{repository.repoid}/commits" in call.kwargs["mapping"]
+        ]
+        assert len(commit_checkpoints) == 5
+        assert commit_checkpoints[-1] == {
+            f"{repository.repoid}/commits": ChunkedDeletion.DONE,
+            f"{repository.repoid}/commits/deleted": "8",
+        }
+
+        deletion.finish()
+        mock_redis.delete.assert_called_with("deletion_checkpoint/test")
+
+    def test_delete_in_batches_resumes_from_checkpoint(self, dbsession, mock_redis):
+        repository = RepositoryFactory.create()
+        dbsession.add(repository)
+        dbsession.flush()
+        commits = [CommitFactory.create(repository=repository) for _ in range(3)]
+        dbsession.add_all(commits)
+        dbsession.flush()
+        ordered_ids = sorted(commit.id_ for commit in commits)
+        saved = {"commits": str(ordered_ids[0]).encode(), "commits/deleted": b"4"}
+        mock_redis.hget.side_effect = lambda key, field: saved.get(field)
+
+        deletion = ChunkedDeletion(
+            dbsession, DeletionCheckpoint(mock_redis, "test"), batch_size=10
+        )
+        deleted = deletion.delete_in_batches(
+            "commits", Commit, Commit.id_, Commit.repoid == repository.repoid
+        )
+        # the commits up to the checkpoint were deleted (and counted) by the
+        # previous attempt
+        assert deleted == 6
+        assert deletion.deleted["commits"] == 2
+
+        saved = {"commits": ChunkedDeletion.DONE.encode(), "commits/deleted": b"6"}
+        assert (
+            deletion.delete_in_batches(
+                "commits", Commit, Commit.id_, Commit.repoid == repository.repoid
+            )
+            == 6
+        )
@@ -1,10 +1,64 @@
-from services.redis import get_redis_connection
+from services.redis import (
+    InstrumentedConnectionPool,
+    _connection_pools,
+    get_redis_connection,
+    get_redis_lock_connection,
+)
 from test_utils.base import BaseTestCase
 
 
 class TestRedis(BaseTestCase):
     def test_get_redis_connection(self, mocker, mock_configuration):
-        mocked = mocker.patch("services.redis.Redis.from_url")
+        mocker.patch.dict(_connection_pools, clear=True)
         res = get_redis_connection()
         assert res is not None
-        mocked.assert_called_with("redis://redis:@localhost:6379/")
+        pool = res.connection_pool
+        assert isinstance(pool, InstrumentedConnectionPool)
+        assert pool.connection_kwargs["host"] == "localhost"
+        assert pool.connection_kwargs["port"] == 6379
+        assert pool.connection_kwargs["health_check_interval"] == 30
+        assert pool.max_connections == 50
+        assert pool.metrics_prefix == "worker.redis.pool.default"
+        # the pool is shared by every connection of the process
+        assert get_redis_connection().connection_pool is pool
+
+    def test_get_redis_lock_connection(self, mocker, mock_configuration):
+        mocker.patch.dict(_connection_pools, clear=True)
+        mock_configuration._params["setup"]["redis"] = {"max_connections": 10}
+        pool = get_redis_connection().connection_pool
+        assert pool.max_connections == 10
+        assert get_redis_lock_connection().connection_pool is pool
+
+        mock_configuration._params["setup"]["redis"]["separate_lock_pool"] = True
+        lock_pool = get_redis_lock_connection().connection_pool
+        assert lock_pool is not pool
+        assert lock_pool.metrics_prefix == "worker.redis.pool.locks"
+
+    def test_pool_usage(self, mocker, mock_configuration):
+        mocker.patch.dict(_connection_pools, clear=True)
+        mocked_gauge = mocker.patch("services.redis.metrics.gauge")
+        mocked_timer = mocker.patch("services.redis.metrics.timer")
+        mocked_time = mocker.patch("services.redis.time.monotonic", return_value=100)
+        connection = mocker.MagicMock()
+        mocker.patch(
+            "services.redis.BlockingConnectionPool.get_connection",
+            return_value=connection,
+        )
+        mocker.patch("services.redis.BlockingConnectionPool.release")
+        pool = get_redis_connection().connection_pool
+        assert pool.get_connection("GET") is connection
+        assert pool.in_use == 1
+        mocked_timer.assert_called_with("worker.redis.pool.default.checkout_wait")
+        mocked_gauge.assert_any_call("worker.redis.pool.default.in_use", 1)
+        assert mocked_gauge.call_count == 2
+        pool.release(connection)
+        assert pool.in_use == 0
+        # the gauges are only sent once per interval, the wait is always timed
+        mocked_time.return_value = 105
+        pool.get_connection("GET")
+        assert mocked_timer.call_count == 2
+        assert mocked_gauge.call_count == 2
+        mocked_time.return_value = 110
+        pool.get_connection("GET")
+        mocked_gauge.assert_any_call("worker.redis.pool.default.in_use", 2)
+        assert mocked_gauge.call_count == 4
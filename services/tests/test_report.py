@@ -1,6 +1,7 @@
 import pprint
 from asyncio import Future
 from decimal import Decimal
+from json import dumps, loads
 
 import mock
 import pytest
@@ -30,6 +31,7 @@ from services.report import (
     ReportService,
 )
 from services.report import log as report_log
+from services.report.chunk_loading import compress_chunks
 from services.report.raw_upload_processor import (
     SessionAdjustmentResult,
     _adjust_sessions,
@@ -809,6 +811,68 @@ class TestReportService(BaseTestCase):
         assert res.totals.complexity_total == 0
         # notice we dont compare the diff since that one comes from git information we lost on the reset
 
+    def test_get_existing_report_for_commit_with_paths(self, dbsession, mock_storage):
+        commit = CommitFactory()
+        dbsession.add(commit)
+        dbsession.commit()
+        with open("tasks/tests/samples/sample_chunks_1.txt") as f:
+            content = f.read().encode()
+            archive_hash = ArchiveService.get_archive_hash(commit.repository)
+            chunks_url = f"v4/repos/{archive_hash}/commits/{commit.commitid}/chunks.txt"
+            mock_storage.write_file("archive", chunks_url, content)
+        res = ReportService({}).get_existing_report_for_commit(
+            commit, paths=[r"^tests/.*"]
+        )
+        assert res is not None
+        assert res.files == ["tests/__init__.py", "tests/test_sample.py"]
+        assert res.totals.files == 2
+        assert res.totals.lines == 10
+        assert res.totals.hits == 9
+        assert res.totals.misses == 1
+
+    def test_get_existing_report_for_commit_with_paths_partially(
+        self, dbsession, mocker, mock_storage
+    ):
+        commit = CommitFactory()
+        dbsession.add(commit)
+        dbsession.commit()
+        with open("tasks/tests/samples/sample_chunks_1.txt") as f:
+            content = f.read().encode()
+        compressed, chunks_index = compress_chunks(content, frame_size=1)
+        archive_hash = ArchiveService.get_archive_hash(commit.repository)
+        chunks_url = f"v4/repos/{archive_hash}/commits/{commit.commitid}/chunks.txt"
+        # what the storage returns when reading the gzipped chunks whole
+        mock_storage.write_file("archive", chunks_url, content)
+        mock_storage.write_file(
+            "archive",
+            f"v4/repos/{archive_hash}/commits/{commit.commitid}/chunks_index.json",
+            dumps(chunks_index),
+        )
+        report_service = ReportService({})
+        mocker.patch.object(report_service, "should_load_partially", return_value=True)
+        read_chunks = mocker.spy(ArchiveService, "read_chunks")
+
+        # the memory storage has no ranged reads, the chunks are read whole
+        res = report_service.get_existing_report_for_commit(
+            commit, paths=[r"^tests/.*"]
+        )
+        assert res.files == ["tests/__init__.py", "tests/test_sample.py"]
+        assert res.totals.lines == 10
+        assert read_chunks.call_count == 1
+
+        read_file_range = mocker.patch(
+            "services.archive.read_file_range",
+            side_effect=lambda storage, bucket, path, start, end: compressed[start:end],
+        )
+        res = report_service.get_existing_report_for_commit(
+            commit, paths=[r"^tests/.*"]
+        )
+        assert res.files == ["tests/__init__.py", "tests/test_sample.py"]
+        assert res.totals.lines == 10
+        assert res.totals.hits == 9
+        assert read_file_range.called
+        assert read_chunks.call_count == 1
+
     @pytest.mark.asyncio
     async def test_create_new_report_for_commit(
         self, dbsession, sample_commit_with_report_big
@@ -3375,6 +3439,41 @@ class TestReportService(BaseTestCase):
         assert res["url"] in mock_storage.storage["archive"]
         assert mock_storage.storage["archive"][res["url"]].decode() == ""
 
+    def test_save_report_for_partial_loading(
+        self, dbsession, mocker, mock_storage, sample_report
+    ):
+        commit = CommitFactory.create()
+        dbsession.add(commit)
+        dbsession.flush()
+        current_report_row = CommitReport(commit_id=commit.id_)
+        dbsession.add(current_report_row)
+        dbsession.flush()
+        report_details = ReportDetails(report_id=current_report_row.id_)
+        dbsession.add(report_details)
+        dbsession.flush()
+        report_service = ReportService({})
+        mocker.patch.object(report_service, "should_load_partially", return_value=True)
+        storage_hash = report_service.get_archive_service(
+            commit.repository
+        ).storage_hash
+        chunks_path = f"v4/repos/{storage_hash}/commits/{commit.commitid}/chunks.txt"
+        index_path = (
+            f"v4/repos/{storage_hash}/commits/{commit.commitid}/chunks_index.json"
+        )
+
+        write_file = mocker.spy(mock_storage, "write_file")
+        res = report_service.save_report(commit, sample_report)
+        assert res == {"url": chunks_path}
+        compressed, chunks_index = compress_chunks(sample_report.to_archive().encode())
+        write_file.assert_any_call(
+            "archive",
+            chunks_path,
+            compressed,
+            reduced_redundancy=False,
+            is_already_gzipped=True,
+        )
+        assert loads(mock_storage.storage["archive"][index_path]) == chunks_index
+
     def test_save_report(self, dbsession, mock_storage, sample_report):
         commit = CommitFactory.create()
         dbsession.add(commit)
@@ -1,6 +1,7 @@
 import inspect
 from datetime import datetime
 
+import httpx
 import mock
 import pytest
 from shared.encryption.oauth import get_encryptor_from_configuration
@@ -18,6 +19,7 @@ from database.tests.factories import (
     PullFactory,
     RepositoryFactory,
 )
+from helpers.event_loop import run_in_event_loop, shutdown_event_loop
 from services.repository import (
     _pick_best_base_comparedto_pair,
     fetch_and_update_pull_request_information,
@@ -63,6 +65,31 @@ class TestRepositoryServiceTestCase(object):
             "secret": None,
         }
 
+    def test_get_repo_provider_service_shares_http_clients(self, dbsession):
+        repo = RepositoryFactory.create(
+            owner__unencrypted_oauth_token="testyftq3ovzkb3zmt823u3t04lkrt9w",
+            owner__service="github",
+            name="example-python",
+        )
+        dbsession.add(repo)
+        dbsession.flush()
+        res = get_repo_provider_service(repo)
+        # the adapters make every client they send requests with through the
+        # (private) `get_client`, which is what the shared clients replace
+        assert callable(getattr(type(res), "get_client", None))
+        assert "self.get_client(" in inspect.getsource(type(res))
+
+        async def get_clients():
+            return res.get_client(), res.get_client()
+
+        try:
+            first, second = run_in_event_loop(get_clients())
+            assert first is second
+            assert isinstance(first.client, httpx.AsyncClient)
+        finally:
+            shutdown_event_loop()
+        assert first.client.is_closed
+
     def test_get_repo_provider_service_bitbucket(self, dbsession):
         repo = RepositoryFactory.create(
             owner__unencrypted_oauth_token="testyftq3ovzkb3zmt823u3t04lkrt9w",
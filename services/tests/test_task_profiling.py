@@ -0,0 +1,101 @@
+import time
+from datetime import datetime
+
+from services.task_profiling import (
+    StackSampler,
+    aggregate_task_profiles,
+    get_task_profiling_settings,
+    profile_task,
+)
+
+
+def busy_function(duration):
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        pass
+
+
+class TestTaskProfiling(object):
+    def test_get_task_profiling_settings(self, mock_configuration):
+        assert get_task_profiling_settings("app.tasks.upload.Upload") == {
+            "sample_rate": 0.0,
+            "duration_threshold": None,
+            "interval": 0.005,
+        }
+        mock_configuration._params["setup"]["task_profiling"] = {
+            "sample_rate": 0.1,
+            "tasks": {"app.tasks.upload.Upload": {"duration_threshold": 30}},
+        }
+        assert get_task_profiling_settings("app.tasks.upload.Upload") == {
+            "sample_rate": 0.1,
+            "duration_threshold": 30,
+            "interval": 0.005,
+        }
+        assert get_task_profiling_settings("app.tasks.notify.Notify") == {
+            "sample_rate": 0.1,
+            "duration_threshold": None,
+            "interval": 0.005,
+        }
+
+    def test_stack_sampler(self):
+        sampler = StackSampler(0.001)
+        sampler.start()
+        busy_function(0.05)
+        sampler.stop()
+        assert sum(sampler.samples.values()) > 0
+        assert any("busy_function" in stack for stack in sampler.samples)
+        for line in sampler.to_collapsed().splitlines():
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0
+
+    def test_profile_task_not_picked(self, mock_configuration, mock_storage, mocker):
+        start = mocker.spy(StackSampler, "start")
+        with profile_task("app.tasks.upload.Upload", "abc"):
+            pass
+        assert not start.called
+
+    def test_profile_task_duration_threshold_only(
+        self, mock_configuration, mock_storage, mocker
+    ):
+        # runs that aren't picked by the sample rate are never sampled
+        mock_configuration._params["setup"]["task_profiling"] = {
+            "duration_threshold": 0.02
+        }
+        start = mocker.spy(StackSampler, "start")
+        with profile_task("app.tasks.upload.Upload", "slow"):
+            busy_function(0.03)
+        assert not start.called
+
+    def test_profile_task_nested(self, mock_configuration, mock_storage, mocker):
+        mock_configuration._params["setup"]["task_profiling"] = {"sample_rate": 1.0}
+        start = mocker.spy(StackSampler, "start")
+        with profile_task("app.tasks.upload.Upload", "outer"):
+            with profile_task("app.tasks.notify.Notify", "inner"):
+                pass
+        assert start.call_count == 1
+        profiles = list(mock_storage.list_folder_contents("archive", "task_profiles/"))
+        assert len(profiles) == 1
+        assert "outer.txt" in profiles[0]["name"]
+
+    def test_profile_task_duration_threshold(
+        self, mock_configuration, mock_storage, mocker
+    ):
+        mock_configuration._params["setup"]["task_profiling"] = {
+            "sample_rate": 1.0,
+            "duration_threshold": 0.02,
+            "interval": 0.001,
+        }
+        mocked_datetime = mocker.patch("services.task_profiling.datetime")
+        mocked_datetime.utcnow.return_value = datetime(2023, 10, 10, 12)
+        with profile_task("app.tasks.upload.Upload", "fast"):
+            pass
+        with profile_task("app.tasks.upload.Upload", "slow"):
+            busy_function(0.05)
+
+        profiles = list(mock_storage.list_folder_contents("archive", "task_profiles/"))
+        assert [profile["name"] for profile in profiles] == [
+            "task_profiles/app.tasks.upload.Upload/2023-10-10/slow.txt"
+        ]
+        aggregated = aggregate_task_profiles("app.tasks.upload.Upload", ["2023-10-10"])
+        assert any("busy_function" in stack for stack in aggregated)
+        assert aggregate_task_profiles("app.tasks.upload.Upload", ["2023-10-11"]) == {}
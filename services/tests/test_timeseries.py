@@ -7,16 +7,19 @@ from shared.reports.resources import Report, ReportFile, ReportLine
 from shared.utils.sessions import Session
 from shared.yaml import UserYaml
 
+from database.models.reports import RepositoryFlag
 from database.models.timeseries import Dataset, Measurement, MeasurementName
 from database.tests.factories import CommitFactory, RepositoryFactory
 from database.tests.factories.reports import RepositoryFlagFactory
 from database.tests.factories.timeseries import DatasetFactory, MeasurementFactory
 from services.timeseries import (
+    MeasurementBatchWriter,
     backfill_batch_size,
     delete_repository_data,
     repository_commits_query,
     repository_datasets_query,
     save_commit_measurements,
+    stored_flag_coverages,
 )
 
 
@@ -107,7 +110,9 @@ class TestTimeseriesService(object):
             return_value=ReadOnlyReport.create_from_report(sample_report),
         )
 
-        commit = CommitFactory.create(branch="foo", repository=repository)
+        commit = CommitFactory.create(
+            branch="foo", repository=repository, totals=None, _report_json=None
+        )
         dbsession.add(commit)
         dbsession.flush()
 
@@ -142,7 +147,9 @@ class TestTimeseriesService(object):
             return_value=None,
         )
 
-        commit = CommitFactory.create(branch="foo", repository=repository)
+        commit = CommitFactory.create(
+            branch="foo", repository=repository, totals=None, _report_json=None
+        )
         dbsession.add(commit)
         dbsession.flush()
 
@@ -169,7 +176,9 @@ class TestTimeseriesService(object):
             return_value=ReadOnlyReport.create_from_report(sample_report),
         )
 
-        commit = CommitFactory.create(branch="foo", repository=repository)
+        commit = CommitFactory.create(
+            branch="foo", repository=repository, totals=None, _report_json=None
+        )
         dbsession.add(commit)
         dbsession.flush()
 
@@ -220,7 +229,9 @@ class TestTimeseriesService(object):
             return_value=ReadOnlyReport.create_from_report(sample_report),
         )
 
-        commit = CommitFactory.create(branch="foo", repository=repository)
+        commit = CommitFactory.create(
+            branch="foo", repository=repository, totals=None, _report_json=None
+        )
         dbsession.add(commit)
         dbsession.flush()
 
@@ -293,7 +304,9 @@ class TestTimeseriesService(object):
             return_value=ReadOnlyReport.create_from_report(sample_report),
         )
 
-        commit = CommitFactory.create(branch="foo", repository=repository)
+        commit = CommitFactory.create(
+            branch="foo", repository=repository, totals=None, _report_json=None
+        )
         dbsession.add(commit)
         dbsession.flush()
 
@@ -394,7 +407,9 @@ class TestTimeseriesService(object):
             ),
         )
 
-        commit = CommitFactory.create(branch="foo", repository=repository)
+        commit = CommitFactory.create(
+            branch="foo", repository=repository, totals=None, _report_json=None
+        )
         dbsession.add(commit)
         dbsession.flush()
 
@@ -573,7 +588,9 @@ class TestTimeseriesService(object):
             ),
         )
 
-        commit = CommitFactory.create(branch="foo", repository=repository)
+        commit = CommitFactory.create(
+            branch="foo", repository=repository, totals=None, _report_json=None
+        )
         dbsession.add(commit)
         dbsession.flush()
 
@@ -645,6 +662,237 @@ class TestTimeseriesService(object):
 
         assert dbsession.query(Measurement).count() == 0
 
+    def test_batch_writer_uses_stored_totals(self, dbsession, repository, mocker):
+        get_report = mocker.patch(
+            "services.report.ReportService.get_existing_report_for_commit"
+        )
+
+        commits = [
+            CommitFactory.create(branch="foo", repository=repository) for _ in range(3)
+        ]
+        dbsession.add_all(commits)
+        dbsession.flush()
+
+        writer = MeasurementBatchWriter(
+            repository,
+            dataset_names=[
+                MeasurementName.coverage.value,
+                MeasurementName.flag_coverage.value,
+            ],
+        )
+        for commit in commits:
+            writer.add_commit(commit)
+        # adding the same commit twice doesn't duplicate its measurements
+        writer.add_commit(commits[0])
+        assert writer.flush() == 6
+        assert writer.flush() == 0
+
+        assert not get_report.called
+        assert writer.reports_loaded == 0
+        coverage_measurements = (
+            dbsession.query(Measurement)
+            .filter_by(name=MeasurementName.coverage.value)
+            .all()
+        )
+        assert len(coverage_measurements) == 3
+        assert all(m.value == 85.0 for m in coverage_measurements)
+        flag_measurements = (
+            dbsession.query(Measurement)
+            .filter_by(name=MeasurementName.flag_coverage.value)
+            .all()
+        )
+        assert len(flag_measurements) == 3
+        assert all(m.value == 85.0 for m in flag_measurements)
+        assert (
+            dbsession.query(RepositoryFlag)
+            .filter_by(repository_id=repository.repoid, flag_name="unit")
+            .count()
+            == 1
+        )
+
+    def test_batch_writer_loads_report_for_shared_flags(
+        self, dbsession, sample_report, repository, mocker
+    ):
+        get_report = mocker.patch(
+            "services.report.ReportService.get_existing_report_for_commit",
+            return_value=ReadOnlyReport.create_from_report(sample_report),
+        )
+
+        commit = CommitFactory.create(
+            branch="foo",
+            repository=repository,
+            _report_json={
+                "files": {},
+                "sessions": {
+                    "0": {"f": ["unit"], "t": [1, 2, 1, 1, 0, "50.00000"]},
+                    "1": {"f": ["unit"], "t": [1, 2, 2, 0, 0, "100"]},
+                },
+            },
+        )
+        dbsession.add(commit)
+        dbsession.flush()
+
+        writer = MeasurementBatchWriter(
+            repository,
+            dataset_names=[
+                MeasurementName.coverage.value,
+                MeasurementName.flag_coverage.value,
+            ],
+        )
+        writer.add_commit(commit)
+        writer.flush()
+
+        assert get_report.call_count == 1
+        flag_measurements = (
+            dbsession.query(Measurement)
+            .filter_by(name=MeasurementName.flag_coverage.value)
+            .all()
+        )
+        assert sorted(m.value for m in flag_measurements) == [60.0, 60.0]
+        coverage_measurement = (
+            dbsession.query(Measurement)
+            .filter_by(name=MeasurementName.coverage.value)
+            .one()
+        )
+        assert coverage_measurement.value == 85.0
+
+    def test_save_commit_measurements_uses_stored_totals(
+        self, dbsession, repository, mocker
+    ):
+        mocker.patch("services.timeseries.timeseries_enabled", return_value=True)
+        get_report = mocker.patch(
+            "services.report.ReportService.get_existing_report_for_commit"
+        )
+
+        commit = CommitFactory.create(branch="foo", repository=repository)
+        dbsession.add(commit)
+        dbsession.flush()
+
+        save_commit_measurements(
+            commit,
+            dataset_names=[
+                MeasurementName.coverage.value,
+                MeasurementName.flag_coverage.value,
+            ],
+        )
+
+        assert not get_report.called
+        assert sorted(
+            (m.name, m.value)
+            for m in dbsession.query(Measurement).filter_by(commit_sha=commit.commitid)
+        ) == [
+            (MeasurementName.coverage.value, 85.0),
+            (MeasurementName.flag_coverage.value, 85.0),
+        ]
+
+    def test_save_commit_measurements_components_load_matching_paths(
+        self, dbsession, sample_report_for_components, repository, mocker
+    ):
+        mocker.patch("services.timeseries.timeseries_enabled", return_value=True)
+        get_report = mocker.patch(
+            "services.report.ReportService.get_existing_report_for_commit",
+            return_value=ReadOnlyReport.create_from_report(
+                sample_report_for_components
+            ),
+        )
+        get_repo_yaml = mocker.patch("services.timeseries.get_repo_yaml")
+        get_repo_yaml.return_value = UserYaml(
+            {
+                "component_management": {
+                    "individual_components": [
+                        {"component_id": "python_files", "paths": [r".*\.py"]},
+                        {"component_id": "go_files", "paths": [r".*\.go"]},
+                    ],
+                }
+            }
+        )
+
+        commit = CommitFactory.create(branch="foo", repository=repository)
+        dbsession.add(commit)
+        dbsession.flush()
+
+        save_commit_measurements(commit)
+
+        assert get_report.call_count == 1
+        assert get_report.call_args.kwargs["paths"] == [r".*\.go", r".*\.py"]
+        component_measurements = dict(
+            (m.measurable_id, m.value)
+            for m in dbsession.query(Measurement).filter_by(
+                name=MeasurementName.component_coverage.value
+            )
+        )
+        assert component_measurements == {"python_files": 75.0, "go_files": 25.0}
+
+    def test_save_commit_measurements_components_with_negated_paths(
+        self, dbsession, sample_report_for_components, repository, mocker
+    ):
+        mocker.patch("services.timeseries.timeseries_enabled", return_value=True)
+        get_report = mocker.patch(
+            "services.report.ReportService.get_existing_report_for_commit",
+            return_value=ReadOnlyReport.create_from_report(
+                sample_report_for_components
+            ),
+        )
+        get_repo_yaml = mocker.patch("services.timeseries.get_repo_yaml")
+        get_repo_yaml.return_value = UserYaml(
+            {
+                "component_management": {
+                    "individual_components": [
+                        {"component_id": "not_go_files", "paths": [r"!.*\.go"]},
+                        {"component_id": "go_files", "paths": [r".*\.go"]},
+                    ],
+                }
+            }
+        )
+
+        commit = CommitFactory.create(branch="foo", repository=repository)
+        dbsession.add(commit)
+        dbsession.flush()
+
+        save_commit_measurements(commit)
+
+        # the union of the paths would leave the go files out
+        assert get_report.call_count == 1
+        assert get_report.call_args.kwargs.get("paths") is None
+        component_measurements = dict(
+            (m.measurable_id, m.value)
+            for m in dbsession.query(Measurement).filter_by(
+                name=MeasurementName.component_coverage.value
+            )
+        )
+        assert component_measurements == {"not_go_files": 75.0, "go_files": 25.0}
+
+    def test_stored_flag_coverages(self, dbsession, repository):
+        commit = CommitFactory.create(repository=repository)
+        assert stored_flag_coverages(commit) == {"unit": 85.0}
+
+        missing_totals_commit = CommitFactory.create(
+            repository=repository,
+            _report_json={
+                "files": {},
+                "sessions": {
+                    "0": {"f": ["unit"], "t": [1, 2, 1, 1, 0, "50.00000"]},
+                    "1": {"f": ["ui"], "t": None},
+                },
+            },
+        )
+        assert stored_flag_coverages(missing_totals_commit) is None
+
+        carriedforward_commit = CommitFactory.create(
+            repository=repository,
+            _report_json={
+                "files": {},
+                "sessions": {
+                    "0": {
+                        "f": ["unit"],
+                        "t": [1, 2, 1, 1, 0, "50.00000"],
+                        "st": "carriedforward",
+                    },
+                },
+            },
+        )
+        assert stored_flag_coverages(carriedforward_commit) is None
+
     def test_repository_commits_query(self, dbsession, repository, mocker):
         commit1 = CommitFactory.create(
             repository=repository,
@@ -730,11 +978,15 @@ class TestTimeseriesService(object):
             return_value=ReadOnlyReport.create_from_report(sample_report),
         )
 
-        commit = CommitFactory.create(branch="foo", repository=repository)
+        commit = CommitFactory.create(
+            branch="foo", repository=repository, totals=None, _report_json=None
+        )
         dbsession.add(commit)
         dbsession.flush()
         save_commit_measurements(commit)
-        commit = CommitFactory.create(branch="bar", repository=repository)
+        commit = CommitFactory.create(
+            branch="bar", repository=repository, totals=None, _report_json=None
+        )
         dbsession.add(commit)
         dbsession.flush()
         save_commit_measurements(commit)
@@ -1,5 +1,6 @@
 import json
 
+import pytest
 from shared.storage import MinioStorageService
 from shared.storage.exceptions import FileNotInStorageError
 
@@ -139,6 +140,40 @@ class TestWriteJsonData(BaseTestCase):
             reduced_redundancy=False,
         )
 
+    def test_read_file_range(self, mocker):
+        repo = RepositoryFactory.create()
+        service = ArchiveService(repo)
+        response = mocker.MagicMock(read=mocker.MagicMock(return_value=b"cde"))
+        mocker.patch.object(
+            service.storage, "minio_client"
+        ).get_object.return_value = response
+        assert service.read_file_range("path/to/file", 2, 5) == b"cde"
+        service.storage.minio_client.get_object.assert_called_with(
+            service.root, "path/to/file", offset=2, length=3
+        )
+        # the bytes are returned as stored, even when gzipped
+        response.read.assert_called_with(decode_content=False)
+        assert response.release_conn.called
+
+    def test_read_file_range_without_ranged_reads(self, mock_storage):
+        repo = RepositoryFactory.create()
+        service = ArchiveService(repo)
+        with pytest.raises(NotImplementedError):
+            service.read_file_range("path/to/file", 2, 5)
+
+    def test_write_chunks_already_gzipped(self, mocker):
+        mock_write_file = mocker.patch.object(MinioStorageService, "write_file")
+        repo = RepositoryFactory.create()
+        service = ArchiveService(repo)
+        path = service.write_chunks("commit_sha", b"gzipped", is_already_gzipped=True)
+        mock_write_file.assert_called_with(
+            service.root,
+            path,
+            b"gzipped",
+            is_already_gzipped=True,
+            reduced_redundancy=False,
+        )
+
 
 class TestLabelIndex(object):
     def test_write_label_index_to_storage(self, mocker, dbsession):
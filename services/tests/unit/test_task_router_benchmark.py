@@ -0,0 +1,30 @@
+from celery_task_router import owner_plan_cache
+from database.tests.factories import RepositoryFactory
+from services.task_router_benchmark import get_benchmark_repoids, measure_plan_lookup
+
+
+def test_get_benchmark_repoids(dbsession, mocker):
+    mocker.patch(
+        "services.task_router_benchmark.get_db_session", return_value=dbsession
+    )
+    repositories = RepositoryFactory.create_batch(3)
+    dbsession.add_all(repositories)
+    dbsession.flush()
+    assert sorted(get_benchmark_repoids()) == sorted(
+        repository.repoid for repository in repositories
+    )
+    assert len(get_benchmark_repoids(repos=2)) == 2
+
+
+def test_measure_plan_lookup(dbsession, mocker):
+    mocker.patch("celery_task_router.get_db_session", return_value=dbsession)
+    repository = RepositoryFactory.create()
+    dbsession.add(repository)
+    dbsession.flush()
+    lookup = mocker.spy(dbsession, "query")
+    assert measure_plan_lookup([repository.repoid], lookups=10) > 0
+    assert lookup.call_count == 1
+    assert measure_plan_lookup([repository.repoid], lookups=10, cached=False) > 0
+    assert lookup.call_count == 11
+    # the cache is left like it was
+    assert owner_plan_cache.enabled is None
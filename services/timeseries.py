@@ -1,8 +1,9 @@
 import logging
 from datetime import datetime
-from typing import Iterable, Mapping, Optional
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
 
 from shared.reports.readonly import ReadOnlyReport
+from sqlalchemy import tuple_
 from sqlalchemy.dialects.postgresql import insert
 
 from database.models import Commit, Dataset, Measurement, MeasurementName
@@ -14,6 +15,8 @@ from services.yaml import get_repo_yaml
 
 log = logging.getLogger(__name__)
 
+MEASUREMENT_UPSERT_BATCH_SIZE = 1000
+
 
 def save_commit_measurements(
     commit: Commit, dataset_names: Iterable[str] = None
@@ -28,181 +31,271 @@ def save_commit_measurements(
     if len(dataset_names) == 0:
         return
 
-    current_yaml = get_repo_yaml(commit.repository)
-    report_service = ReportService(current_yaml)
-    report = report_service.get_existing_report_for_commit(
-        commit, report_class=ReadOnlyReport
-    )
+    writer = MeasurementBatchWriter(commit.repository, dataset_names=dataset_names)
+    writer.add_commit(commit)
+    writer.flush()
 
-    if report is None:
-        return
 
-    db_session = commit.get_db_session()
-
-    if MeasurementName.coverage.value in dataset_names:
-        if report.totals.coverage is not None:
-            command = insert(Measurement.__table__).values(
-                name=MeasurementName.coverage.value,
-                owner_id=commit.repository.ownerid,
-                repo_id=commit.repoid,
-                measurable_id=f"{commit.repoid}",
-                branch=commit.branch,
-                commit_sha=commit.commitid,
-                timestamp=commit.timestamp,
-                value=float(report.totals.coverage),
+def upsert_measurements(db_session, measurements: List[dict]) -> None:
+    """Inserts (or updates) measurements with one multi-row statement per batch"""
+    for start in range(0, len(measurements), MEASUREMENT_UPSERT_BATCH_SIZE):
+        command = insert(Measurement.__table__).values(
+            measurements[start : start + MEASUREMENT_UPSERT_BATCH_SIZE]
+        )
+        command = command.on_conflict_do_update(
+            index_elements=[
+                Measurement.name,
+                Measurement.owner_id,
+                Measurement.repo_id,
+                Measurement.measurable_id,
+                Measurement.commit_sha,
+                Measurement.timestamp,
+            ],
+            set_=dict(
+                branch=command.excluded.branch,
+                value=command.excluded.value,
+            ),
+        )
+        db_session.execute(command)
+    db_session.flush()
+
+
+def _to_float(coverage) -> Optional[float]:
+    return float(coverage) if coverage is not None else None
+
+
+def _coverage_from_totals(totals) -> Optional[float]:
+    if isinstance(totals, dict):
+        coverage = totals.get("c")
+    elif isinstance(totals, (list, tuple)) and len(totals) > 5:
+        coverage = totals[5]
+    else:
+        return None
+    return _to_float(coverage)
+
+
+def stored_flag_coverages(commit: Commit) -> Optional[Dict[str, Optional[float]]]:
+    """Per-flag coverage read from the session totals saved on `report_json`
+
+    This is only exact when each flag was uploaded by a single session, otherwise
+    the lines of several sessions have to be merged. Returns None whenever the
+    stored totals can't be used and the report needs to be loaded instead.
+    """
+    report_json = commit.report_json
+    if not report_json:
+        return None
+    coverages = {}
+    for session in (report_json.get("sessions") or {}).values():
+        for flag_name in session.get("f") or []:
+            if flag_name in coverages:
+                return None
+            if session.get("st") == "carriedforward" or session.get("t") is None:
+                return None
+            coverages[flag_name] = _coverage_from_totals(session["t"])
+    return coverages
+
+
+def _is_negated_path(path: str) -> bool:
+    return path.startswith("!") or path.startswith("^!")
+
+
+class MeasurementBatchWriter(object):
+    """Computes the measurements of many commits of the same repository and
+    saves them all at once
+
+    Everything that only depends on the repository (yaml, flag ids, components)
+    is loaded a single time. Coverage and flag coverage are taken from the totals
+    saved on the commit whenever possible, the report is only loaded from storage
+    (at most once per commit) for component coverage or when those totals can't be
+    used. For component coverage alone only the files matching the component paths
+    are loaded (when none of them is negated).
+    """
+
+    def __init__(self, repository: Repository, dataset_names: Iterable[str]):
+        self.repository = repository
+        self.dataset_names = set(dataset_names)
+        self.db_session = repository.get_db_session()
+        self.current_yaml = get_repo_yaml(repository)
+        self.report_service = ReportService(self.current_yaml)
+        self.components = [
+            component
+            for component in self.current_yaml.get_components()
+            if component.paths or component.flag_regexes
+        ]
+        # components only need the files matching their paths, unless one of
+        # them covers every file. A negated pattern ("!" or "^!") of a component
+        # would also drop the files of the other ones from the union, so then the
+        # whole report is loaded
+        self.component_paths = None
+        if (
+            self.components
+            and all(component.paths for component in self.components)
+            and not any(
+                _is_negated_path(path)
+                for component in self.components
+                for path in component.paths
             )
-            command = command.on_conflict_do_update(
-                index_elements=[
-                    Measurement.name,
-                    Measurement.owner_id,
-                    Measurement.repo_id,
-                    Measurement.measurable_id,
-                    Measurement.commit_sha,
-                    Measurement.timestamp,
-                ],
-                set_=dict(
-                    branch=command.excluded.branch,
-                    value=command.excluded.value,
-                ),
+        ):
+            self.component_paths = sorted(
+                set(path for component in self.components for path in component.paths)
             )
-            db_session.execute(command)
-            db_session.flush()
-
-    if MeasurementName.flag_coverage.value in dataset_names:
-        flag_ids = repository_flag_ids(commit.repository)
-        measurements = []
-
-        for flag_name, flag in report.flags.items():
-            if flag.totals.coverage is not None:
-                flag_id = flag_ids.get(flag_name)
-                if not flag_id:
-                    log.warning(
-                        "Repository flag not found.  Created repository flag.",
-                        extra=dict(repoid=commit.repoid, flag_name=flag_name),
-                    )
-                    repo_flag = RepositoryFlag(
-                        repository_id=commit.repoid,
-                        flag_name=flag_name,
-                    )
-                    db_session.add(repo_flag)
-                    db_session.flush()
-                    flag_id = repo_flag.id
-
-                measurements.append(
-                    dict(
-                        name=MeasurementName.flag_coverage.value,
-                        owner_id=commit.repository.ownerid,
-                        repo_id=commit.repoid,
-                        measurable_id=f"{flag_id}",
-                        branch=commit.branch,
-                        commit_sha=commit.commitid,
-                        timestamp=commit.timestamp,
-                        value=float(flag.totals.coverage),
+        self._flag_ids = None
+        self._measurements = {}
+        self.reports_loaded = 0
+
+    @property
+    def flag_ids(self) -> Dict[str, int]:
+        if self._flag_ids is None:
+            self._flag_ids = dict(repository_flag_ids(self.repository))
+        return self._flag_ids
+
+    def _get_flag_id(self, flag_name: str) -> int:
+        flag_id = self.flag_ids.get(flag_name)
+        if not flag_id:
+            log.warning(
+                "Repository flag not found.  Created repository flag.",
+                extra=dict(repoid=self.repository.repoid, flag_name=flag_name),
+            )
+            repo_flag = RepositoryFlag(
+                repository_id=self.repository.repoid,
+                flag_name=flag_name,
+            )
+            self.db_session.add(repo_flag)
+            self.db_session.flush()
+            flag_id = repo_flag.id
+            self.flag_ids[flag_name] = flag_id
+        return flag_id
+
+    def _add_measurement(
+        self, commit: Commit, name: str, measurable_id: str, value: float
+    ) -> None:
+        key = (name, measurable_id, commit.commitid, commit.timestamp)
+        self._measurements[key] = dict(
+            name=name,
+            owner_id=self.repository.ownerid,
+            repo_id=self.repository.repoid,
+            measurable_id=measurable_id,
+            branch=commit.branch,
+            commit_sha=commit.commitid,
+            timestamp=commit.timestamp,
+            value=value,
+        )
+
+    def _load_report(
+        self, commit: Commit, paths: Optional[List[str]] = None
+    ) -> Optional[ReadOnlyReport]:
+        self.reports_loaded += 1
+        return self.report_service.get_existing_report_for_commit(
+            commit, report_class=ReadOnlyReport, paths=paths
+        )
+
+    def add_commit(self, commit: Commit) -> None:
+        report = None
+        report_loaded = False
+
+        def get_report():
+            nonlocal report, report_loaded
+            if not report_loaded:
+                report = self._load_report(commit)
+                report_loaded = True
+            return report
+
+        if MeasurementName.coverage.value in self.dataset_names:
+            if commit.totals is not None:
+                coverage = _coverage_from_totals(commit.totals)
+            elif get_report() is not None:
+                coverage = _to_float(get_report().totals.coverage)
+            else:
+                coverage = None
+            if coverage is not None:
+                self._add_measurement(
+                    commit,
+                    MeasurementName.coverage.value,
+                    f"{commit.repoid}",
+                    coverage,
+                )
+
+        if MeasurementName.flag_coverage.value in self.dataset_names:
+            flag_coverages = stored_flag_coverages(commit)
+            if flag_coverages is None and get_report() is not None:
+                flag_coverages = {
+                    flag_name: _to_float(flag.totals.coverage)
+                    for flag_name, flag in get_report().flags.items()
+                }
+            for flag_name, coverage in (flag_coverages or {}).items():
+                if coverage is not None:
+                    self._add_measurement(
+                        commit,
+                        MeasurementName.flag_coverage.value,
+                        f"{self._get_flag_id(flag_name)}",
+                        coverage,
                     )
+
+        if (
+            MeasurementName.component_coverage.value in self.dataset_names
+            and self.components
+        ):
+            if report_loaded or self.component_paths is None:
+                component_report = get_report()
+            else:
+                component_report = self._load_report(commit, paths=self.component_paths)
+            self._add_component_measurements(commit, component_report)
+
+    def _add_component_measurements(
+        self, commit: Commit, report: Optional[ReadOnlyReport]
+    ) -> None:
+        if report is not None:
+            for component in self.components:
+                filtered_report = report.filter(
+                    flags=component.get_matching_flags(report.flags.keys()),
+                    paths=component.paths,
                 )
+                if filtered_report.totals.coverage is not None:
+                    self._add_measurement(
+                        commit,
+                        MeasurementName.component_coverage.value,
+                        f"{component.component_id}",
+                        float(filtered_report.totals.coverage),
+                    )
 
-        if len(measurements) > 0:
+    def flush(self) -> int:
+        measurements = list(self._measurements.values())
+        self._measurements = {}
+        if measurements:
             log.info(
-                "Upserting flag coverage measurements",
+                "Upserting measurements",
                 extra=dict(
-                    repoid=commit.repoid,
-                    commit_id=commit.id_,
+                    repoid=self.repository.repoid,
                     count=len(measurements),
+                    reports_loaded=self.reports_loaded,
                 ),
             )
-            command = insert(Measurement.__table__).values(measurements)
-            command = command.on_conflict_do_update(
-                index_elements=[
-                    Measurement.name,
-                    Measurement.owner_id,
-                    Measurement.repo_id,
-                    Measurement.measurable_id,
-                    Measurement.commit_sha,
-                    Measurement.timestamp,
-                ],
-                set_=dict(
-                    branch=command.excluded.branch,
-                    value=command.excluded.value,
-                ),
-            )
-            db_session.execute(command)
-            db_session.flush()
-
-    if MeasurementName.component_coverage.value in dataset_names:
-        components = current_yaml.get_components()
-        if components:
-            measurements = []
-
-            for component in components:
-                if component.paths or component.flag_regexes:
-                    report_and_component_matching_flags = component.get_matching_flags(
-                        report.flags.keys()
-                    )
-                    filtered_report = report.filter(
-                        flags=report_and_component_matching_flags, paths=component.paths
-                    )
-
-                    if filtered_report.totals.coverage is not None:
-                        measurements.append(
-                            dict(
-                                name=MeasurementName.component_coverage.value,
-                                owner_id=commit.repository.ownerid,
-                                repo_id=commit.repoid,
-                                branch=commit.branch,
-                                commit_sha=commit.commitid,
-                                timestamp=commit.timestamp,
-                                measurable_id=f"{component.component_id}",
-                                value=float(filtered_report.totals.coverage),
-                            )
-                        )
-
-            if len(measurements) > 0:
-                log.info(
-                    "Upserting component coverage measurements",
-                    extra=dict(
-                        repoid=commit.repoid,
-                        commit_id=commit.id_,
-                        count=len(measurements),
-                    ),
-                )
-                command = insert(Measurement.__table__).values(measurements)
-                command = command.on_conflict_do_update(
-                    index_elements=[
-                        Measurement.name,
-                        Measurement.owner_id,
-                        Measurement.repo_id,
-                        Measurement.measurable_id,
-                        Measurement.commit_sha,
-                        Measurement.timestamp,
-                    ],
-                    set_=dict(
-                        branch=command.excluded.branch,
-                        value=command.excluded.value,
-                    ),
-                )
-                db_session.execute(command)
-                db_session.flush()
+            upsert_measurements(self.db_session, measurements)
+        return len(measurements)
 
 
 def repository_commits_query(
     repository: Repository,
     start_date: datetime,
     end_date: datetime,
+    before: Optional[Tuple[datetime, int]] = None,
 ) -> Iterable[Commit]:
+    """Commits in the date range, newest first
+
+    `before` is a `(timestamp, id)` keyset cursor: only the commits that come after
+    it in that order are returned.
+    """
     db_session = repository.get_db_session()
 
-    commits = (
-        db_session.query(Commit.id_)
-        .filter(
-            Commit.repoid == repository.repoid,
-            Commit.timestamp >= start_date,
-            Commit.timestamp <= end_date,
-        )
-        .order_by(Commit.timestamp.desc())
-        .yield_per(100)
+    commits = db_session.query(Commit.id_, Commit.timestamp).filter(
+        Commit.repoid == repository.repoid,
+        Commit.timestamp >= start_date,
+        Commit.timestamp <= end_date,
     )
+    if before is not None:
+        commits = commits.filter(tuple_(Commit.timestamp, Commit.id_) < before)
 
-    return commits
+    return commits.order_by(Commit.timestamp.desc(), Commit.id_.desc()).yield_per(100)
 
 
 def repository_datasets_query(
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 from datetime import datetime
 
@@ -6,6 +5,7 @@ from celery.exceptions import SoftTimeLimitExceeded
 from celery.worker.request import Request
 from prometheus_client import REGISTRY
 from shared.celery_router import route_tasks_based_on_user_plan
+from shared.config import get_config
 from shared.metrics import Counter, Histogram
 from sqlalchemy.exc import (
     DataError,
@@ -16,8 +16,10 @@ from sqlalchemy.exc import (
 
 from app import celery_app
 from celery_task_router import _get_user_plan_from_task
-from database.engine import get_db_session
+from database.engine import get_db_session, set_statement_timeout
+from helpers.event_loop import run_in_event_loop
 from helpers.metrics import metrics
+from services.task_profiling import profile_task
 
 log = logging.getLogger("worker")
 
@@ -111,6 +113,8 @@ TASK_TIME_IN_QUEUE = Histogram(
 
 class BaseCodecovTask(celery_app.Task):
     Request = BaseCodecovRequest
+    # seconds, see `get_statement_timeout`
+    statement_timeout = None
 
     def __init_subclass__(cls, name=None):
         cls.name = name
@@ -127,6 +131,19 @@ class BaseCodecovTask(celery_app.Task):
         cls.task_full_runtime = TASK_FULL_RUNTIME.labels(task=name)
         cls.task_core_runtime = TASK_CORE_RUNTIME.labels(task=name)
 
+    def get_statement_timeout(self):
+        """
+        Seconds any single query of this task is allowed to run for, if limited
+        (`setup.database.statement_timeouts.<task name>` overrides `statement_timeout`)
+        """
+        return get_config(
+            "setup",
+            "database",
+            "statement_timeouts",
+            self.name,
+            default=self.statement_timeout,
+        )
+
     @property
     def hard_time_limit_task(self):
         if self.request.timelimit is not None and self.request.timelimit[0] is not None:
@@ -210,12 +227,14 @@ class BaseCodecovTask(celery_app.Task):
         with self.task_full_runtime.time():  # Timer isn't tested
             with metrics.timer(f"{self.metrics_prefix}.full"):
                 db_session = get_db_session()
+                set_statement_timeout(db_session, self.get_statement_timeout())
                 try:
                     with self.task_core_runtime.time():  # Timer isn't tested
                         with metrics.timer(f"{self.metrics_prefix}.run"):
-                            return asyncio.run(
-                                self.run_async(db_session, *args, **kwargs)
-                            )
+                            with profile_task(self.name, self.request.id):
+                                return run_in_event_loop(
+                                    self.run_async(db_session, *args, **kwargs)
+                                )
                 except (DataError, IntegrityError):
                     log.exception(
                         "Errors related to the constraints of database happened",
@@ -229,6 +248,7 @@ class BaseCodecovTask(celery_app.Task):
                     self.retry()
                 finally:
                     self.wrap_up_dbsession(db_session)
+                    set_statement_timeout(db_session, None)
 
     def wrap_up_dbsession(self, db_session):
         """
@@ -9,6 +9,7 @@ from shared.torngit.exceptions import TorngitRateLimitError
 from shared.yaml import UserYaml
 
 from app import celery_app
+from database.engine import replica_reads
 from database.enums import CompareCommitError, CompareCommitState
 from database.models import CompareCommit, CompareComponent, CompareFlag
 from database.models.reports import ReportLevelTotals, RepositoryFlag
@@ -162,7 +163,7 @@ class ComputeComparisonTask(BaseCodecovTask, name=compute_comparison_task_name):
         )
         diff = await comparison_proxy.get_diff()
         if diff:
-            patch_totals = flag_head_report.apply_diff(diff)
+            patch_totals = flag_head_report.apply_diff(diff, _save=False)
             if patch_totals:
                 totals["patch_totals"] = patch_totals.asdict()
         return totals
@@ -237,7 +238,7 @@ class ComputeComparisonTask(BaseCodecovTask, name=compute_comparison_task_name):
         component_comparison.head_totals = filtered.head.report.totals.asdict()
         diff = await comparison_proxy.get_diff()
         if diff:
-            patch_totals = filtered.head.report.apply_diff(diff)
+            patch_totals = filtered.head.report.apply_diff(diff, _save=False)
             if patch_totals:
                 component_comparison.patch_totals = patch_totals.asdict()
 
@@ -251,9 +252,12 @@ class ComputeComparisonTask(BaseCodecovTask, name=compute_comparison_task_name):
         compare_commit = comparison.compare_commit
         base_commit = comparison.base_commit
         report_service = ReportService(current_yaml)
-        base_report = report_service.get_existing_report_for_commit(
-            base_commit, report_class=ReadOnlyReport
-        )
+        # the report of the base commit is done by now, only it is read from the
+        # replica: the head report (and its sessions) may have just been written
+        with replica_reads(comparison.get_db_session()):
+            base_report = report_service.get_existing_report_for_commit(
+                base_commit, report_class=ReadOnlyReport
+            )
         compare_report = report_service.get_existing_report_for_commit(
             compare_commit, report_class=ReadOnlyReport
         )
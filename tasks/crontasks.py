@@ -3,7 +3,7 @@ from datetime import datetime, timedelta, timezone
 
 from redis.exceptions import LockError
 
-from services.redis import get_redis_connection
+from services.redis import get_redis_connection, get_redis_lock_connection
 from tasks.base import BaseCodecovTask
 
 log = logging.getLogger(__name__)
@@ -39,7 +39,7 @@ class CodecovCronTask(BaseCodecovTask):
         redis_connection = get_redis_connection()
         generation_time = datetime.fromisoformat(cron_task_generation_time_iso)
         try:
-            with redis_connection.lock(
+            with get_redis_lock_connection().lock(
                 lock_name,
                 timeout=max(60 * 5, self.hard_time_limit_task),
                 blocking_timeout=1,
@@ -4,9 +4,14 @@ from celery.exceptions import SoftTimeLimitExceeded
 from shared.celery_config import delete_owner_task_name
 
 from app import celery_app
-from database.models import Branch, Commit, LoginSession, Owner, Pull, Repository
-from database.models.core import CompareCommit
+from database.models import LoginSession, Owner, Repository
 from services.archive import ArchiveService
+from services.deletion import (
+    ChunkedDeletion,
+    DeletionCheckpoint,
+    delete_repository_contents,
+)
+from services.redis import get_redis_connection
 from tasks.base import BaseCodecovTask
 
 log = logging.getLogger(__name__)
@@ -18,6 +23,9 @@ class DeleteOwnerTask(BaseCodecovTask, name=delete_owner_task_name):
     - Repo archive data for each of their owned repos
     - Owner entry from db
     - Cascading deletes of repos, pulls, and branches for the owner
+
+    Repo contents are deleted in batches (see `services.deletion`), so a retry
+    after a timeout picks up where the previous attempt stopped.
     """
 
     async def run_async(self, db_session, ownerid):
@@ -38,34 +46,16 @@ class DeleteOwnerTask(BaseCodecovTask, name=delete_owner_task_name):
         involved_repos = db_session.query(Repository.repoid).filter(
             Repository.ownerid == ownerid
         )
-        involved_commits = db_session.query(Commit.id_).filter(
-            Commit.repoid.in_(involved_repos)
-        )
-        log.info("Deleting branches from DB", extra=dict(ownerid=ownerid))
-        db_session.query(Branch).filter(Branch.repoid.in_(involved_repos)).delete(
-            synchronize_session=False
-        )
-        db_session.commit()
-
-        log.info("Deleting commit compare from DB", extra=dict(ownerid=ownerid))
-        db_session.query(CompareCommit).filter(
-            CompareCommit.base_commit_id.in_(involved_commits)
-        ).delete(synchronize_session=False)
-        db_session.query(CompareCommit).filter(
-            CompareCommit.compare_commit_id.in_(involved_commits)
-        ).delete(synchronize_session=False)
-        db_session.commit()
-
-        log.info("Deleting pulls from DB", extra=dict(ownerid=ownerid))
-        db_session.query(Pull).filter(Pull.repoid.in_(involved_repos)).delete(
-            synchronize_session=False
-        )
-        db_session.commit()
-        log.info("Deleting commits from DB", extra=dict(ownerid=ownerid))
-        db_session.query(Commit).filter(Commit.repoid.in_(involved_repos)).delete(
-            synchronize_session=False
+        deletion = ChunkedDeletion(
+            db_session,
+            DeletionCheckpoint(get_redis_connection(), f"delete_owner/{ownerid}"),
         )
-        db_session.commit()
+        for (repoid,) in involved_repos.all():
+            log.info(
+                "Deleting repo contents from DB",
+                extra=dict(ownerid=ownerid, repoid=repoid),
+            )
+            delete_repository_contents(deletion, repoid)
         log.info("Deleting repos from DB", extra=dict(ownerid=ownerid))
         involved_repos.delete()
         db_session.commit()
@@ -86,6 +76,7 @@ class DeleteOwnerTask(BaseCodecovTask, name=delete_owner_task_name):
         db_session.commit()
         log.info("Deleting owner from DB", extra=dict(ownerid=ownerid))
         db_session.delete(owner)
+        deletion.finish()
 
     def delete_repo_archives(self, db_session, ownerid):
         """
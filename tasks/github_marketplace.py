@@ -5,6 +5,7 @@ import requests
 from shared.celery_config import ghm_sync_plans_task_name
 
 from app import celery_app
+from celery_task_router import invalidate_owner_plans_on_commit
 from database.models import Owner, Repository
 from services.billing import BillingPlan
 from services.github_marketplace import GitHubMarketplaceService
@@ -89,6 +90,7 @@ class SyncPlansTask(BaseCodecovTask, name=ghm_sync_plans_task_name):
         else:
             self.create_or_update_to_free_plan(db_session, ghm_service, service_id)
             plan_type_synced = "free"
+        invalidate_owner_plans_on_commit(db_session)
 
         return dict(plan_type_synced=plan_type_synced)
 
@@ -170,6 +172,7 @@ class SyncPlansTask(BaseCodecovTask, name=ghm_sync_plans_task_name):
             Owner.plan_provider == "github",
             Owner.service_id.notin_(active_account_ids),
         ).update({Owner.plan: None}, synchronize_session=False)
+        invalidate_owner_plans_on_commit(db_session)
 
     def deactivate_repos(self, db_session, ownerid):
         """
@@ -6,6 +6,7 @@ from shared.celery_config import label_analysis_task_name
 from shared.labelanalysis import LabelAnalysisRequestState
 
 from app import celery_app
+from database.engine import replica_reads
 from database.models.labelanalysis import (
     LabelAnalysisProcessingError,
     LabelAnalysisProcessingErrorCode,
@@ -365,20 +366,23 @@ class LabelAnalysisRequestProcessingTask(
         self, label_analysis_request: LabelAnalysisRequest, parsed_git_diff
     ):
         db_session = label_analysis_request.get_db_session()
-        base_static_analysis: StaticAnalysisSuite = (
-            db_session.query(StaticAnalysisSuite)
-            .filter(
-                StaticAnalysisSuite.commit_id == label_analysis_request.base_commit_id,
+        with replica_reads(db_session):
+            base_static_analysis: StaticAnalysisSuite = (
+                db_session.query(StaticAnalysisSuite)
+                .filter(
+                    StaticAnalysisSuite.commit_id
+                    == label_analysis_request.base_commit_id,
+                )
+                .first()
             )
-            .first()
-        )
-        head_static_analysis: StaticAnalysisSuite = (
-            db_session.query(StaticAnalysisSuite)
-            .filter(
-                StaticAnalysisSuite.commit_id == label_analysis_request.head_commit_id,
+            head_static_analysis: StaticAnalysisSuite = (
+                db_session.query(StaticAnalysisSuite)
+                .filter(
+                    StaticAnalysisSuite.commit_id
+                    == label_analysis_request.head_commit_id,
+                )
+                .first()
             )
-            .first()
-        )
         if not base_static_analysis or not head_static_analysis:
             # TODO : Proper handling of this case
             log.info(
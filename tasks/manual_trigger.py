@@ -15,7 +15,7 @@ from app import celery_app
 from database.models import Commit, Pull
 from database.models.reports import CommitReport, Upload
 from services.comparison import get_or_create_comparison
-from services.redis import get_redis_connection
+from services.redis import get_redis_lock_connection
 from tasks.base import BaseCodecovTask
 
 log = logging.getLogger(__name__)
@@ -40,9 +40,8 @@ class ManualTriggerTask(
         )
         repoid = int(repoid)
         lock_name = f"manual_trigger_lock_{repoid}_{commitid}"
-        redis_connection = get_redis_connection()
         try:
-            with redis_connection.lock(
+            with get_redis_lock_connection().lock(
                 lock_name,
                 timeout=60 * 5,
                 blocking_timeout=5,
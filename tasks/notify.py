@@ -25,7 +25,7 @@ from services.comparison import ComparisonProxy
 from services.comparison.types import Comparison, FullCommit
 from services.decoration import determine_decoration_details
 from services.notification import NotificationService
-from services.redis import Redis, get_redis_connection
+from services.redis import Redis, get_redis_connection, get_redis_lock_connection
 from services.report import ReportService
 from services.repository import (
     EnrichedPull,
@@ -68,7 +68,7 @@ class NotifyTask(BaseCodecovTask, name=notify_task_name):
         notify_lock_name = f"notify_lock_{repoid}_{commitid}"
         try:
             lock_acquired = False
-            with redis_connection.lock(
+            with get_redis_lock_connection().lock(
                 notify_lock_name,
                 timeout=max(80, self.hard_time_limit_task),
                 blocking_timeout=10,
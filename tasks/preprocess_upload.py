@@ -10,7 +10,7 @@ from database.enums import CommitErrorTypes
 from database.models import Commit
 from helpers.exceptions import RepositoryWithoutValidBotError
 from helpers.save_commit_error import save_commit_error
-from services.redis import get_redis_connection
+from services.redis import get_redis_lock_connection
 from services.report import ReportService
 from services.repository import (
     get_repo_provider_service,
@@ -45,9 +45,8 @@ class PreProcessUpload(BaseCodecovTask, name="app.tasks.upload.PreProcessUpload"
             extra=dict(repoid=repoid, commit=commitid, report_code=report_code),
         )
         lock_name = f"preprocess_upload_lock_{repoid}_{commitid}"
-        redis_connection = get_redis_connection()
         try:
-            with redis_connection.lock(
+            with get_redis_lock_connection().lock(
                 lock_name,
                 timeout=60 * 5,
                 blocking_timeout=5,
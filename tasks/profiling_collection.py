@@ -15,7 +15,7 @@ from database.models.profiling import ProfilingCommit, ProfilingUpload
 from helpers.clock import get_utc_now
 from helpers.metrics import metrics
 from services.archive import ArchiveService
-from services.redis import get_redis_connection
+from services.redis import get_redis_lock_connection
 from tasks.base import BaseCodecovTask
 from tasks.profiling_summarization import profiling_summarization_task
 
@@ -24,9 +24,8 @@ log = logging.getLogger(__name__)
 
 class ProfilingCollectionTask(BaseCodecovTask, name=profiling_collection_task_name):
     async def run_async(self, db_session: Session, *, profiling_id: int, **kwargs):
-        redis_connection = get_redis_connection()
         try:
-            with redis_connection.lock(
+            with get_redis_lock_connection().lock(
                 f"totalize_profilings_lock_{profiling_id}",
                 timeout=max(60 * 5, self.hard_time_limit_task),
                 blocking_timeout=1,
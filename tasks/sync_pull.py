@@ -1,9 +1,10 @@
+import hashlib
 import json
 import logging
 import os
 from collections import deque
 from datetime import datetime
-from typing import Any, Dict, List, Sequence
+from typing import Any, Dict, List, Optional, Sequence
 
 import sqlalchemy.orm
 from redis.exceptions import LockError
@@ -11,13 +12,15 @@ from shared.celery_config import notify_task_name, pulls_task_name
 from shared.reports.types import Change
 from shared.torngit.exceptions import TorngitClientError
 from shared.yaml import UserYaml
+from sqlalchemy import all_, any_, bindparam, case, or_, types, update
+from sqlalchemy.dialects.postgresql import ARRAY
 
 from app import celery_app
 from database.models import Commit, Pull, Repository
 from helpers.exceptions import RepositoryWithoutValidBotError
 from helpers.metrics import metrics
 from services.comparison.changes import get_changes
-from services.redis import get_redis_connection
+from services.redis import get_redis_connection, get_redis_lock_connection
 from services.report import Report, ReportService
 from services.repository import (
     EnrichedPull,
@@ -29,6 +32,13 @@ from tasks.base import BaseCodecovTask
 
 log = logging.getLogger(__name__)
 
+# For how long (in seconds) we remember what the last sync of a pull was computed from
+SYNC_FINGERPRINT_TTL = 86400
+
+# How many levels of ancestors of the base branch we look at (at most) when
+# deciding whether a pull was squash merged
+ANCESTORS_TREE_MAX_DEPTH = 500
+
 
 class PullSyncTask(BaseCodecovTask, name=pulls_task_name):
 
@@ -46,6 +56,9 @@ class PullSyncTask(BaseCodecovTask, name=pulls_task_name):
             - Updating all the commits that point to this pull in case the pull is being merged
             - Clear the caches we have around this PR
 
+        Syncs are skipped (only notifying, if asked to) when nothing they are computed
+            from changed since the last complete sync. See `get_sync_fingerprint`
+
         At the end we call the notify task to do notifications with the new information we have
     """
 
@@ -63,7 +76,9 @@ class PullSyncTask(BaseCodecovTask, name=pulls_task_name):
         repoid = int(repoid)
         lock_name = f"pullsync_{repoid}_{pullid}"
         try:
-            with redis_connection.lock(lock_name, timeout=60 * 5, blocking_timeout=5):
+            with get_redis_lock_connection().lock(
+                lock_name, timeout=60 * 5, blocking_timeout=5
+            ):
                 return await self.run_async_within_lock(
                     db_session,
                     redis_connection,
@@ -161,12 +176,35 @@ class PullSyncTask(BaseCodecovTask, name=pulls_task_name):
                 "reason": "no_head",
             }
         compared_to = pull.get_comparedto_commit()
+        sync_fingerprint = self.get_sync_fingerprint(
+            pull, head_commit, compared_to, current_yaml
+        )
+        fingerprint_key = f"pullsync_fingerprint/{repoid}/{pullid}"
+        if redis_connection.get(fingerprint_key) == sync_fingerprint.encode():
+            log.info(
+                "Not syncing pull since nothing changed since the last sync",
+                extra=dict(pullid=pullid, repoid=repoid, head=pull.head),
+            )
+            db_session.commit()
+            notifier_was_called = False
+            if should_send_notifications:
+                notifier_was_called = True
+                self.app.tasks[notify_task_name].apply_async(
+                    kwargs=dict(repoid=repoid, commitid=pull.head)
+                )
+            return {
+                "notifier_called": notifier_was_called,
+                "commit_updates_done": {"merged_count": 0, "soft_deleted_count": 0},
+                "pull_updated": False,
+                "reason": "no_changes",
+            }
         head_report = report_service.get_existing_report_for_commit(head_commit)
         if compared_to is not None:
             base_report = report_service.get_existing_report_for_commit(compared_to)
         else:
             base_report = None
         commits = None
+        commits_synced = False
         db_session.commit()
         try:
             commits = await repository_service.get_pull_request_commits(pull.pullid)
@@ -177,15 +215,21 @@ class PullSyncTask(BaseCodecovTask, name=pulls_task_name):
                 enriched_pull, commits, base_ancestors_tree
             )
             db_session.commit()
+            commits_synced = True
         except TorngitClientError:
             log.warning(
                 "Unable to fetch information about pull commits",
                 extra=dict(pullid=pullid, repoid=repoid),
             )
-        await self.update_pull_from_reports(
+        reports_synced = await self.update_pull_from_reports(
             pull, repository_service, base_report, head_report, current_yaml
         )
         db_session.commit()
+        if commits_synced and reports_synced:
+            # Only a complete sync can be skipped next time
+            redis_connection.set(
+                fingerprint_key, sync_fingerprint, ex=SYNC_FINGERPRINT_TTL
+            )
         notifier_was_called = False
         if should_send_notifications:
             notifier_was_called = True
@@ -200,6 +244,44 @@ class PullSyncTask(BaseCodecovTask, name=pulls_task_name):
             "reason": "success",
         }
 
+    def get_sync_fingerprint(
+        self,
+        pull: Pull,
+        head_commit: Commit,
+        compared_to: Optional[Commit],
+        current_yaml: UserYaml,
+    ) -> str:
+        """
+        Identifies everything a sync of this pull is computed from: which commits are
+            compared, the version of the reports of those commits, the state of the pull
+            and the yaml. Two syncs with the same fingerprint do exactly the same work.
+        """
+        fingerprint_data = {
+            "state": pull.state,
+            "head": pull.head,
+            "base": pull.base,
+            "head_report": self._get_report_version(head_commit),
+            "compared_to": compared_to.commitid if compared_to is not None else None,
+            "compared_to_report": self._get_report_version(compared_to),
+            "yaml": hashlib.sha256(
+                json.dumps(current_yaml.to_dict(), sort_keys=True, default=str).encode()
+            ).hexdigest(),
+        }
+        return hashlib.sha256(
+            json.dumps(fingerprint_data, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def _get_report_version(self, commit: Optional[Commit]) -> Optional[dict]:
+        # Every processed upload changes the commit totals (including the number of
+        # sessions), so they change whenever the stored report does
+        if commit is None:
+            return None
+        return {
+            "state": commit.state,
+            "totals": commit.totals,
+            "storage_path": commit._report_json_storage_path,
+        }
+
     def cache_changes(self, pull: Pull, changes: List[Change]):
         """
         Caches the list of files with changes for a given comparison.
@@ -309,53 +391,69 @@ class PullSyncTask(BaseCodecovTask, name=pulls_task_name):
         db_session = pull.get_db_session()
         merged_count, deleted_count = 0, 0
         if commits_on_pr:
+            move_to_base = False
             if pull.state == "merged":
-                is_squash_merge = self.was_pr_merged_with_squash(
+                move_to_base = not self.was_pr_merged_with_squash(
                     commits_on_pr, ancestors_tree_on_base
                 )
-                if not is_squash_merge:
-                    log.info(
-                        "Moving commits to base branch",
-                        extra=dict(
-                            commits_on_pr=commits_on_pr,
-                            repoid=repoid,
-                            pullid=pullid,
-                            new_branch=pull_dict["base"]["branch"],
-                        ),
-                    )
-                    merged_count = (
-                        db_session.query(Commit)
-                        .filter(
-                            Commit.repoid == repoid,
-                            Commit.pullid == pullid,
-                            Commit.commitid.in_(commits_on_pr + [pull.base, pull.head]),
-                            ~Commit.merged,
-                        )
-                        .update(
-                            {
-                                Commit.branch: pull_dict["base"]["branch"],
-                                Commit.updatestamp: datetime.now(),
-                                Commit.merged: True,
-                                Commit.deleted: False,
-                            },
-                            synchronize_session=False,
-                        )
-                    )
-
-            # set the rest of the commits to deleted (do not show in the UI)
-            deleted_count = (
-                db_session.query(Commit)
-                .filter(
-                    Commit.repoid == repoid,
-                    Commit.pullid == pullid,
-                    ~Commit.commitid.in_(commits_on_pr + [pull.base, pull.head]),
+            if move_to_base:
+                log.info(
+                    "Moving commits to base branch",
+                    extra=dict(
+                        commits_on_pr=commits_on_pr,
+                        repoid=repoid,
+                        pullid=pullid,
+                        new_branch=pull_dict["base"]["branch"],
+                    ),
                 )
-                .update({Commit.deleted: True}, synchronize_session=False)
+            # The commits of the PR go as a single array parameter, and both the
+            # `merged` and `deleted` transitions happen in the same statement, instead
+            # of two `UPDATE`s each with a huge `IN (...)` list
+            commits_table = Commit.__table__
+            pr_commitids = bindparam(
+                "pr_commitids",
+                value=list(commits_on_pr) + [pull.base, pull.head],
+                type_=ARRAY(types.Text),
             )
+            in_pr = commits_table.c.commitid == any_(pr_commitids)
+            not_in_pr = commits_table.c.commitid != all_(pr_commitids)
+            # set the commits that are not on the PR to deleted (do not show in the UI)
+            values = {commits_table.c.deleted: case([(in_pr, False)], else_=True)}
+            to_update = not_in_pr
+            if move_to_base:
+                values.update(
+                    {
+                        commits_table.c.branch: case(
+                            [(in_pr, pull_dict["base"]["branch"])],
+                            else_=commits_table.c.branch,
+                        ),
+                        commits_table.c.updatestamp: case(
+                            [(in_pr, datetime.now())],
+                            else_=commits_table.c.updatestamp,
+                        ),
+                        commits_table.c.merged: case(
+                            [(in_pr, True)], else_=commits_table.c.merged
+                        ),
+                    }
+                )
+                to_update = or_(to_update, ~commits_table.c.merged)
+            updated_rows = db_session.execute(
+                update(commits_table)
+                .where(commits_table.c.repoid == repoid)
+                .where(commits_table.c.pullid == pullid)
+                .where(to_update)
+                .values(values)
+                .returning(in_pr.label("moved_to_base"))
+            ).fetchall()
+            merged_count = sum(1 for row in updated_rows if row.moved_to_base)
+            deleted_count = len(updated_rows) - merged_count
         return {"soft_deleted_count": deleted_count, "merged_count": merged_count}
 
     def was_pr_merged_with_squash(
-        self, commits_on_pr: Sequence[str], base_ancestors_tree: Dict[str, Any]
+        self,
+        commits_on_pr: Sequence[str],
+        base_ancestors_tree: Dict[str, Any],
+        max_depth: int = ANCESTORS_TREE_MAX_DEPTH,
     ) -> bool:
         """
             Determines if commit was merged with squash merge or not, by looking at the commits
@@ -375,14 +473,23 @@ class PullSyncTask(BaseCodecovTask, name=pulls_task_name):
                 that ALL the commits are out of the first page of listing when we check, we
                 will assume (wrongly) that this was a squash commit
 
+            The tree is walked breadth-first, each commit at most once (merge commits make
+                the same ancestors reachable through several parents), and no deeper than
+                `max_depth` levels from the base head.
+
         Args:
             commits_on_pr (Sequence[str]): Description
             base_ancestors_tree (Dict[str, Any]): Description
+            max_depth (int): How many levels of ancestors to look at, at most
         """
         commits_on_pr_set = set(commits_on_pr)
-        current_level = deque([base_ancestors_tree])
+        visited = set()
+        current_level = deque([(base_ancestors_tree, 0)])
         while current_level:
-            el = current_level.popleft()
+            el, depth = current_level.popleft()
+            if el["commitid"] in visited:
+                continue
+            visited.add(el["commitid"])
             if el["commitid"] in commits_on_pr_set:
                 log.info(
                     "Commit currently on base tree was also on PR. Calling it a normal merge",
@@ -393,8 +500,9 @@ class PullSyncTask(BaseCodecovTask, name=pulls_task_name):
                     ),
                 )
                 return False
-            for p in el.get("parents", []):
-                current_level.append(p)
+            if depth < max_depth:
+                for p in el.get("parents", []):
+                    current_level.append((p, depth + 1))
         log.info(
             "Commits from PR not found on base tree. Calling it a squash merge",
             extra=dict(
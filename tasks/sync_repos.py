@@ -12,7 +12,7 @@ from app import celery_app
 from database.models import Owner, Repository
 from rollouts import LIST_REPOS_GENERATOR_BY_OWNER_SLUG, owner_slug
 from services.owner import get_owner_provider_service
-from services.redis import get_redis_connection
+from services.redis import get_redis_lock_connection
 from tasks.base import BaseCodecovTask
 
 log = logging.getLogger(__name__)
@@ -60,9 +60,8 @@ class SyncReposTask(BaseCodecovTask, name=sync_repos_task_name):
         assert owner, "Owner not found"
 
         lock_name = f"syncrepos_lock_{ownerid}_{using_integration}"
-        redis_connection = get_redis_connection()
         try:
-            with redis_connection.lock(
+            with get_redis_lock_connection().lock(
                 lock_name,
                 timeout=max(300, self.hard_time_limit_task),
                 blocking_timeout=5,
@@ -354,6 +354,32 @@ class TestComputeComparisonTask(object):
         assert comparison.state == CompareCommitState.error.value
         assert comparison.error == CompareCommitError.missing_head_report.value
 
+    @pytest.mark.asyncio
+    async def test_get_comparison_proxy_reads_only_base_from_replica(
+        self, dbsession, mocker, sample_report
+    ):
+        comparison = CompareCommitFactory.create()
+        dbsession.add(comparison)
+        dbsession.flush()
+        from_replica = {}
+
+        def get_report(commit, **kwargs):
+            from_replica[commit] = dbsession.info.get("replica_reads", False)
+            return ReadOnlyReport.create_from_report(sample_report)
+
+        mocker.patch.object(
+            ReadOnlyReport, "should_load_rust_version", return_value=True
+        )
+        mocker.patch.object(
+            ReportService, "get_existing_report_for_commit", side_effect=get_report
+        )
+        task = ComputeComparisonTask()
+        await task.get_comparison_proxy(comparison, UserYaml({}))
+        assert from_replica == {
+            comparison.base_commit: True,
+            comparison.compare_commit: False,
+        }
+
     @pytest.mark.asyncio
     async def test_run_task_ratelimit_error(self, dbsession, mocker, sample_report):
         comparison = CompareCommitFactory.create()
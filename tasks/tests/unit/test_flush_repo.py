@@ -1,4 +1,5 @@
 import pytest
+from celery.exceptions import Retry, SoftTimeLimitExceeded
 from sqlalchemy import null
 from sqlalchemy.dialects import postgresql
 
@@ -119,3 +120,15 @@ class TestFlushRepo(object):
         dbsession.refresh(repo)
         # Those assertions are almost tautological. If they start being a
         # problem, don't hesitate to delete them
+
+    @pytest.mark.asyncio
+    async def test_flush_repo_timeout_retries(self, dbsession, mock_storage, mocker):
+        repo = RepositoryFactory.create()
+        dbsession.add(repo)
+        dbsession.flush()
+        mocker.patch(
+            "tasks.flush_repo.delete_repository_contents",
+            side_effect=SoftTimeLimitExceeded(),
+        )
+        with pytest.raises(Retry):
+            await FlushRepoTask().run_async(dbsession, repoid=repo.repoid)
@@ -279,6 +279,65 @@ class TestPullSyncTask(object):
             "reason": "success",
         }
 
+    @pytest.mark.asyncio
+    async def test_call_pullsync_skips_when_nothing_changed(
+        self, dbsession, mock_redis, mocker, mock_repo_provider, mock_storage
+    ):
+        mocker.patch.object(PullSyncTask, "app")
+        task = PullSyncTask()
+        repository = RepositoryFactory.create()
+        dbsession.add(repository)
+        dbsession.flush()
+        base_commit = CommitFactory.create(repository=repository)
+        head_commit = CommitFactory.create(repository=repository)
+        dbsession.add(base_commit)
+        dbsession.add(head_commit)
+        pull = PullFactory.create(
+            state="open",
+            repository=repository,
+            base=base_commit.commitid,
+            head=head_commit.commitid,
+        )
+        dbsession.add(pull)
+        dbsession.flush()
+        mocked_fetch_pr = mocker.patch(
+            "tasks.sync_pull.fetch_and_update_pull_request_information"
+        )
+        mocked_fetch_pr.return_value = EnrichedPull(
+            database_pull=pull, provider_pull={"base": {"branch": "main"}}
+        )
+        mock_repo_provider.get_pull_request_commits.return_value = []
+        mock_repo_provider.get_compare.return_value = {"diff": {"files": {}}}
+        stored_values = {}
+        mock_redis.set.side_effect = lambda key, value, ex=None: stored_values.update(
+            {key: value.encode()}
+        )
+        mock_redis.get.side_effect = lambda key: stored_values.get(key)
+        get_report = mocker.patch(
+            "tasks.sync_pull.ReportService.get_existing_report_for_commit",
+            return_value=None,
+        )
+        res = await task.run_async(dbsession, repoid=pull.repoid, pullid=pull.pullid)
+        assert res["reason"] == "success"
+        assert get_report.call_count == 2
+        assert mock_repo_provider.get_compare.call_count == 1
+
+        res = await task.run_async(dbsession, repoid=pull.repoid, pullid=pull.pullid)
+        assert res == {
+            "commit_updates_done": {"merged_count": 0, "soft_deleted_count": 0},
+            "notifier_called": True,
+            "pull_updated": False,
+            "reason": "no_changes",
+        }
+        assert get_report.call_count == 2
+        assert mock_repo_provider.get_compare.call_count == 1
+
+        head_commit.totals = {"c": "85.00000", "s": 2}
+        dbsession.flush()
+        res = await task.run_async(dbsession, repoid=pull.repoid, pullid=pull.pullid)
+        assert res["reason"] == "success"
+        assert get_report.call_count == 4
+
     @pytest.mark.asyncio
     async def test_run_async_unobtainable_lock(self, dbsession, mocker, mock_redis):
         pull = PullFactory.create()
@@ -324,6 +383,34 @@ class TestPullSyncTask(object):
             ["some_other_stuff", "some_commit"], ancestors_tree
         )
 
+    def test_was_pr_merged_with_squash_bounded_depth(self):
+        ancestors_tree = {"commitid": "pr_commit", "parents": []}
+        for i in range(10):
+            ancestors_tree = {
+                "commitid": f"base_commit_{i}",
+                "parents": [ancestors_tree],
+            }
+        task = PullSyncTask()
+        assert not task.was_pr_merged_with_squash(["pr_commit"], ancestors_tree)
+        assert task.was_pr_merged_with_squash(
+            ["pr_commit"], ancestors_tree, max_depth=5
+        )
+
+    def test_was_pr_merged_with_squash_visits_shared_ancestors_once(self):
+        # Every level is a merge commit whose two parents share the next ancestor,
+        # so a walk that does not skip visited commits would be exponential
+        ancestors_tree = {"commitid": "root", "parents": []}
+        for i in range(40):
+            ancestors_tree = {
+                "commitid": f"merge_{i}",
+                "parents": [
+                    {"commitid": f"left_{i}", "parents": [ancestors_tree]},
+                    {"commitid": f"right_{i}", "parents": [ancestors_tree]},
+                ],
+            }
+        task = PullSyncTask()
+        assert task.was_pr_merged_with_squash(["pr_commit"], ancestors_tree)
+
     def test_cache_changes_stores_changed_files_in_redis_if_owner_is_whitelisted(
         self, dbsession, mock_redis, mock_repo_provider, mocker
     ):
@@ -1,6 +1,6 @@
 import pytest
 
-from database.models import MeasurementName
+from database.models import Measurement, MeasurementName
 from database.tests.factories import RepositoryFactory
 from database.tests.factories.core import CommitFactory
 from database.tests.factories.timeseries import DatasetFactory
@@ -10,8 +10,8 @@ from tasks.timeseries_backfill import TimeseriesBackfillCommitsTask
 @pytest.mark.asyncio
 async def test_backfill_commits_run_async(dbsession, mocker):
     mocker.patch("tasks.timeseries_backfill.timeseries_enabled", return_value=True)
-    save_commit_measurements_mock = mocker.patch(
-        "tasks.timeseries_backfill.save_commit_measurements"
+    get_report_mock = mocker.patch(
+        "services.report.ReportService.get_existing_report_for_commit"
     )
 
     repository = RepositoryFactory.create()
@@ -38,9 +38,36 @@ async def test_backfill_commits_run_async(dbsession, mocker):
     )
     assert res == {"successful": True}
 
-    assert save_commit_measurements_mock.call_count == 2
-    assert save_commit_measurements_mock.called_with(commit1)
-    assert save_commit_measurements_mock.called_with(commit2)
+    measurements = (
+        dbsession.query(Measurement)
+        .filter_by(name=MeasurementName.flag_coverage.value, repo_id=repository.repoid)
+        .all()
+    )
+    assert sorted(m.commit_sha for m in measurements) == sorted(
+        [commit1.commitid, commit2.commitid]
+    )
+    assert all(m.value == 85.0 for m in measurements)
+    # flag totals were read from the stored session totals
+    assert not get_report_mock.called
+
+
+@pytest.mark.asyncio
+async def test_backfill_commits_run_async_releases_in_flight_batch(
+    dbsession, mocker, mock_redis
+):
+    mocker.patch("tasks.timeseries_backfill.timeseries_enabled", return_value=False)
+    mock_redis.decr.return_value = 0
+
+    task = TimeseriesBackfillCommitsTask()
+    res = await task.run_async(
+        dbsession,
+        commit_ids=[],
+        dataset_names=[],
+        in_flight_key="timeseries_backfill/1/in_flight_batches",
+    )
+    assert res == {"successful": False}
+    mock_redis.decr.assert_called_once_with("timeseries_backfill/1/in_flight_batches")
+    mock_redis.delete.assert_called_once_with("timeseries_backfill/1/in_flight_batches")
 
 
 @pytest.mark.asyncio
@@ -9,13 +9,15 @@ from database.tests.factories.core import CommitFactory
 from database.tests.factories.timeseries import DatasetFactory
 from tasks.timeseries_backfill import (
     TimeseriesBackfillDatasetTask,
+    in_flight_batches_key,
     timeseries_backfill_commits_task,
 )
 
 
 @pytest.mark.asyncio
-async def test_backfill_dataset_run_async(dbsession, mocker):
+async def test_backfill_dataset_run_async(dbsession, mocker, mock_redis):
     mocker.patch("tasks.timeseries_backfill.timeseries_enabled", return_value=True)
+    mock_redis.get.return_value = None
     mock_group = mocker.patch("tasks.timeseries_backfill.group")
 
     repository = RepositoryFactory.create()
@@ -61,16 +63,115 @@ async def test_backfill_dataset_run_async(dbsession, mocker):
             kwargs=dict(
                 commit_ids=[commit3.id_, commit2.id_],
                 dataset_names=[dataset.name],
+                in_flight_key=in_flight_batches_key(dataset.id_),
             ),
         ),
         timeseries_backfill_commits_task.signature(
             kwargs=dict(
                 commit_ids=[commit1.id_],
                 dataset_names=[dataset.name],
+                in_flight_key=in_flight_batches_key(dataset.id_),
             ),
         ),
     ]
     mock_group.assert_called_once_with(expected_signatures)
+    mock_redis.pipeline.return_value.incrby.assert_called_once_with(
+        in_flight_batches_key(dataset.id_), 2
+    )
+
+
+@pytest.mark.asyncio
+async def test_backfill_dataset_run_async_pages(dbsession, mocker, mock_redis):
+    mocker.patch("tasks.timeseries_backfill.timeseries_enabled", return_value=True)
+    mocker.patch(
+        "tasks.timeseries_backfill.backfill_max_in_flight_batches", return_value=2
+    )
+    # one batch of an earlier step is still running
+    mock_redis.get.return_value = b"1"
+    mock_group = mocker.patch("tasks.timeseries_backfill.group")
+    mock_app = mocker.patch.object(TimeseriesBackfillDatasetTask, "app")
+
+    repository = RepositoryFactory.create()
+    dbsession.add(repository)
+    dbsession.flush()
+
+    commits = [
+        CommitFactory(repository=repository, timestamp=datetime(2022, month, 1))
+        for month in (1, 2, 3)
+    ]
+    dbsession.add_all(commits)
+
+    dataset = DatasetFactory.create(
+        name=MeasurementName.flag_coverage.value,
+        repository_id=repository.repoid,
+    )
+    dbsession.add(dataset)
+    dbsession.flush()
+    key = in_flight_batches_key(dataset.id_)
+
+    task = TimeseriesBackfillDatasetTask()
+    res = await task.run_async(
+        dbsession,
+        dataset_id=dataset.id_,
+        start_date="2022-01-01T00:00:00",
+        end_date="2022-03-15T00:00:00",
+        batch_size=2,
+    )
+    assert res == {"successful": True}
+    mock_group.assert_called_once_with(
+        [
+            timeseries_backfill_commits_task.signature(
+                kwargs=dict(
+                    commit_ids=[commits[2].id_, commits[1].id_],
+                    dataset_names=[dataset.name],
+                    in_flight_key=key,
+                ),
+            ),
+        ]
+    )
+    mock_redis.pipeline.return_value.incrby.assert_called_once_with(key, 1)
+    mock_app.tasks[task.name].apply_async.assert_called_once_with(
+        kwargs=dict(
+            dataset_id=dataset.id_,
+            start_date="2022-01-01T00:00:00",
+            end_date="2022-03-15T00:00:00",
+            batch_size=2,
+            cursor_timestamp=commits[1].timestamp.isoformat(),
+            cursor_commit_id=commits[1].id_,
+        ),
+        countdown=60,
+    )
+    next_kwargs = mock_app.tasks[task.name].apply_async.call_args.kwargs["kwargs"]
+
+    # no batch is enqueued while the limit is reached
+    mock_redis.get.return_value = b"2"
+    mock_group.reset_mock()
+    mock_app.reset_mock()
+    res = await task.run_async(dbsession, **next_kwargs)
+    assert res == {"successful": True}
+    assert not mock_group.called
+    mock_app.tasks[task.name].apply_async.assert_called_once_with(
+        kwargs=next_kwargs, countdown=60
+    )
+
+    # the next step continues from the position it was given
+    mock_redis.get.return_value = None
+    mock_group.reset_mock()
+    mock_app.reset_mock()
+    res = await task.run_async(dbsession, **next_kwargs)
+    assert res == {"successful": True}
+    mock_group.assert_called_once_with(
+        [
+            timeseries_backfill_commits_task.signature(
+                kwargs=dict(
+                    commit_ids=[commits[0].id_],
+                    dataset_names=[dataset.name],
+                    in_flight_key=key,
+                ),
+            ),
+        ]
+    )
+    assert not mock_app.tasks[task.name].apply_async.called
 
 
 @pytest.mark.asyncio
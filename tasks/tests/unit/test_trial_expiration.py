@@ -15,8 +15,13 @@ class TestTrialExpiration(object):
         dbsession.add(owner)
         dbsession.flush()
 
+        invalidate = mocker.patch("celery_task_router.owner_plan_cache.invalidate")
         task = TrialExpirationTask()
         assert await task.run_async(dbsession, owner.ownerid) == {"successful": True}
+        # the cached plans are only invalidated once the new plan is committed
+        assert not invalidate.called
+        dbsession.commit()
+        assert invalidate.called
 
         assert owner.plan == BillingPlan.users_basic.value
         assert owner.plan_activated_users == None
@@ -1,25 +1,55 @@
 import logging
 from datetime import datetime
-from typing import Iterable, Optional
+from typing import Iterable, List, Optional, Tuple
 
 from celery import group
 from celery.canvas import Signature
+from redis import Redis
 from sqlalchemy.orm.session import Session
 
 from app import celery_app
+from database.engine import replica_reads
 from database.models import Commit, Repository
 from database.models.timeseries import Dataset
-from helpers.timeseries import timeseries_enabled
+from helpers.timeseries import (
+    backfill_in_flight_ttl,
+    backfill_max_in_flight_batches,
+    backfill_step_delay,
+    timeseries_enabled,
+)
+from services.redis import get_redis_connection
 from services.timeseries import (
+    MeasurementBatchWriter,
     backfill_batch_size,
     repository_commits_query,
-    save_commit_measurements,
 )
 from tasks.base import BaseCodecovTask
 
 log = logging.getLogger(__name__)
 
 
+def in_flight_batches_key(dataset_id: int) -> str:
+    return f"timeseries_backfill/{dataset_id}/in_flight_batches"
+
+
+def get_in_flight_batches(redis_connection: Redis, key: str) -> int:
+    value = redis_connection.get(key)
+    return max(int(value), 0) if value is not None else 0
+
+
+def add_in_flight_batches(redis_connection: Redis, key: str, count: int) -> None:
+    # the key expires in case some batch never gets to say it's done
+    pipeline = redis_connection.pipeline()
+    pipeline.incrby(key, count)
+    pipeline.expire(key, backfill_in_flight_ttl())
+    pipeline.execute()
+
+
+def remove_in_flight_batch(redis_connection: Redis, key: str) -> None:
+    if redis_connection.decr(key) <= 0:
+        redis_connection.delete(key)
+
+
 # TODO: add name to `shared.celery_config`
 class TimeseriesBackfillCommitsTask(
     BaseCodecovTask, name="app.tasks.timeseries.backfill_commits"
@@ -30,15 +60,42 @@ class TimeseriesBackfillCommitsTask(
         *,
         commit_ids: Iterable[int],
         dataset_names: Iterable[str],
+        in_flight_key: Optional[str] = None,
         **kwargs,
+    ):
+        try:
+            return self._backfill_commits(db_session, commit_ids, dataset_names)
+        finally:
+            if in_flight_key is not None:
+                # lets the dataset backfill enqueue another batch
+                remove_in_flight_batch(get_redis_connection(), in_flight_key)
+
+    def _backfill_commits(
+        self,
+        db_session: Session,
+        commit_ids: Iterable[int],
+        dataset_names: Iterable[str],
     ):
         if not timeseries_enabled():
             log.warning("Timeseries not enabled")
             return {"successful": False}
 
-        commits = db_session.query(Commit).filter(Commit.id_.in_(commit_ids))
+        commits = (
+            db_session.query(Commit)
+            .filter(Commit.id_.in_(commit_ids))
+            .order_by(Commit.repoid)
+        )
+        writer = None
         for commit in commits:
-            save_commit_measurements(commit, dataset_names=dataset_names)
+            if writer is None or writer.repository.repoid != commit.repoid:
+                if writer is not None:
+                    writer.flush()
+                writer = MeasurementBatchWriter(
+                    commit.repository, dataset_names=dataset_names
+                )
+            writer.add_commit(commit)
+        if writer is not None:
+            writer.flush()
         return {"successful": True}
 
 
@@ -51,6 +108,14 @@ timeseries_backfill_commits_task = celery_app.tasks[
 
 
 class TimeseriesBackfillDatasetTask(BaseCodecovTask):
+    """Enqueues the commit batches of a dataset backfill
+
+    Commits are paged through newest first. Each batch is counted in Redis until it
+    finishes, and a run only enqueues as many batches as it takes to have
+    `backfill_max_in_flight_batches` of them running. When there are more commits
+    this task is enqueued again (after `backfill_step_delay` seconds) with the
+    position of the last commit enqueued in its kwargs, so it continues from there.
+    """
 
     # TODO: add name to `shared.celery_config`
     name = "app.tasks.timeseries.backfill_dataset"
@@ -63,6 +128,8 @@ class TimeseriesBackfillDatasetTask(BaseCodecovTask):
         start_date: str,
         end_date: str,
         batch_size: Optional[int] = None,
+        cursor_timestamp: Optional[str] = None,
+        cursor_commit_id: Optional[int] = None,
         **kwargs,
     ):
         if not timeseries_enabled():
@@ -100,38 +167,102 @@ class TimeseriesBackfillDatasetTask(BaseCodecovTask):
             )
             return {"successful": False}
 
-        # all commits in given time range
-        commits = repository_commits_query(repository, start_date, end_date)
+        cursor = None
+        if cursor_timestamp is not None:
+            cursor = (datetime.fromisoformat(cursor_timestamp), cursor_commit_id)
+
+        redis_connection = get_redis_connection()
+        in_flight_key = in_flight_batches_key(dataset.id_)
+        free_batches = backfill_max_in_flight_batches() - get_in_flight_batches(
+            redis_connection, in_flight_key
+        )
+        if free_batches <= 0:
+            log.info(
+                "Waiting for the batches of the dataset backfill in flight",
+                extra=dict(dataset_id=dataset.id_, cursor=cursor),
+            )
+            self._schedule_next_step(
+                dataset_id, start_date, end_date, batch_size, cursor
+            )
+            return {"successful": True}
+
+        # next page of commits in given time range
+        with replica_reads(db_session):
+            commits = repository_commits_query(
+                repository, start_date, end_date, before=cursor
+            ).limit(batch_size * free_batches)
 
-        # split commits into batches of equal size
-        signatures = self._commit_batch_signatures(dataset, commits, batch_size)
+            # split commits into batches of equal size
+            signatures, last_commit = self._commit_batch_signatures(
+                dataset, commits, batch_size, in_flight_key
+            )
+        if signatures:
+            add_in_flight_batches(redis_connection, in_flight_key, len(signatures))
+            # enqueue task for each batch (to be run in parallel)
+            group(signatures).apply_async()
 
-        # enqueue task for each batch (to be run in parallel)
-        group(signatures).apply_async()
+        if len(signatures) == free_batches and last_commit is not None:
+            self._schedule_next_step(
+                dataset_id,
+                start_date,
+                end_date,
+                batch_size,
+                (last_commit.timestamp, last_commit.id_),
+            )
 
         return {"successful": True}
 
+    def _schedule_next_step(
+        self,
+        dataset_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        batch_size: int,
+        cursor: Optional[Tuple[datetime, int]],
+    ) -> None:
+        self.app.tasks[self.name].apply_async(
+            kwargs=dict(
+                dataset_id=dataset_id,
+                start_date=start_date.isoformat(),
+                end_date=end_date.isoformat(),
+                batch_size=batch_size,
+                cursor_timestamp=cursor[0].isoformat() if cursor else None,
+                cursor_commit_id=cursor[1] if cursor else None,
+            ),
+            countdown=backfill_step_delay(),
+        )
+
     def _commit_batch_signatures(
-        self, dataset: Dataset, commits: Iterable[Commit], batch_size: int
-    ) -> Iterable[Signature]:
+        self,
+        dataset: Dataset,
+        commits: Iterable[Commit],
+        batch_size: int,
+        in_flight_key: str,
+    ) -> Tuple[List[Signature], Optional[Commit]]:
         commit_ids = []
         signatures = []
+        commit = None
         for commit in commits:
             commit_ids.append(commit.id_)
             if len(commit_ids) == batch_size:
-                signatures.append(self._backfill_commits_signature(dataset, commit_ids))
+                signatures.append(
+                    self._backfill_commits_signature(dataset, commit_ids, in_flight_key)
+                )
                 commit_ids = []
         if len(commit_ids) > 0:
-            signatures.append(self._backfill_commits_signature(dataset, commit_ids))
-        return signatures
+            signatures.append(
+                self._backfill_commits_signature(dataset, commit_ids, in_flight_key)
+            )
+        return signatures, commit
 
     def _backfill_commits_signature(
-        self, dataset: Dataset, commit_ids: Iterable[int]
+        self, dataset: Dataset, commit_ids: Iterable[int], in_flight_key: str
     ) -> Signature:
         return timeseries_backfill_commits_task.signature(
             kwargs=dict(
                 commit_ids=commit_ids,
                 dataset_names=[dataset.name],
+                in_flight_key=in_flight_key,
             ),
         )
 
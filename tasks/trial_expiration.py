@@ -2,6 +2,7 @@ import logging
 
 from app import celery_app
 from celery_config import trial_expiration_task_name
+from celery_task_router import invalidate_owner_plans_on_commit
 from database.enums import TrialStatus
 from database.models.core import Owner
 from services.billing import BillingPlan
@@ -28,6 +29,7 @@ class TrialExpirationTask(BaseCodecovTask, name=trial_expiration_task_name):
         owner.stripe_subscription_id = None
         owner.trial_status = TrialStatus.EXPIRED.value
         db_session.flush()
+        invalidate_owner_plans_on_commit(db_session)
         return {"successful": True}
 
 
@@ -26,7 +26,12 @@ from helpers.checkpoint_logger.flows import UploadFlow
 from helpers.exceptions import RepositoryWithoutValidBotError
 from helpers.save_commit_error import save_commit_error
 from services.archive import ArchiveService
-from services.redis import Redis, download_archive_from_redis, get_redis_connection
+from services.redis import (
+    Redis,
+    download_archive_from_redis,
+    get_redis_connection,
+    get_redis_lock_connection,
+)
 from services.report import NotReadyToBuildReportYetError, ReportService
 from services.repository import (
     create_webhook_on_provider,
@@ -179,7 +184,7 @@ class UploadTask(BaseCodecovTask, name=upload_task_name):
             _prepare_kwargs_for_retry(repoid, commitid, report_code, kwargs)
             self.retry(countdown=60, kwargs=kwargs)
         try:
-            with redis_connection.lock(
+            with get_redis_lock_connection().lock(
                 lock_name,
                 timeout=max(300, self.hard_time_limit_task),
                 blocking_timeout=5,
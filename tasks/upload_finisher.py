@@ -17,7 +17,7 @@ from helpers.checkpoint_logger import _kwargs_key
 from helpers.checkpoint_logger import from_kwargs as checkpoints_from_kwargs
 from helpers.checkpoint_logger.flows import UploadFlow
 from services.comparison import get_or_create_comparison
-from services.redis import get_redis_connection
+from services.redis import get_redis_connection, get_redis_lock_connection
 from services.report import ReportService
 from services.timeseries import save_commit_measurements
 from services.yaml import read_yaml_field
@@ -78,7 +78,9 @@ class UploadFinisherTask(BaseCodecovTask, name=upload_finisher_task_name):
         assert commit, "Commit not found in database."
         redis_connection = get_redis_connection()
         try:
-            with redis_connection.lock(lock_name, timeout=60 * 5, blocking_timeout=5):
+            with get_redis_lock_connection().lock(
+                lock_name, timeout=60 * 5, blocking_timeout=5
+            ):
                 commit_yaml = UserYaml(commit_yaml)
                 db_session.commit()
                 commit.notified = False
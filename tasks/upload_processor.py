@@ -20,7 +20,7 @@ from database.models import Commit, Upload
 from helpers.metrics import metrics
 from helpers.save_commit_error import save_commit_error
 from services.bots import RepositoryWithoutValidBotError
-from services.redis import get_redis_connection
+from services.redis import get_redis_lock_connection
 from services.report import ProcessingResult, Report, ReportService
 from services.repository import get_repo_provider_service
 from services.yaml import read_yaml_field
@@ -76,7 +76,6 @@ class UploadProcessorTask(BaseCodecovTask, name=upload_processor_task_name):
             extra=dict(repoid=repoid, commit=commitid),
         )
         lock_name = f"upload_processing_lock_{repoid}_{commitid}"
-        redis_connection = get_redis_connection()
         try:
             log.info(
                 "Acquiring upload processing lock",
@@ -88,7 +87,7 @@ class UploadProcessorTask(BaseCodecovTask, name=upload_processor_task_name):
                     parent_task=self.request.parent_id,
                 ),
             )
-            with redis_connection.lock(
+            with get_redis_lock_connection().lock(
                 lock_name,
                 timeout=max(60 * 5, self.hard_time_limit_task),
                 blocking_timeout=5,
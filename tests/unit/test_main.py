@@ -1,11 +1,13 @@
 import os
 import sys
+from collections import Counter
 from unittest import mock
 
 from click.testing import CliRunner
 from shared.celery_config import BaseCeleryConfig
 
 from main import _get_queues_param_from_queue_input, cli, main, setup_worker, test, web
+from services.report.benchmark import REPORT_GENERATORS, BenchmarkResult
 
 
 def test_get_queues_param_from_queue_input():
@@ -61,6 +63,9 @@ def test_get_cli_help(mocker):
             "  --help  Show this message and exit.",
             "",
             "Commands:",
+            "  benchmark  Measure the throughput of the report parsers.",
+            "  profiles   Merge the saved profiles of a task into one collapsed-stack file.",
+            "  routing    Measure how long the task router takes to find a plan.",
             "  test",
             "  web",
             "  worker",
@@ -173,3 +178,65 @@ def test_main(mock_prometheus, mocker):
     mock_cli = mocker.patch("main.cli")
     assert main() is None
     mock_cli.assert_called_with(obj={})
+
+
+def test_profiles_command(mocker):
+    mocker.patch(
+        "main.aggregate_task_profiles",
+        return_value=Counter({"a.py:main;b.py:run": 3, "a.py:main": 5}),
+    )
+    runner = CliRunner()
+    res = runner.invoke(cli, ["profiles", "app.tasks.upload.Upload"])
+    assert res.exit_code == 0
+    assert res.output == "a.py:main 5\na.py:main;b.py:run 3\n"
+
+
+def test_benchmark_command(mocker):
+    mocked_run = mocker.patch(
+        "services.report.benchmark.run_parser_benchmarks",
+        return_value=[BenchmarkResult("lcov", 2_000_000, 1000, 0.5, 100_000_000)],
+    )
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        res = runner.invoke(
+            cli, ["benchmark", "--format", "lcov", "--save", "baseline.json"]
+        )
+        assert res.exit_code == 0
+        assert (
+            res.output
+            == "lcov              4.00 MB/s         2000 lines/s     100.0 MB peak RSS\n"
+        )
+        mocked_run.assert_called_with(("lcov",), 100, 500, 3)
+
+        mocked_run.return_value = [
+            BenchmarkResult("lcov", 2_000_000, 1000, 1.0, 100_000_000)
+        ]
+        res = runner.invoke(cli, ["benchmark", "--baseline", "baseline.json"])
+        assert res.exit_code == 1
+        assert "lcov: mb_per_second went from 4.00 to 2.00" in res.output
+        mocked_run.assert_called_with(sorted(REPORT_GENERATORS), 100, 500, 3)
+
+        res = runner.invoke(cli, ["benchmark", "--format", "unknown"])
+        assert res.exit_code == 2
+        assert "unknown formats ['unknown']" in res.output
+
+
+def test_routing_command(mocker):
+    mocker.patch(
+        "services.task_router_benchmark.get_benchmark_repoids", return_value=[1, 2]
+    )
+    mocked_measure = mocker.patch(
+        "services.task_router_benchmark.measure_plan_lookup", side_effect=[12.3, 456.7]
+    )
+    runner = CliRunner()
+    res = runner.invoke(cli, ["routing", "--lookups", "10"])
+    assert res.exit_code == 0
+    assert res.output == "plan lookup 12 us (457 us without the plan cache)\n"
+    mocked_measure.assert_called_with([1, 2], 10, cached=False)
+
+    mocker.patch(
+        "services.task_router_benchmark.get_benchmark_repoids", return_value=[]
+    )
+    res = runner.invoke(cli, ["routing"])
+    assert res.exit_code == 1
+    assert "No repos to route tasks for in the database" in res.output
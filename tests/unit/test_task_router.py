@@ -2,9 +2,11 @@ from unittest.mock import patch
 
 import pytest
 import shared.celery_config as shared_celery_config
+from redis.exceptions import ConnectionError as RedisConnectionError
 from shared.billing import BillingPlan
 
 from celery_task_router import (
+    OwnerPlanCache,
     _get_user_plan_from_comparison_id,
     _get_user_plan_from_label_request_id,
     _get_user_plan_from_org_ownerid,
@@ -14,6 +16,8 @@ from celery_task_router import (
     _get_user_plan_from_repoid,
     _get_user_plan_from_suite_id,
     _get_user_plan_from_task,
+    invalidate_owner_plans,
+    invalidate_owner_plans_on_commit,
     route_task,
 )
 from database.tests.factories.core import (
@@ -370,3 +374,103 @@ def test_route_task(mocker, dbsession, fake_repos):
     mock_route_tasks_shared.assert_called_with(
         shared_celery_config.upload_task_name, BillingPlan.pr_monthly.db_name
     )
+
+
+def test_get_user_plan_from_task_cached(
+    mocker, dbsession, fake_repos, mock_configuration
+):
+    mock_configuration._params["setup"]["task_router"] = {
+        "plan_cache": {"enabled": True}
+    }
+    repo = fake_repos[0]
+    task_kwargs = dict(repoid=repo.repoid, commitid=0, debug=False, rebuild=False)
+    assert (
+        _get_user_plan_from_task(
+            dbsession, shared_celery_config.upload_task_name, task_kwargs
+        )
+        == BillingPlan.pr_monthly.db_name
+    )
+    repo.owner.plan = BillingPlan.enterprise_cloud_yearly.db_name
+    dbsession.flush()
+    # served from the cache, the plan change wasn't invalidated yet
+    assert (
+        _get_user_plan_from_task(
+            dbsession, shared_celery_config.notify_task_name, task_kwargs
+        )
+        == BillingPlan.pr_monthly.db_name
+    )
+    invalidate_owner_plans()
+    assert (
+        _get_user_plan_from_task(
+            dbsession, shared_celery_config.notify_task_name, task_kwargs
+        )
+        == BillingPlan.enterprise_cloud_yearly.db_name
+    )
+
+
+def test_invalidate_owner_plans_on_commit(mocker, dbsession, fake_owners):
+    invalidate = mocker.patch("celery_task_router.owner_plan_cache.invalidate")
+    owner = fake_owners[0]
+    owner.plan = BillingPlan.users_basic.db_name
+    invalidate_owner_plans_on_commit(dbsession)
+    dbsession.flush()
+    assert not invalidate.called
+    dbsession.commit()
+    assert invalidate.call_count == 1
+    # only the transaction that changed the plan invalidates them
+    dbsession.commit()
+    assert invalidate.call_count == 1
+
+
+def test_invalidate_owner_plans_on_commit_rolled_back(mocker, dbsession):
+    invalidate = mocker.patch("celery_task_router.owner_plan_cache.invalidate")
+    invalidate_owner_plans_on_commit(dbsession)
+    dbsession.rollback()
+    dbsession.commit()
+    assert not invalidate.called
+
+
+def test_get_user_plan_from_task_cache_disabled(mocker, dbsession, fake_repos):
+    # the cache is off unless it's enabled in the config
+    repo = fake_repos[0]
+    task_kwargs = dict(repoid=repo.repoid, commitid=0, debug=False, rebuild=False)
+    _get_user_plan_from_task(
+        dbsession, shared_celery_config.upload_task_name, task_kwargs
+    )
+    repo.owner.plan = BillingPlan.enterprise_cloud_yearly.db_name
+    dbsession.flush()
+    assert (
+        _get_user_plan_from_task(
+            dbsession, shared_celery_config.upload_task_name, task_kwargs
+        )
+        == BillingPlan.enterprise_cloud_yearly.db_name
+    )
+
+
+def test_owner_plan_cache_redis(mocker, mock_configuration, mock_redis):
+    mock_configuration._params["setup"]["task_router"] = {"plan_cache": {"redis": True}}
+    cache = OwnerPlanCache()
+    mock_redis.pipeline.return_value.execute.return_value = [1, -1]
+    mock_redis.hget.return_value = b"users-pr-inappm"
+    assert cache.get("repoid/1") == "users-pr-inappm"
+    mock_redis.hget.assert_called_with("task_router/owner_plans", "repoid/1")
+    # then it's in the process
+    mock_redis.hget.return_value = None
+    assert cache.get("repoid/1") == "users-pr-inappm"
+    assert cache.get("repoid/2") is None
+
+    cache.set("repoid/2", "users-basic")
+    mock_redis.pipeline.return_value.hset.assert_called_with(
+        "task_router/owner_plans", "repoid/2", "users-basic"
+    )
+    mock_redis.expire.assert_called_once_with("task_router/owner_plans", 600)
+    # the expiry of the hash isn't pushed back by later entries
+    mock_redis.pipeline.return_value.execute.return_value = [1, 540]
+    cache.set("repoid/4", "users-basic")
+    assert mock_redis.expire.call_count == 1
+    cache.invalidate()
+    mock_redis.delete.assert_called_with("task_router/owner_plans")
+    assert cache.get("repoid/1") is None
+
+    mock_redis.hget.side_effect = RedisConnectionError()
+    assert cache.get("repoid/3") is None